@@ -0,0 +1,124 @@
+"""
+Asyncio HTTP client for Polygon.io requests
+
+The Discord bot already runs an event loop, so contract-level fan-out for
+the unusual activity scan is done here with aiohttp instead of a thread pool
+per request. Requests share one keep-alive connector per event loop, a
+process-wide in-flight semaphore, and the same token bucket, adaptive
+concurrency controller and circuit breaker as the synchronous client in
+polygon_client so both paths honor one budget.
+"""
+import asyncio
+import json
+import time
+
+import aiohttp
+
+import polygon_client
+
+# Upper bound on requests in flight across every ticker on the loop; the
+# adaptive limit in polygon_client.concurrency is usually lower
+MAX_IN_FLIGHT = polygon_client.MAX_CONCURRENCY
+
+_session = None
+_session_loop = None
+_semaphore = None
+
+
+class AsyncPolygonResponse:
+    """
+    Minimal response object mirroring the parts of requests.Response
+    used by the callers (status_code, text, headers, json())
+    """
+
+    def __init__(self, status_code, text, headers):
+        self.status_code = status_code
+        self.text = text
+        self.headers = headers
+
+    def json(self):
+        return json.loads(self.text) if self.text else {}
+
+
+async def get_async_session():
+    """
+    Get the aiohttp session for the running event loop, creating it on first use
+
+    Returns:
+        aiohttp.ClientSession shared by all async Polygon callers on this loop
+    """
+    global _session, _session_loop, _semaphore
+
+    loop = asyncio.get_running_loop()
+    if _session is None or _session.closed or _session_loop is not loop:
+        connector = aiohttp.TCPConnector(limit=MAX_IN_FLIGHT, keepalive_timeout=30)
+        _session = aiohttp.ClientSession(
+            connector=connector,
+            headers={'User-Agent': 'OptionsWizard/1.0'}
+        )
+        _session_loop = loop
+        _semaphore = asyncio.Semaphore(MAX_IN_FLIGHT)
+    return _session
+
+
+async def async_polygon_get(url, headers=None, timeout=None):
+    """
+    Issue a rate-limited GET request to Polygon.io on the running event loop
+
+    Args:
+        url: Full request URL (including apiKey)
+        headers: Optional extra headers for this request
+        timeout: Optional (connect, read) override; defaults to the per-endpoint value
+
+    Returns:
+        AsyncPolygonResponse
+
+    Raises:
+        polygon_client.CircuitOpenError if the endpoint's circuit is open
+        aiohttp.ClientError or asyncio.TimeoutError on network and body errors
+    """
+    session = await get_async_session()
+    connect_timeout, read_timeout = timeout or polygon_client.get_timeout(url)
+    client_timeout = aiohttp.ClientTimeout(sock_connect=connect_timeout, sock_read=read_timeout)
+    group = polygon_client.get_endpoint_group(url)
+
+    async with _semaphore:
+        for attempt in range(polygon_client.MAX_RATE_LIMIT_RETRIES + 1):
+            polygon_client.check_circuit(group)
+            wait = polygon_client.rate_limiter.reserve()
+            if wait > 0:
+                await asyncio.sleep(wait)
+
+            await polygon_client.concurrency.acquire_async()
+            start = time.monotonic()
+            try:
+                async with session.get(url, headers=headers, timeout=client_timeout) as resp:
+                    response = AsyncPolygonResponse(resp.status, await resp.text(), resp.headers)
+            except asyncio.TimeoutError:
+                polygon_client.record_error(group, timed_out=True)
+                raise
+            except aiohttp.ClientError:
+                # Includes body errors (ClientPayloadError), so a failed probe reopens the circuit
+                polygon_client.record_error(group, timed_out=False)
+                raise
+            finally:
+                polygon_client.concurrency.release()
+
+            polygon_client.record_response(group, response.status_code, time.monotonic() - start)
+            if response.status_code != 429 or attempt == polygon_client.MAX_RATE_LIMIT_RETRIES:
+                return response
+
+            retry_after = polygon_client.parse_retry_after(response)
+            print(f"Rate limited by Polygon API, pausing all requests for {retry_after:.1f} seconds...")
+            polygon_client.rate_limiter.pause(retry_after)
+
+    return response
+
+
+async def close_async_session():
+    """Close the async session (call from the bot's shutdown hook)"""
+    global _session, _session_loop
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session = None
+    _session_loop = None
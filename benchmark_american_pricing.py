@@ -0,0 +1,127 @@
+"""
+Benchmark for the American option pricing engines
+
+Prices a synthetic chain of calls and puts (strikes from deep ITM to deep
+OTM, 1 week to 1 year, dividend yields from 0 to 4%) with:
+- european: option_pricing.black_scholes_price, for reference
+- bjerksund: american_pricing.bjerksund_stensland
+- tree-N: american_pricing.crr_tree with N steps
+
+Every engine is compared against a fine CRR tree (--reference-steps). The
+report shows latency per 1,000 contracts, the mean and max absolute price
+error, and the mean early exercise premium over the European price.
+
+Usage:
+    python benchmark_american_pricing.py
+    python benchmark_american_pricing.py --contracts 5000 --steps 50 100 200 500 --json american.json
+"""
+import argparse
+import json
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+
+import american_pricing
+import option_pricing
+
+SPOT = 100.0
+
+
+def make_contracts(count, seed=0):
+    """Random contracts around SPOT: strike, years, vol, dividend yield and type arrays"""
+    rng = np.random.default_rng(seed)
+    return {
+        'strike': SPOT * rng.uniform(0.5, 1.5, count),
+        'time': rng.uniform(7, 365, count) / option_pricing.DAYS_PER_YEAR,
+        'vol': rng.uniform(0.15, 0.8, count),
+        'dividend_yield': rng.uniform(0.0, 0.04, count),
+        'option_type': np.where(rng.random(count) < 0.5, 'call', 'put'),
+    }
+
+
+def price_with(engine, contracts, steps=None):
+    args = (SPOT, contracts['strike'], contracts['time'], contracts['vol'], option_pricing.RISK_FREE_RATE,
+            contracts['option_type'], contracts['dividend_yield'])
+    if engine == 'european':
+        return option_pricing.black_scholes_price(*args)
+    if engine == 'bjerksund':
+        return american_pricing.bjerksund_stensland(*args)
+    return american_pricing.crr_tree(*args, steps=steps)
+
+
+def time_engine(engine, contracts, steps=None, repeat=3):
+    """Best of `repeat` runs, in seconds, with the prices of the last run"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        prices = price_with(engine, contracts, steps)
+        best = min(best, time.perf_counter() - start)
+    return best, prices
+
+
+def run_benchmark(contracts=1000, steps=(50, 100, 200, 500), reference_steps=2000, repeat=3, seed=0):
+    """
+    Time and compare every engine on one synthetic chain
+
+    Args:
+        contracts: Number of contracts in the chain
+        steps: Tree sizes to benchmark
+        reference_steps: Steps of the tree used as the true price
+        repeat: Timing runs per engine (the best is kept)
+        seed: Random seed for the chain
+
+    Returns:
+        List of result dictionaries, one per engine
+    """
+    chain = make_contracts(contracts, seed)
+    reference = price_with('tree', chain, reference_steps)
+    european = price_with('european', chain)
+
+    engines = [('european', None), ('bjerksund', None)] + [('tree', n) for n in steps]
+    results = []
+    for engine, n in engines:
+        seconds, prices = time_engine(engine, chain, n, repeat)
+        error = np.abs(prices - reference)
+        results.append({
+            'engine': engine if n is None else f"tree-{n}",
+            'contracts': contracts,
+            'ms_per_1000': round(seconds * 1000 * 1000 / contracts, 3),
+            'mean_abs_error': round(float(error.mean()), 6),
+            'max_abs_error': round(float(error.max()), 6),
+            'mean_premium': round(float((prices - european).mean()), 6),
+        })
+    return results
+
+
+def print_report(results, reference_steps):
+    print(f"Errors against a {reference_steps}-step CRR tree")
+    print(f"{'engine':<11}{'contracts':>10}{'ms/1000':>10}{'mean err':>11}{'max err':>10}{'premium':>10}")
+    for r in results:
+        print(f"{r['engine']:<11}{r['contracts']:>10}{r['ms_per_1000']:>10.2f}{r['mean_abs_error']:>11.4f}"
+              f"{r['max_abs_error']:>10.4f}{r['mean_premium']:>10.4f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark American option pricing on a synthetic chain")
+    parser.add_argument('--contracts', type=int, default=1000)
+    parser.add_argument('--steps', type=int, nargs='+', default=[50, 100, 200, 500], help="Tree sizes to test")
+    parser.add_argument('--reference-steps', type=int, default=2000, help="Steps of the reference tree")
+    parser.add_argument('--repeat', type=int, default=3, help="Timing runs per engine")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    results = run_benchmark(args.contracts, args.steps, args.reference_steps, args.repeat, args.seed)
+    print_report(results, args.reference_steps)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'python': sys.version.split()[0], 'run_at': datetime.now().isoformat(timespec='seconds'),
+                       'reference_steps': args.reference_steps, 'results': results}, f, indent=2)
+        print(f"Wrote {len(results)} results to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
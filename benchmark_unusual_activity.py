@@ -0,0 +1,259 @@
+"""
+End-to-end benchmark for the unusual activity pipeline
+
+Runs get_unusual_options_activity and get_simplified_unusual_activity_summary
+against synthetic option chains served by the local Polygon stand-in
+(polygon_replay.PolygonStandIn), so results are repeatable and comparable
+between builds. For each chain size it reports wall time, per-stage timings
+(see pipeline_metrics), peak Python memory, the requests issued and the
+response bytes downloaded.
+
+The 'refresh' row repeats the scan after the result and quote caches expire,
+with the per-contract trade state (see polygon_trades.build_trades_url) and
+the contract listings (valid until the next session) kept, so it measures
+the cost of an incremental refresh rather than a cold scan.
+
+Usage:
+    python benchmark_unusual_activity.py --sizes 100 1000 5000 20000 --trades 20
+    python benchmark_unusual_activity.py --mode trades --latency 0.02 --json bench.json
+
+Stage times are summed across worker threads, so with parallel trade
+fetching they can exceed the wall time.
+"""
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+from datetime import datetime, timedelta
+
+import cache_module
+import pipeline_metrics
+import polygon_client
+import polygon_integration
+import polygon_snapshot
+import polygon_trades
+from polygon_replay import PolygonStandIn, use_base_url
+
+TICKER = 'BENCH'
+STOCK_PRICE = 100.0
+STRIKES_PER_EXPIRATION = 100
+CONTRACTS_PAGE_SIZE = polygon_integration.CONTRACTS_PAGE_LIMIT
+SNAPSHOT_PAGE_SIZE = polygon_snapshot.SNAPSHOT_PAGE_LIMIT
+
+
+def make_chain(size, strike_span=0.5):
+    """
+    Build a synthetic chain of `size` contracts around STOCK_PRICE
+
+    Strikes are spread evenly over +/- strike_span of the price, calls and
+    puts at every strike, with as many weekly expirations as needed.
+    """
+    expirations = max(1, math.ceil(size / (2 * STRIKES_PER_EXPIRATION)))
+    low, high = STOCK_PRICE * (1 - strike_span), STOCK_PRICE * (1 + strike_span)
+    step = (high - low) / max(1, STRIKES_PER_EXPIRATION - 1)
+    first_expiry = datetime.now().date() + timedelta(days=3)
+
+    contracts = []
+    for e in range(expirations):
+        expiry = first_expiry + timedelta(days=7 * e)
+        for i in range(STRIKES_PER_EXPIRATION):
+            strike = round(low + i * step, 2)
+            for contract_type in ('call', 'put'):
+                if len(contracts) >= size:
+                    return contracts
+                contracts.append({
+                    'ticker': f"O:{TICKER}{expiry.strftime('%y%m%d')}{contract_type[0].upper()}{int(strike * 1000):08d}",
+                    'underlying_ticker': TICKER,
+                    'strike_price': strike,
+                    'expiration_date': expiry.strftime('%Y-%m-%d'),
+                    'contract_type': contract_type
+                })
+    return contracts
+
+
+def make_trades(rng, count, now_ns):
+    """Most recent first, like /v3/trades?order=desc"""
+    trades = []
+    for i in range(count):
+        size = rng.choice((1, 1, 2, 3, 5, 10, 25, 50, 150))
+        trades.append({'size': size, 'price': round(rng.uniform(0.5, 15.0), 2),
+                       'sip_timestamp': now_ns - i * 60_000_000_000, 'exchange': rng.randint(1, 20)})
+    return trades
+
+
+def make_snapshot(contract, trades):
+    volume = sum(t['size'] for t in trades)
+    vwap = sum(t['size'] * t['price'] for t in trades) / volume if volume else 0
+    return {
+        'details': {key: contract[key] for key in ('ticker', 'strike_price', 'expiration_date', 'contract_type')},
+        'day': {'volume': volume, 'vwap': vwap, 'close': trades[0]['price'] if trades else 0},
+        'last_trade': trades[0] if trades else {},
+        'open_interest': 1000,
+        'implied_volatility': 0.35,
+        'greeks': {'delta': 0.5 if contract['contract_type'] == 'call' else -0.5}
+    }
+
+
+def serve_chain(stand_in, size, trades_per_contract, seed=0):
+    """
+    Register a synthetic chain, its snapshot and per-contract trades with the stand-in
+
+    The stand-in matches requests by URL, so the first pages are registered
+    under the exact strike-filtered URLs the scan will request.
+    """
+    rng = random.Random(seed)
+    now_ns = int(time.time() * 1e9)
+    chain = make_chain(size)
+
+    price_range = polygon_integration.get_price_range_multiplier(TICKER, high_performance=False)
+    filters = polygon_integration.get_strike_filters(STOCK_PRICE, price_range)
+    in_range = [c for c in chain if filters['strike_price_gte'] <= c['strike_price'] <= filters['strike_price_lte']]
+
+    snapshots = []
+    for contract in in_range:
+        trades = make_trades(rng, trades_per_contract, now_ns)
+        stand_in.add_response(f"/v3/trades/{contract['ticker']}?limit=50&order=desc", {'results': trades[:50]})
+        snapshots.append(make_snapshot(contract, trades))
+
+    def add_pages(first_url, cursor_path, items, page_size):
+        for cursor in range(0, max(len(items), 1), page_size):
+            body = {'status': 'OK', 'results': items[cursor:cursor + page_size]}
+            if cursor + page_size < len(items):
+                body['next_url'] = f"{stand_in.base_url}{cursor_path}?cursor={cursor + page_size}"
+            url = first_url if cursor == 0 else f"{cursor_path}?cursor={cursor}"
+            stand_in.add_response(url, body)
+
+    add_pages(polygon_integration.build_option_contracts_url(TICKER, **filters),
+              '/v3/reference/options/contracts', in_range, CONTRACTS_PAGE_SIZE)
+    add_pages(polygon_snapshot.build_snapshot_url(TICKER, **filters),
+              f'/v3/snapshot/options/{TICKER}', snapshots, SNAPSHOT_PAGE_SIZE)
+    stand_in.add_response(f'/v2/last/trade/{TICKER}', {'results': {'p': STOCK_PRICE}})
+    return len(in_range)
+
+
+def run_once(function, stand_in, measure_memory, warm=False):
+    """Run one uncached pass of `function` (warm keeps session-long state) and collect its metrics"""
+    cache_module.remove_from_cache(TICKER)
+    cache_module.option_quote_cache.clear()
+    if not warm:
+        cache_module.option_chain_cache.clear()
+        polygon_trades.reset_trade_state()
+    pipeline_metrics.reset_stage_timings()
+    polygon_client.circuit_breaker.reset()
+    polygon_client.concurrency = polygon_client.AdaptiveConcurrency(
+        polygon_client.INITIAL_CONCURRENCY, polygon_client.MIN_CONCURRENCY, polygon_client.MAX_CONCURRENCY)
+    requests_before = len(stand_in.request_log)
+    bytes_before = stand_in.bytes_served
+
+    if measure_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        result = function(TICKER)
+    wall = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1] if measure_memory else 0
+    if measure_memory:
+        tracemalloc.stop()
+
+    stages = pipeline_metrics.get_stage_timings()
+    analyzed = result.get('all_options_analyzed') if isinstance(result, dict) else None
+    return {
+        'wall_seconds': round(wall, 4),
+        'stages': {name: round(stages.get(name, {}).get('seconds', 0.0), 6) for name in pipeline_metrics.STAGES},
+        'peak_memory_mb': round(peak / 1e6, 2),
+        'requests': len(stand_in.request_log) - requests_before,
+        'response_kb': round((stand_in.bytes_served - bytes_before) / 1024, 1),
+        'options_analyzed': analyzed
+    }
+
+
+def run_benchmark(sizes, trades_per_contract, mode, latency=0.0, rps=1000.0, measure_memory=True):
+    """
+    Benchmark the scan, an incremental refresh and the summary for each chain size
+
+    Args:
+        sizes: Chain sizes (number of contracts) to test
+        trades_per_contract: Trades generated for every near-money contract
+        mode: 'snapshot' or 'trades' ingestion (see polygon_snapshot.INGESTION_MODE)
+        latency: Seconds of latency the stand-in adds to every request
+        rps: Token bucket rate for the run (high by default so the pipeline,
+            not the plan's budget, is measured)
+        measure_memory: Track peak Python memory with tracemalloc (adds overhead)
+
+    Returns:
+        List of result dictionaries, one per (size, function)
+    """
+    original_mode = polygon_snapshot.INGESTION_MODE
+    original_cache_file, original_cache_db = cache_module.CACHE_FILE, cache_module.CACHE_DB
+    polygon_snapshot.INGESTION_MODE = mode
+    cache_module.CACHE_FILE = os.path.join(tempfile.gettempdir(), 'benchmark_cache.pickle')
+    cache_module.CACHE_DB = os.path.join(tempfile.gettempdir(), 'benchmark_cache.db')
+    polygon_client.rate_limiter.configure(rate=rps, burst=max(1, int(rps)))
+
+    results = []
+    try:
+        for size in sizes:
+            with PolygonStandIn(latency=latency) as stand_in:
+                near_money = serve_chain(stand_in, size, trades_per_contract)
+                with use_base_url(stand_in.base_url):
+                    for name, function, warm in (
+                            ('scan', polygon_integration.get_unusual_options_activity, False),
+                            ('refresh', polygon_integration.get_unusual_options_activity, True),
+                            ('summary', polygon_integration.get_simplified_unusual_activity_summary, False)):
+                        result = run_once(function, stand_in, measure_memory, warm)
+                        result.update({'function': name, 'chain_size': size, 'near_money': near_money,
+                                       'trades_per_contract': trades_per_contract, 'mode': mode,
+                                       'latency': latency})
+                        results.append(result)
+    finally:
+        cache_module.remove_from_cache(TICKER)
+        polygon_trades.reset_trade_state()
+        cache_module.clear_chain_caches()
+        for path in (cache_module.CACHE_FILE, cache_module.CACHE_DB,
+                     cache_module.CACHE_DB + '-wal', cache_module.CACHE_DB + '-shm'):
+            if os.path.exists(path):
+                os.remove(path)
+        cache_module.CACHE_FILE, cache_module.CACHE_DB = original_cache_file, original_cache_db
+        polygon_snapshot.INGESTION_MODE = original_mode
+        polygon_client.rate_limiter.configure(rate=polygon_client.RATE_LIMIT_RPS, burst=polygon_client.RATE_LIMIT_BURST)
+    return results
+
+
+def print_report(results):
+    stage_headers = ''.join(f"{name[:12]:>13}" for name in pipeline_metrics.STAGES)
+    print(f"{'function':<9}{'size':>7}{'near':>7}{'wall s':>9}{stage_headers}{'peak MB':>9}{'requests':>10}{'resp KB':>10}")
+    for r in results:
+        stage_values = ''.join(f"{r['stages'][name]:>13.3f}" for name in pipeline_metrics.STAGES)
+        print(f"{r['function']:<9}{r['chain_size']:>7}{r['near_money']:>7}{r['wall_seconds']:>9.3f}"
+              f"{stage_values}{r['peak_memory_mb']:>9.1f}{r['requests']:>10}{r['response_kb']:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the unusual activity pipeline on synthetic chains")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 5000, 20000])
+    parser.add_argument('--trades', type=int, default=20, help="Trades per contract")
+    parser.add_argument('--mode', choices=['snapshot', 'trades'], default=polygon_snapshot.INGESTION_MODE)
+    parser.add_argument('--latency', type=float, default=0.0, help="Seconds added to every stand-in response")
+    parser.add_argument('--rps', type=float, default=1000.0, help="Token bucket rate during the run")
+    parser.add_argument('--no-memory', action='store_true', help="Skip tracemalloc (lower overhead)")
+    parser.add_argument('--json', help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    results = run_benchmark(args.sizes, args.trades, args.mode, args.latency, args.rps, not args.no_memory)
+    print_report(results)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'python': sys.version.split()[0], 'run_at': datetime.now().isoformat(timespec='seconds'),
+                       'results': results}, f, indent=2)
+        print(f"Wrote {len(results)} results to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,25 +2,80 @@
 Centralized cache module for OptionsWizard
 All caches that need to persist across multiple function calls should be stored here
 
-The cache implements a market-hours aware expiration strategy:
-- During market hours (9:30am-4:15pm ET, weekdays): 5-minute expiration
-- Outside market hours and on weekends: no expiration until next market open
+The cache implements a market-hours aware expiration strategy (see trading_calendar):
+- During an NYSE session (plus 15 minutes after the close): 5-minute expiration,
+  never past the end of the session
+- Outside market hours, on weekends and holidays: no expiration until next market open
+Each entry carries a precomputed valid_until instant, so a lookup is one comparison.
+Shortly after expiring, an entry can still be served as stale while the caller
+refreshes it in the background (see lookup_cache and CACHE_STALE_GRACE).
 
-This module stores the cache in memory but also persists it to disk to make it available
-across different processes and restart instances.
+The unusual activity cache is stored through a pluggable backend (CACHE_BACKEND):
+- 'sqlite' (default): one row per ticker in a SQLite database in WAL mode, so the
+  bot and the Streamlit admin processes share entries as soon as they are written
+- 'pickle': the whole cache in memory, written to CACHE_FILE by a background
+  flusher (write-behind) or, with CACHE_WRITE_BEHIND=0, on every change
+
+Option chain data is kept in bounded in-memory TTL caches (see ttl_cache.TTLCache):
+- option_chain_cache: contract reference data, valid until the next market open
+- option_quote_cache: snapshot quotes, valid for QUOTE_CACHE_TTL seconds
 """
-from datetime import datetime, time, timedelta
-import pytz
+from collections import OrderedDict
+from datetime import datetime
 import json
+import atexit
 import os
 import pickle
+import sqlite3
+import tempfile
+import threading
+import pipeline_metrics
+import trading_calendar
+from ttl_cache import TTLCache
+
+# Dictionary to store unusual options activity cache with timestamps (pickle backend),
+# in least to most recently used order
+# Format: {ticker: {"timestamp": datetime, "valid_until": float, "size": int, "data": activity_data}}
+unusual_activity_cache = OrderedDict()
+
+# Path to persist the cache to (pickle backend, and migrated into a new SQLite database)
+CACHE_FILE = os.getenv('CACHE_FILE', 'option_wizard_cache.pickle')
+
+# Lifetime of entries created during market hours
+MARKET_HOURS_TTL = 300
+
+# Stale-while-revalidate: for CACHE_STALE_GRACE seconds after an entry expires
+# (and while it is at most MARKET_HOURS_TTL + CACHE_STALE_GRACE seconds old),
+# callers may be served the old result while a background scan refreshes it
+STALE_WHILE_REVALIDATE = os.getenv('STALE_WHILE_REVALIDATE', '1') != '0'
+CACHE_STALE_GRACE = float(os.getenv('CACHE_STALE_GRACE', '600'))
+
+# Storage backend for the unusual activity cache: 'sqlite' or 'pickle'
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'sqlite').lower()
+CACHE_DB = os.getenv('CACHE_DB', 'option_wizard_cache.db')
 
-# Dictionary to store unusual options activity cache with timestamps
-# Format: {ticker: {"timestamp": datetime, "data": activity_data}}
-unusual_activity_cache = {}
+# Limits for the unusual activity cache; least recently used entries are
+# evicted first. Entry sizes are the pickled size of their data.
+CACHE_MAX_ENTRIES = int(os.getenv('CACHE_MAX_ENTRIES', '500'))
+CACHE_MAX_BYTES = int(os.getenv('CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
 
-# Path to persist the cache to
-CACHE_FILE = 'option_wizard_cache.pickle'
+# SQLite backend: a read only rewrites an entry's last_access once it is this
+# many seconds old, so cache hits stay read-only transactions. Eviction order
+# is accurate to this resolution.
+CACHE_ACCESS_RESOLUTION = float(os.getenv('CACHE_ACCESS_RESOLUTION', '60'))
+
+# Pickle backend: changes only mark the cache dirty and a background thread
+# writes a snapshot every CACHE_FLUSH_INTERVAL seconds (and at exit)
+CACHE_WRITE_BEHIND = os.getenv('CACHE_WRITE_BEHIND', '1') != '0'
+CACHE_FLUSH_INTERVAL = float(os.getenv('CACHE_FLUSH_INTERVAL', '5'))
+
+# Guards unusual_activity_cache mutations against the flusher's snapshot
+_pickle_lock = threading.Lock()
+# Serializes snapshot writes so an older snapshot never replaces a newer one
+_flush_lock = threading.Lock()
+_dirty = threading.Event()
+_stop_flusher = threading.Event()
+_flusher = None
 
 # Load cache from disk if it exists
 def load_cache():
@@ -29,7 +84,9 @@ def load_cache():
         if os.path.exists(CACHE_FILE):
             with open(CACHE_FILE, 'rb') as f:
                 loaded_cache = pickle.load(f)
-                unusual_activity_cache = loaded_cache
+                unusual_activity_cache = OrderedDict(loaded_cache)
+                for entry in unusual_activity_cache.values():
+                    entry.setdefault("size", estimate_entry_size(entry.get("data")))
                 print(f"Loaded {len(unusual_activity_cache)} items from cache file")
                 # Print cache contents for debugging
                 # Call this after the function is fully defined
@@ -39,31 +96,296 @@ def load_cache():
     except Exception as e:
         print(f"Error loading cache: {str(e)}")
         # If there's an error loading the cache, start with an empty one
-        unusual_activity_cache = {}
+        unusual_activity_cache = OrderedDict()
 
-# Initialize by loading the cache
-load_cache()
+def estimate_entry_size(data):
+    """Estimate the memory held by a cache entry's data as its pickled size in bytes"""
+    try:
+        return len(pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return 0
+
+def select_evictions(entries, protected=None):
+    """
+    Pick the least recently used entries to drop to get within the cache limits
+    
+    Args:
+        entries: List of (ticker, size) from least to most recently used
+        protected: Ticker that must be kept (the one just written)
+        
+    Returns:
+        List of tickers to evict
+    """
+    count = len(entries)
+    total = sum(size or 0 for _, size in entries)
+    victims = []
+    for ticker, size in entries:
+        if count <= CACHE_MAX_ENTRIES and total <= CACHE_MAX_BYTES:
+            break
+        if ticker == protected:
+            continue
+        victims.append(ticker)
+        count -= 1
+        total -= size or 0
+    return victims
+
+class PickleCacheBackend:
+    """
+    The original whole-cache pickle file
+    
+    Entries live in unusual_activity_cache and changes are persisted to
+    CACHE_FILE (see mark_dirty), so it is only safe with a single process.
+    """
+    
+    def __init__(self):
+        self.evictions = 0
+    
+    def get(self, ticker):
+        with _pickle_lock:
+            entry = unusual_activity_cache.get(ticker)
+            if entry is not None:
+                unusual_activity_cache.move_to_end(ticker)
+            return entry
+    
+    def set(self, ticker, entry):
+        entry = dict(entry, size=estimate_entry_size(entry["data"]))
+        with _pickle_lock:
+            unusual_activity_cache[ticker] = entry
+            unusual_activity_cache.move_to_end(ticker)
+            victims = select_evictions(
+                [(t, e.get("size")) for t, e in unusual_activity_cache.items()], protected=ticker)
+            for victim in victims:
+                del unusual_activity_cache[victim]
+            self.evictions += len(victims)
+        mark_dirty()
+    
+    def delete(self, ticker):
+        with _pickle_lock:
+            if ticker not in unusual_activity_cache:
+                return False
+            del unusual_activity_cache[ticker]
+        mark_dirty()
+        return True
+    
+    def contains(self, ticker):
+        return ticker in unusual_activity_cache
+    
+    def entry_times(self, tickers):
+        """{ticker: (timestamp, valid_until)} for the cached tickers, without counting an access"""
+        with _pickle_lock:
+            entries = [(t, unusual_activity_cache.get(t)) for t in tickers]
+        return {t: (e["timestamp"], e.get("valid_until")) for t, e in entries if e is not None}
+    
+    def items(self):
+        return list(unusual_activity_cache.items())
+    
+    def count(self):
+        return len(unusual_activity_cache)
+    
+    def sizes(self):
+        """List of (ticker, size in bytes), largest first"""
+        with _pickle_lock:
+            sizes = [(t, e.get("size") or estimate_entry_size(e["data"])) for t, e in unusual_activity_cache.items()]
+        return sorted(sizes, key=lambda item: item[1], reverse=True)
+
+class SQLiteCacheBackend:
+    """
+    One row per ticker in a SQLite database in WAL mode
+    
+    WAL lets readers in any process run alongside a writer, and each write
+    replaces a single row, so concurrent processes never overwrite each
+    other's entries. Each thread gets its own connection. Rows record their
+    size and last access (to CACHE_ACCESS_RESOLUTION) so the LRU limits
+    hold across processes.
+    
+    Args:
+        path: Database file
+    """
+    
+    # Columns added after the first release, created on older databases
+    ADDED_COLUMNS = {'valid_until': 'REAL', 'size': 'INTEGER', 'last_access': 'REAL'}
+    
+    def __init__(self, path):
+        self.path = path
+        self.evictions = 0
+        self._local = threading.local()
+        self._connect()
+    
+    def _create_schema(self, conn):
+        with conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS unusual_activity ("
+                "ticker TEXT PRIMARY KEY, timestamp TEXT NOT NULL, valid_until REAL, "
+                "size INTEGER, last_access REAL, data BLOB)"
+            )
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(unusual_activity)")]
+            for column, column_type in self.ADDED_COLUMNS.items():
+                if column not in columns:
+                    conn.execute(f"ALTER TABLE unusual_activity ADD COLUMN {column} {column_type}")
+            conn.execute("UPDATE unusual_activity SET size = LENGTH(data) WHERE size IS NULL")
+            conn.execute("CREATE INDEX IF NOT EXISTS unusual_activity_lru ON unusual_activity (last_access)")
+    
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10.0)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            # Checked by every new connection (e.g. asyncio.to_thread workers),
+            # so a database file that was replaced is set up again
+            self._create_schema(conn)
+            self._local.conn = conn
+        return conn
+    
+    @staticmethod
+    def _to_entry(timestamp, valid_until, data):
+        return {"timestamp": datetime.fromisoformat(timestamp), "valid_until": valid_until,
+                "data": pickle.loads(data)}
+    
+    def get(self, ticker):
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT timestamp, valid_until, last_access, data FROM unusual_activity WHERE ticker = ?", (ticker,)
+        ).fetchone()
+        if row is None:
+            return None
+        timestamp, valid_until, last_access, data = row
+        now = datetime.now().timestamp()
+        # Skip the write (and its lock) while the recorded access is recent enough
+        if last_access is None or now - last_access >= CACHE_ACCESS_RESOLUTION:
+            with conn:
+                conn.execute("UPDATE unusual_activity SET last_access = ? WHERE ticker = ?", (now, ticker))
+        return self._to_entry(timestamp, valid_until, data)
+    
+    def set(self, ticker, entry):
+        data = pickle.dumps(entry["data"], protocol=pickle.HIGHEST_PROTOCOL)
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO unusual_activity "
+                "(ticker, timestamp, valid_until, size, last_access, data) VALUES (?, ?, ?, ?, ?, ?)",
+                (ticker, entry["timestamp"].isoformat(), entry.get("valid_until"), len(data),
+                 datetime.now().timestamp(), data)
+            )
+            count, total = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM unusual_activity").fetchone()
+            if count > CACHE_MAX_ENTRIES or total > CACHE_MAX_BYTES:
+                entries = conn.execute(
+                    "SELECT ticker, size FROM unusual_activity ORDER BY last_access IS NOT NULL, last_access"
+                ).fetchall()
+                victims = select_evictions(entries, protected=ticker)
+                conn.executemany("DELETE FROM unusual_activity WHERE ticker = ?", [(t,) for t in victims])
+                self.evictions += len(victims)
+    
+    def delete(self, ticker):
+        with self._connect() as conn:
+            return conn.execute("DELETE FROM unusual_activity WHERE ticker = ?", (ticker,)).rowcount > 0
+    
+    def contains(self, ticker):
+        return self._connect().execute(
+            "SELECT 1 FROM unusual_activity WHERE ticker = ?", (ticker,)
+        ).fetchone() is not None
+    
+    def entry_times(self, tickers):
+        """{ticker: (timestamp, valid_until)} for the cached tickers, without loading data or touching last_access"""
+        tickers = list(tickers)
+        if not tickers:
+            return {}
+        rows = self._connect().execute(
+            f"SELECT ticker, timestamp, valid_until FROM unusual_activity "
+            f"WHERE ticker IN ({', '.join('?' * len(tickers))})", tickers
+        ).fetchall()
+        return {ticker: (datetime.fromisoformat(timestamp), valid_until) for ticker, timestamp, valid_until in rows}
+    
+    def items(self):
+        rows = self._connect().execute(
+            "SELECT ticker, timestamp, valid_until, data FROM unusual_activity"
+        ).fetchall()
+        return [(row[0], self._to_entry(*row[1:])) for row in rows]
+    
+    def count(self):
+        return self._connect().execute("SELECT COUNT(*) FROM unusual_activity").fetchone()[0]
+    
+    def sizes(self):
+        """List of (ticker, size in bytes), largest first"""
+        return self._connect().execute(
+            "SELECT ticker, COALESCE(size, LENGTH(data)) AS bytes FROM unusual_activity ORDER BY bytes DESC"
+        ).fetchall()
+    
+    def import_pickle(self, pickle_path):
+        """Copy the entries of a pickle cache file into an empty database"""
+        if self.count() > 0 or not os.path.exists(pickle_path):
+            return 0
+        try:
+            with open(pickle_path, 'rb') as f:
+                entries = pickle.load(f)
+            for ticker, entry in entries.items():
+                self.set(ticker, entry)
+            print(f"Imported {len(entries)} items from {pickle_path} into {self.path}")
+            return len(entries)
+        except Exception as e:
+            print(f"Error importing pickle cache: {str(e)}")
+            return 0
+
+_backend = None
+_backend_config = None
+_backend_lock = threading.Lock()
+
+def get_backend():
+    """
+    Get the unusual activity cache backend for the current configuration
+    
+    The backend is rebuilt if CACHE_BACKEND or CACHE_DB changes (e.g. in tests).
+    
+    Returns:
+        SQLiteCacheBackend or PickleCacheBackend
+    """
+    global _backend, _backend_config
+    config = (CACHE_BACKEND, CACHE_DB if CACHE_BACKEND == 'sqlite' else None)
+    with _backend_lock:
+        if _backend is None or _backend_config != config:
+            if CACHE_BACKEND == 'sqlite':
+                _backend = SQLiteCacheBackend(CACHE_DB)
+                _backend.import_pickle(CACHE_FILE)
+            else:
+                load_cache()
+                _backend = PickleCacheBackend()
+            _backend_config = config
+        return _backend
+
+# Initialize the backend (loads the pickle file in pickle mode)
+try:
+    get_backend()
+except Exception as e:
+    print(f"Error initializing {CACHE_BACKEND} cache backend: {str(e)}")
 
 def is_market_open():
     """
     Check if the US stock market is currently open
     
     Returns:
-        bool: True if market is open (9:30am-4:15pm ET on weekdays), False otherwise
+        bool: True during an NYSE session (holidays and 1pm early closes
+        included), counting the 15 minutes after the close as open
     """
-    eastern = pytz.timezone('US/Eastern')
-    now = datetime.now(eastern)
-    
-    # Check if it's a weekday (0 = Monday, 4 = Friday)
-    if now.weekday() > 4:  # Saturday or Sunday
-        return False
+    return trading_calendar.is_market_open()
+
+def cache_valid_until(cache_timestamp):
+    """
+    Compute when an unusual activity entry stops being served
     
-    # Check if within market hours (9:30am - 4:15pm ET)
-    market_open = time(9, 30, 0)
-    market_close = time(16, 15, 0)
-    current_time = now.time()
+    Entries created during a session live MARKET_HOURS_TTL seconds, but not
+    past the end of that session; entries created outside market hours live
+    until the next session opens.
     
-    return market_open <= current_time <= market_close
+    Args:
+        cache_timestamp: datetime when the cache entry was created (naive = local time)
+        
+    Returns:
+        float: Expiry instant in epoch seconds
+    """
+    session_end = trading_calendar.nyse.session_end_ts(cache_timestamp)
+    if session_end is not None:
+        return min(cache_timestamp.timestamp() + MARKET_HOURS_TTL, session_end)
+    return trading_calendar.nyse.next_open_ts(cache_timestamp)
 
 def should_use_cached_data(cache_timestamp):
     """
@@ -75,114 +397,172 @@ def should_use_cached_data(cache_timestamp):
     Returns:
         bool: True if cached data should be used, False if it should be refreshed
     """
-    # Convert timestamps to Eastern Time for market hour calculations
-    eastern = pytz.timezone('US/Eastern')
-    now = datetime.now(eastern)
-    
-    # If the cache entry has no timezone info, assume it's in local time and convert
-    if cache_timestamp.tzinfo is None:
-        cache_timestamp = eastern.localize(cache_timestamp)
-    elif cache_timestamp.tzinfo != eastern:
-        cache_timestamp = cache_timestamp.astimezone(eastern)
-    
-    # During market hours: 5-minute expiration
-    if is_market_open():
-        # In market hours, cache has a 5-minute expiration
-        cache_age = (now - cache_timestamp).total_seconds()
-        
-        # For scenarios where we're explicitly testing market hours
-        # Convert timestamps to same timezone for accurate comparison
-        if now.tzinfo and cache_timestamp.tzinfo:
-            now_time = now.astimezone(eastern)
-            cache_time = cache_timestamp.astimezone(eastern)
-            
-            # If the timestamps are on same day and both during market hours
-            if (now_time.date() == cache_time.date() and 
-                time(9, 30) <= now_time.time() <= time(16, 15) and
-                time(9, 30) <= cache_time.time() <= time(16, 15)):
-                return cache_age < 300  # Less than 5 minutes old
-            
-        return cache_age < 300  # Standard 5-minute expiration
-    
-    # Get today's market close time
-    today_market_close = eastern.localize(
-        datetime.combine(now.date(), time(16, 15, 0))
-    )
-    
-    # If we're after market close today
-    if now.time() >= time(16, 15, 0) and now.weekday() <= 4:
-        # Use cache if it was created after market close
-        return cache_timestamp >= today_market_close
-    
-    # If today is Monday-Friday and we're before market open
-    if now.weekday() <= 4 and now.time() < time(9, 30, 0):
-        # Use cache if it was created after previous trading day's market close
-        
-        # Calculate previous trading day (handles weekends)
-        if now.weekday() == 0:  # Monday
-            prev_trading_day = now.date() - timedelta(days=3)  # Friday
-        else:
-            prev_trading_day = now.date() - timedelta(days=1)
-        
-        prev_market_close = eastern.localize(
-            datetime.combine(prev_trading_day, time(16, 15, 0))
-        )
-        
-        return cache_timestamp >= prev_market_close
-    
-    # If it's weekend
-    if now.weekday() >= 5:  # Saturday or Sunday
-        # Calculate last Friday
-        days_since_friday = (now.weekday() - 4) % 7
-        last_friday = now.date() - timedelta(days=days_since_friday)
-        
-        # Friday market close time
-        friday_close = eastern.localize(
-            datetime.combine(last_friday, time(16, 15, 0))
-        )
-        
-        # Check if the cache entry was created after market close on Friday
-        if cache_timestamp.date() == last_friday and cache_timestamp.time() >= time(16, 15, 0):
-            return True
-        
-        # For entries created on Saturday or Sunday, they're valid if created during the weekend
-        if cache_timestamp.weekday() >= 5:
-            return True
-            
-        # Otherwise the entry is too old (from before Friday close)
-        return False
-    
-    # Should not reach here during normal operation
-    # Fallback to 5-minute expiration
-    cache_age = (now - cache_timestamp).total_seconds()
-    return cache_age < 300
+    return datetime.now().timestamp() < cache_valid_until(cache_timestamp)
+
+def is_entry_valid(cache_entry):
+    """Check an entry against its precomputed valid_until (computed for older entries)"""
+    valid_until = cache_entry.get("valid_until")
+    if valid_until is None:
+        valid_until = cache_valid_until(cache_entry["timestamp"])
+    return datetime.now().timestamp() < valid_until
 
 def save_cache():
-    """Save the current cache to disk"""
+    """
+    Save the current cache to disk
+    
+    The snapshot is written to a temporary file in the same directory and
+    renamed over CACHE_FILE, so a crash mid-write never leaves a corrupt file.
+    """
+    temp_path = None
     try:
-        with open(CACHE_FILE, 'wb') as f:
-            pickle.dump(unusual_activity_cache, f)
-        print(f"Saved {len(unusual_activity_cache)} items to cache file")
+        with _pickle_lock:
+            snapshot = dict(unusual_activity_cache)
+        fd, temp_path = tempfile.mkstemp(prefix='.cache-', suffix='.tmp',
+                                         dir=os.path.dirname(os.path.abspath(CACHE_FILE)))
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(snapshot, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, CACHE_FILE)
+        temp_path = None
+        print(f"Saved {len(snapshot)} items to cache file")
     except Exception as e:
         print(f"Error saving cache: {str(e)}")
+    finally:
+        if temp_path and os.path.exists(temp_path):
+            os.remove(temp_path)
+
+def mark_dirty():
+    """
+    Record that the pickle cache changed
+    
+    In write-behind mode the background flusher saves it; otherwise (or
+    once close_cache has run) it is saved immediately.
+    """
+    if not CACHE_WRITE_BEHIND or _stop_flusher.is_set():
+        save_cache()
+        return
+    _dirty.set()
+    _start_flusher()
+
+def flush_cache():
+    """
+    Save the pickle cache now if it has unsaved changes
+    
+    Returns:
+        bool: True if a snapshot was written
+    """
+    with _flush_lock:
+        if not _dirty.is_set():
+            return False
+        # Cleared before the snapshot is taken, so later changes are flushed next time
+        _dirty.clear()
+        save_cache()
+        return True
+
+def _flush_loop():
+    while not _stop_flusher.is_set():
+        _dirty.wait()
+        _stop_flusher.wait(CACHE_FLUSH_INTERVAL)
+        flush_cache()
+
+def _start_flusher():
+    global _flusher
+    with _flush_lock:
+        if _flusher is None or not _flusher.is_alive():
+            _flusher = threading.Thread(target=_flush_loop, name='cache-flusher', daemon=True)
+            _flusher.start()
+
+def close_cache():
+    """Stop the background flusher and write any unsaved changes"""
+    _stop_flusher.set()
+    flush_cache()
+
+# Don't lose the last changes on shutdown
+atexit.register(close_cache)
 
 def add_to_cache(ticker, data):
     """Add data to the unusual activity cache with current timestamp"""
     timestamp = datetime.now()
-    unusual_activity_cache[ticker] = {
+    
+    # Persisted by the backend (a single row in SQLite mode)
+    get_backend().set(ticker, {
         "timestamp": timestamp,
+        "valid_until": cache_valid_until(timestamp),
         "data": data
-    }
+    })
     
     if is_market_open():
         print(f"Added {ticker} to cache (will expire in 5 minutes)")
     else:
         print(f"Added {ticker} to cache (will persist until next market open)")
+    
+def lookup_cache(ticker):
+    """
+    Look up an unusual activity entry and classify it for stale-while-revalidate
+    
+    An expired entry is 'stale' (still servable while a refresh runs) during
+    the CACHE_STALE_GRACE seconds after it expired, as long as it is no older
+    than MARKET_HOURS_TTL + CACHE_STALE_GRACE seconds. Entries carried over
+    from the previous session are therefore never served stale after the open.
+    
+    Args:
+        ticker: Stock ticker symbol
         
-    # Save cache to disk
-    save_cache()
+    Returns:
+        Tuple of (data, state, age_seconds) where state is 'fresh', 'stale' or
+        'miss' (data is None and age_seconds is None for a miss)
+    """
+    cache_entry = get_backend().get(ticker)
+    if cache_entry is None:
+        return None, 'miss', None
+    
+    now = datetime.now()
+    cache_age = (now - cache_entry["timestamp"]).total_seconds()
+    if is_entry_valid(cache_entry):
+        return cache_entry["data"], 'fresh', cache_age
     
-def get_from_cache(ticker):
+    valid_until = cache_entry.get("valid_until")
+    if valid_until is None:
+        valid_until = cache_valid_until(cache_entry["timestamp"])
+    if (now.timestamp() < valid_until + CACHE_STALE_GRACE
+            and cache_age <= MARKET_HOURS_TTL + CACHE_STALE_GRACE):
+        return cache_entry["data"], 'stale', cache_age
+    return None, 'miss', cache_age
+
+def get_entry_times_batch(tickers):
+    """
+    Get when unusual activity entries were created and when they expire
+    
+    Only the timestamps are read: the cached results aren't unpickled and
+    the lookups don't count as accesses for LRU eviction.
+    
+    Args:
+        tickers: Stock ticker symbols
+        
+    Returns:
+        Dictionary of {ticker: (created, valid_until)} in epoch seconds for the cached tickers
+    """
+    times = {}
+    for ticker, (timestamp, valid_until) in get_backend().entry_times(tickers).items():
+        if valid_until is None:
+            valid_until = cache_valid_until(timestamp)
+        times[ticker] = (timestamp.timestamp(), valid_until)
+    return times
+
+def get_entry_times(ticker):
+    """
+    Get when an unusual activity entry was created and when it expires
+    
+    Args:
+        ticker: Stock ticker symbol
+        
+    Returns:
+        Tuple of (created, valid_until) in epoch seconds, or None if not cached
+    """
+    return get_entry_times_batch([ticker]).get(ticker)
+
+def get_from_cache(ticker, allow_stale=False):
     """
     Get data from the unusual activity cache if it exists and is not expired
     Uses market-hours aware caching strategy:
@@ -191,55 +571,91 @@ def get_from_cache(ticker):
     
     Args:
         ticker: Stock ticker symbol
+        allow_stale: Also return entries within the stale grace window (see lookup_cache)
         
     Returns:
         Tuple of (data, found) where found is a boolean indicating if the cache was used
     """
-    if ticker in unusual_activity_cache:
-        cache_entry = unusual_activity_cache[ticker]
-        cache_timestamp = cache_entry["timestamp"]
-        cache_age = (datetime.now() - cache_timestamp).total_seconds()
-        
-        # Check if we should use the cached data based on market hours
-        if should_use_cached_data(cache_timestamp):
-            market_status = "open" if is_market_open() else "closed"
-            print(f"Using cached unusual activity data for {ticker} ({cache_age:.1f} seconds old, market {market_status})")
-            if cache_entry["data"]:
-                print(f"Cache contains {len(cache_entry['data'])} items")
-            else:
-                print(f"Cache contains empty or None data")
-            return cache_entry["data"], True
+    data, state, cache_age = lookup_cache(ticker)
+    if state == 'fresh':
+        pipeline_metrics.record_cache_hit(cache_age)
+        market_status = "open" if is_market_open() else "closed"
+        print(f"Using cached unusual activity data for {ticker} ({cache_age:.1f} seconds old, market {market_status})")
+        if data:
+            print(f"Cache contains {len(data)} items")
         else:
-            if is_market_open():
-                print(f"Cached data for {ticker} is stale ({cache_age:.1f} seconds old), refreshing...")
-            else:
-                print(f"Cached data for {ticker} is from before market close, refreshing...")
-            return None, False
-    else:
+            print(f"Cache contains empty or None data")
+        return data, True
+    if state == 'stale' and allow_stale:
+        pipeline_metrics.record_stale_serve(cache_age)
+        print(f"Using stale unusual activity data for {ticker} ({cache_age:.1f} seconds old)")
+        return data, True
+    pipeline_metrics.record_cache_miss()
+    if cache_age is None:
         print(f"No cache entry found for {ticker}")
-        return None, False
+    elif is_market_open():
+        print(f"Cached data for {ticker} is stale ({cache_age:.1f} seconds old), refreshing...")
+    else:
+        print(f"Cached data for {ticker} is from before market close, refreshing...")
+    return None, False
         
 def cache_contains(ticker):
     """Check if ticker is in the cache"""
-    return ticker in unusual_activity_cache
+    return get_backend().contains(ticker)
     
 def get_cache_size():
     """Get the number of items in the cache"""
-    return len(unusual_activity_cache)
+    return get_backend().count()
     
 def print_cache_contents():
-    """Print contents of the cache for debugging"""
+    """
+    Print contents of the cache for debugging
+    
+    Walks every entry, so keep it off the request path; use
+    pipeline_metrics.get_cache_metrics() for hit rates.
+    """
     market_status = "open" if is_market_open() else "closed"
-    print(f"Cache contains {len(unusual_activity_cache)} items (market is {market_status}):")
-    for ticker, entry in unusual_activity_cache.items():
+    entries = get_backend().items()
+    print(f"Cache contains {len(entries)} items (market is {market_status}):")
+    for ticker, entry in entries:
         timestamp = entry["timestamp"]
         age = (datetime.now() - timestamp).total_seconds()
         data = entry["data"]
         data_desc = f"{len(data)} items" if isinstance(data, list) else "None"
-        valid = should_use_cached_data(timestamp)
+        valid = is_entry_valid(entry)
         status = "VALID" if valid else "EXPIRED"
         print(f"  {ticker}: {age:.1f} seconds old, {data_desc} - {status}")
         
+def get_cache_report(top=10):
+    """
+    Summarize the size of the unusual activity cache for the admin dashboard
+    
+    Args:
+        top: Number of largest entries to list
+        
+    Returns:
+        Dictionary with backend, entries, bytes, max_entries, max_bytes,
+        evictions (by this process), largest [(ticker, bytes)],
+        chain_caches (see get_chain_cache_stats) and trade_state (see
+        polygon_trades.get_trade_state_stats)
+    """
+    # Imported here so the cache backends never load the Polygon client
+    import polygon_trades
+    
+    backend = get_backend()
+    sizes = backend.sizes()
+    return {
+        'backend': CACHE_BACKEND,
+        'entries': len(sizes),
+        'bytes': sum(size or 0 for _, size in sizes),
+        'max_entries': CACHE_MAX_ENTRIES,
+        'max_bytes': CACHE_MAX_BYTES,
+        'evictions': backend.evictions,
+        'largest': [(ticker, size) for ticker, size in sizes[:top]],
+        'chain_caches': get_chain_cache_stats(),
+        'trade_state': polygon_trades.get_trade_state_stats()
+    }
+
 def remove_from_cache(ticker):
     """
     Remove a specific ticker from the cache
@@ -250,11 +666,64 @@ def remove_from_cache(ticker):
     Returns:
         bool: True if ticker was in cache and removed, False otherwise
     """
-    if ticker in unusual_activity_cache:
-        del unusual_activity_cache[ticker]
-        save_cache()
+    if get_backend().delete(ticker):
         print(f"Removed {ticker} from cache")
         return True
     else:
         print(f"{ticker} not found in cache")
-        return False
\ No newline at end of file
+        return False
+
+# Contract reference data (strikes, expirations) only changes between sessions.
+# Full listings of large chains run to megabytes, so the total is bounded too.
+OPTION_CHAIN_CACHE_SIZE = int(os.getenv('OPTION_CHAIN_CACHE_SIZE', '256'))
+OPTION_CHAIN_CACHE_BYTES = int(os.getenv('OPTION_CHAIN_CACHE_BYTES', str(32 * 1024 * 1024)))
+option_chain_cache = TTLCache(OPTION_CHAIN_CACHE_SIZE, max_bytes=OPTION_CHAIN_CACHE_BYTES,
+                              sizeof=estimate_entry_size)
+
+# Snapshot quotes (volume, last trade, greeks) go stale within seconds
+QUOTE_CACHE_TTL = 15
+QUOTE_CACHE_SIZE = int(os.getenv('QUOTE_CACHE_SIZE', '64'))
+option_quote_cache = TTLCache(QUOTE_CACHE_SIZE, default_ttl=QUOTE_CACHE_TTL)
+
+def get_cached_option_chain(key):
+    """
+    Get cached contract reference data
+    
+    Args:
+        key: Key built by the caller from the ticker and request filters
+        
+    Returns:
+        Tuple of (contracts, found)
+    """
+    return option_chain_cache.get(key)
+
+def cache_option_chain(key, contracts):
+    """Cache contract reference data until the next market open"""
+    option_chain_cache.set(key, contracts, expires_at=trading_calendar.nyse.next_open_ts())
+
+def get_cached_option_quotes(key):
+    """
+    Get a cached options snapshot
+    
+    Returns:
+        Tuple of (snapshot contracts, found)
+    """
+    return option_quote_cache.get(key)
+
+def cache_option_quotes(key, snapshots):
+    """Cache an options snapshot for QUOTE_CACHE_TTL seconds"""
+    option_quote_cache.set(key, snapshots)
+
+def clear_chain_caches():
+    """Drop all cached contract listings and snapshot quotes"""
+    option_chain_cache.clear()
+    option_quote_cache.clear()
+
+def get_chain_cache_stats():
+    """
+    Get hit/miss counters for the option chain caches
+    
+    Returns:
+        Dictionary with 'option_chain' and 'option_quote' stats (see TTLCache.stats)
+    """
+    return {'option_chain': option_chain_cache.stats(), 'option_quote': option_quote_cache.stats()}
@@ -9,18 +9,39 @@ import option_calculator
 import unusual_activity
 from datetime import datetime
 import utils_file
+import prewarm_scheduler
+import scenario_grid
 
 def load_config():
     """Load configuration from file"""
     with open('config.json', 'r') as f:
         return json.load(f)
 
+# Option price estimates are off in production; set PRICE_ESTIMATES_ENABLED=1 to answer them
+PRICE_ESTIMATES_ENABLED = os.getenv('PRICE_ESTIMATES_ENABLED', '0') == '1'
+
+# Intent keywords, matched anywhere in the upper-cased message (so CALLS counts as CALL)
+PRICE_KEYWORDS = frozenset({'PRICE', 'ESTIMATE', 'CALCULATE', 'WORTH', 'VALUE'})
+ACTIVITY_KEYWORDS = frozenset({'UNUSUAL', 'ACTIVITY', 'VOLUME', 'FLOW'})
+OPTION_KEYWORDS = frozenset({'CALL', 'PUT', 'BOTH'})
+KEYWORD_PATTERN = re.compile('|'.join(sorted(PRICE_KEYWORDS | ACTIVITY_KEYWORDS | OPTION_KEYWORDS)))
+
+# Candidate tickers: standalone 1-5 letter words ($NVDA matches as NVDA)
+WORD_PATTERN = re.compile(r'\b[A-Z]{1,5}\b')
+TARGET_PATTERN = re.compile(r'(?:TARGET|PRICE|REACHES?|HITS?)\s+(?:\$?)(\d+(?:\.\d+)?)')
+STRIKE_PATTERN = re.compile(r'(?:STRIKE|AT)\s+(?:\$?)(\d+(?:\.\d+)?)')
+EXPIRATION_PATTERN = re.compile(r'(?:EXPIR(?:Y|ING|ES|ATION)|DATED?)\s+(\d{1,2}[/-]\d{1,2}(?:[/-]\d{2,4})?)')
+ISO_DATE_PATTERN = re.compile(r'(\d{4}-\d{2}-\d{2})')
+
 class OptionsBotNLP:
     """Natural language processor for options trading queries"""
     
     def __init__(self):
         self.common_words = []
         self.load_common_words()
+        self.common_words = frozenset(self.common_words)
+        # Load the known tickers now rather than while parsing the first message
+        utils_file.get_ticker_universe()
     
     def load_common_words(self):
         """Load common English words that should be ignored when processing tickers"""
@@ -56,8 +77,16 @@ class OptionsBotNLP:
             self.common_words = ["THE", "AND", "FOR", "PUT", "CALL", "WHAT", "HOW", "WHY"]
     
     def parse_query(self, query):
-        """Parse a natural language query for options trading parameters"""
+        """
+        Parse a natural language query for options trading parameters
+        
+        One pass of precompiled patterns finds the intent keywords and the
+        candidate tickers; tickers are then checked with in-memory set lookups.
+        Only when no candidate is a known ticker are unknown words validated
+        over the network (see extract_ticker).
+        """
         query = query.upper()
+        keywords = set(KEYWORD_PATTERN.findall(query))
         
         # Default result structure
         result = {
@@ -70,53 +99,39 @@ class OptionsBotNLP:
         }
         
         # Detect basic intents
-        if any(phrase in query for phrase in ['PRICE', 'ESTIMATE', 'CALCULATE', 'WORTH', 'VALUE']):
+        if keywords & PRICE_KEYWORDS:
             result['intent'] = 'price'
-        elif any(phrase in query for phrase in ['UNUSUAL', 'ACTIVITY', 'VOLUME', 'FLOW']):
+        elif keywords & ACTIVITY_KEYWORDS:
             result['intent'] = 'unusual_activity'
             # Check if query is asking for both call and put unusual activity
-            if 'BOTH' in query or ('CALL' in query and 'PUT' in query):
+            if 'BOTH' in keywords or ('CALL' in keywords and 'PUT' in keywords):
                 result['intent'] = 'unusual_activity_both'
         
-        # Extract ticker symbol
-        # First pass: look for standalone words that aren't common words
-        words = re.findall(r'\b[A-Z]{1,5}\b', query)
-        potential_tickers = [w for w in words if w not in self.common_words and len(w) <= 5]
-        
-        # Second pass: if first pass found nothing, look for $ prefixed tickers
-        if not potential_tickers:
-            dollar_tickers = re.findall(r'\$([A-Z]{1,5})\b', query)
-            potential_tickers = [t for t in dollar_tickers if t not in self.common_words]
-        
-        # Validate tickers and use the first valid one found
-        for ticker in potential_tickers:
-            if utils_file.is_valid_ticker(ticker):
-                result['ticker'] = ticker
-                break
+        result['ticker'] = self.extract_ticker(query)
         
         # Extract option type
-        if 'CALL' in query and 'PUT' not in query:
+        if 'CALL' in keywords and 'PUT' not in keywords:
             result['option_type'] = 'call'
-        elif 'PUT' in query and 'CALL' not in query:
+        elif 'PUT' in keywords and 'CALL' not in keywords:
             result['option_type'] = 'put'
         
         # Extract target price
-        price_match = re.search(r'(?:TARGET|PRICE|REACHES?|HITS?)\s+(?:\$?)(\d+(?:\.\d+)?)', query)
+        price_match = TARGET_PATTERN.search(query)
         if price_match:
             result['target_price'] = float(price_match.group(1))
         
         # Extract strike price
-        strike_match = re.search(r'(?:STRIKE|AT)\s+(?:\$?)(\d+(?:\.\d+)?)', query)
+        strike_match = STRIKE_PATTERN.search(query)
         if strike_match:
             result['strike'] = float(strike_match.group(1))
         
         # Extract expiration date
-        exp_date_match = re.search(r'(?:EXPIR(?:Y|ING|ES|ATION)|DATED?)\s+(\d{1,2}[/-]\d{1,2}(?:[/-]\d{2,4})?)', query)
+        exp_date_match = EXPIRATION_PATTERN.search(query)
         if exp_date_match:
             result['expiration'] = exp_date_match.group(1)
         else:
             # Look for date in format YYYY-MM-DD
-            date_match = re.search(r'(\d{4}-\d{2}-\d{2})', query)
+            date_match = ISO_DATE_PATTERN.search(query)
             if date_match:
                 result['expiration'] = date_match.group(1)
             else:
@@ -126,6 +141,31 @@ class OptionsBotNLP:
                     result['expiration'] = relative_date
         
         return result
+    
+    def extract_ticker(self, query):
+        """
+        Find the ticker in an upper-cased query
+        
+        The first candidate word that is a known ticker wins. Unknown words
+        (never validated or rejected) are only looked up if no candidate is known.
+        
+        Returns:
+            Ticker symbol or None
+        """
+        unknown = []
+        for word in WORD_PATTERN.findall(query):
+            if word in self.common_words:
+                continue
+            known = utils_file.check_known_ticker(word)
+            if known:
+                return word
+            if known is None and word not in unknown:
+                unknown.append(word)
+        
+        for word in unknown:
+            if utils_file.is_valid_ticker(word):
+                return word
+        return None
 
 class OptionsBot(commands.Bot):
     """Discord bot for options trading analysis"""
@@ -137,11 +177,25 @@ class OptionsBot(commands.Bot):
         
         self.nlp = OptionsBotNLP()
         self.permissions = utils_file.load_permissions()
+        self.prewarm = None
+        
+    async def close(self):
+        """Close the shared Polygon HTTP session along with the bot"""
+        import async_polygon_client
+        if self.prewarm:
+            await self.prewarm.stop()
+        await async_polygon_client.close_async_session()
+        await super().close()
         
     async def on_ready(self):
         """Called when the bot is ready"""
         print(f"Logged in as {self.user} ({self.user.id})")
         print("------")
+        
+        # Keep watchlist tickers warm in the cache (on_ready also fires on reconnects)
+        if prewarm_scheduler.PREWARM_ENABLED and os.getenv('POLYGON_API_KEY') and self.prewarm is None:
+            self.prewarm = prewarm_scheduler.PrewarmScheduler()
+            self.prewarm.start()
     
     async def on_message(self, message):
         """Handle incoming messages"""
@@ -190,6 +244,9 @@ class OptionsBot(commands.Bot):
                 await message.channel.send(f"Added channel to whitelist.")
             else:
                 await message.channel.send(f"Channel is already whitelisted.")
+        elif 'cache stats' in content.lower() and 'admin_users' in self.permissions and str(message.author.id) in self.permissions['admin_users']:
+            # Admin command to show cache hit rates and refresh times
+            await self.handle_cache_stats_request(message)
         elif parsed['ticker']:
             # If we have a ticker but no recognized intent, provide helpful message
             await message.channel.send(f"I recognized the ticker {parsed['ticker']}, but I'm not sure what to do with it. Try asking about unusual options activity.")
@@ -203,9 +260,57 @@ class OptionsBot(commands.Bot):
             # Fallback for unrecognized queries
             await message.channel.send("I couldn't understand that request. Please include a valid ticker symbol and ask about unusual options activity.")
     
+    async def handle_cache_stats_request(self, message):
+        """Handle the admin "cache stats" command"""
+        import cache_module
+        import pipeline_metrics
+        
+        report = cache_module.get_cache_report(top=0)
+        stats = pipeline_metrics.format_cache_metrics(pipeline_metrics.get_cache_metrics(top=5))
+        await message.channel.send(f"**Cache stats**\n```\n{stats}\n"
+                                   f"Entries: {report['entries']} ({report['bytes'] / 1024:.0f} KB, backend {report['backend']})\n"
+                                   f"Trade state: {report['trade_state']['trades']} / {report['trade_state']['max_trades']} trades "
+                                   f"in {report['trade_state']['contracts']} contracts\n```")
+    
     async def handle_price_request(self, message, parsed):
-        """Handle option price estimation requests - currently disabled"""
-        await message.channel.send("Option price estimation is currently disabled. Please try the unusual options activity feature instead.")
+        """Handle option price estimation requests (disabled unless PRICE_ESTIMATES_ENABLED=1)"""
+        if not PRICE_ESTIMATES_ENABLED:
+            await message.channel.send("Option price estimation is currently disabled. Please try the unusual options activity feature instead.")
+            return
+        
+        expiration = option_calculator.normalize_expiration(parsed['expiration'])
+        if not parsed['strike'] or not expiration:
+            await message.channel.send(f"To price an option I need a strike and an expiration. Try something like: `@{self.user.name} price AAPL call at 200 expiring 6/20`")
+            return
+        
+        option_type = parsed['option_type'] or 'call'
+        try:
+            # Chain download and vectorized pricing run off the event loop
+            quote = await asyncio.to_thread(option_calculator.get_option_quote,
+                                            parsed['ticker'], option_type, parsed['strike'], expiration)
+        except Exception as e:
+            await message.channel.send(f"I couldn't price that option: {str(e)}")
+            return
+        
+        lines = [f"**{quote['ticker']} ${quote['strike']:.2f} {option_type} expiring {quote['expiration']}**"]
+        if quote['warning']:
+            lines.append(quote['warning'])
+        lines.append(f"Last price: ${quote['price']:.2f} (stock ${quote['current_price']:.2f}, IV {quote['implied_volatility']:.1%})")
+        lines.append(f"Delta {quote['delta']:.3f} | Gamma {quote['gamma']:.4f} | Theta {quote['theta']:.3f}/day | Vega {quote['vega']:.3f} | Rho {quote['rho']:.3f}")
+        volatility = option_calculator.option_volatility(quote['current_price'], quote['strike'], quote,
+                                                         quote['days_to_expiration'], option_type)
+        if parsed['target_price'] and volatility is not None:
+            # One repricing call for today, halfway and expiration
+            grid = scenario_grid.build_scenario_grid(quote['current_price'], quote['strike'], quote['days_to_expiration'],
+                                                     volatility, option_type, entry_price=quote['price'],
+                                                     prices=[parsed['target_price']],
+                                                     days=scenario_grid.date_range(quote['days_to_expiration'], 3),
+                                                     vol_shocks=[0.0])
+            lines.append(f"Estimated value with the stock at ${parsed['target_price']:.2f}:")
+            for day, value, pnl in zip(grid['days'], grid['values'][0, :, 0], grid['pnl'][0, :, 0]):
+                when = "now" if day == 0 else "at expiration" if day >= quote['days_to_expiration'] else f"in {int(day)} days"
+                lines.append(f"• {when}: ${value:.2f} ({pnl:+,.0f} per contract)")
+        await message.reply("\n".join(lines))
     
 
     
@@ -232,12 +337,10 @@ class OptionsBot(commands.Bot):
             # First send a message indicating we're processing the request
             processing_msg = await message.channel.send(f"Processing unusual options activity for {parsed['ticker']}... This may take a moment.")
             
-            # Use run_in_executor to run the function in a background thread
+            # Run the scan natively on the bot's event loop (no thread pool needed)
             # Always use high-performance mode for Discord bot to ensure faster responses
-            loop = asyncio.get_event_loop()
-            response_text = await loop.run_in_executor(
-                None,
-                lambda: unusual_activity.get_simplified_unusual_activity_summary(parsed['ticker'], high_performance=True)
+            response_text = await unusual_activity.get_simplified_unusual_activity_summary_async(
+                parsed['ticker'], high_performance=True
             )
             
             # Delete the processing message once we have the results
@@ -387,12 +490,10 @@ class OptionsBot(commands.Bot):
         # First send a message indicating we're processing the request
         processing_msg = await message.channel.send(f"Processing unusual options activity for {parsed['ticker']} (both calls & puts)... This may take a moment.")
         
-        # Run the intensive operation in a separate thread to prevent blocking the bot
-        loop = asyncio.get_event_loop()
+        # Run the scan natively on the bot's event loop (no thread pool needed)
         try:
-            response_text = await loop.run_in_executor(
-                None,
-                lambda: unusual_activity.get_simplified_unusual_activity_summary(parsed['ticker'], high_performance=True)
+            response_text = await unusual_activity.get_simplified_unusual_activity_summary_async(
+                parsed['ticker'], high_performance=True
             )
         except Exception as e:
             print(f"Error with Polygon unusual activity summary: {str(e)}")
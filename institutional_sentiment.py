@@ -14,16 +14,85 @@ import time
 import random
 from datetime import datetime, timedelta
 import numpy as np
-from math import log, sqrt, exp
-from scipy.stats import norm
 import pandas as pd
 
+import option_pricing
+
 # Constants for analysis
 MAX_HEDGE_TIME_WINDOW = 3600  # 1 hour in seconds (increased from 10 minutes for Polygon API data)
 TYPICAL_HEDGE_RATIO = 0.5  # Typical size ratio for hedging trades (50% match - relaxed from 80%)
 DEEP_OTM_THRESHOLD = 0.2  # 20% OTM is considered "deep"
 MIN_HEDGE_SIZE = 3  # Minimum contract size to consider for hedge detection (reduced from 5)
 CLUSTER_WINDOW = 7200  # 2 hours in seconds for clustering trades
+DEFAULT_VOLATILITY = 0.3  # Used only for trades whose price can't be inverted
+
+def _trade_arrays(option_trades, stock_price):
+    """Strikes, years to expiration, call flags and spot prices of the trades as arrays"""
+    strikes = np.array([trade.get('strike_price', 0) or 0 for trade in option_trades], dtype=float)
+    years = option_pricing.years_to_expiration([trade.get('days_to_expiration', 30) for trade in option_trades])
+    is_call = np.array([trade.get('contract_type', '').lower() == 'call' for trade in option_trades], dtype=bool)
+    
+    # If no stock price provided, estimate based on option type
+    if stock_price:
+        spots = np.full(len(option_trades), float(stock_price))
+    else:
+        spots = strikes * np.where(is_call, 1.02, 0.98)
+    return strikes, years, is_call, spots
+
+def solve_trade_volatilities(option_trades, stock_price):
+    """
+    Fill in the implied volatility of trades that don't carry one, solving
+    all of them from their trade prices in one vectorized call
+    
+    Trades whose price can't be inverted (no stock price, price outside the
+    no-arbitrage bounds) get DEFAULT_VOLATILITY; every solved trade is
+    flagged with iv_converged.
+    
+    Args:
+        option_trades: List of option trade dictionaries (updated in place)
+        stock_price: Current stock price
+        
+    Returns:
+        Number of trades whose implied volatility didn't converge
+    """
+    missing = [trade for trade in option_trades if not trade.get('implied_volatility')]
+    if not missing:
+        return 0
+    
+    strikes, years, is_call, spots = _trade_arrays(missing, stock_price)
+    if stock_price:
+        prices = np.array([trade.get('price', 0) or 0 for trade in missing], dtype=float)
+        vols, converged = option_pricing.implied_volatility(prices, spots, strikes, years,
+                                                            option_pricing.RISK_FREE_RATE, is_call)
+    else:
+        vols, converged = np.full(len(missing), np.nan), np.zeros(len(missing), dtype=bool)
+    
+    for trade, vol, solved in zip(missing, vols, converged):
+        trade['implied_volatility'] = float(vol) if solved else DEFAULT_VOLATILITY
+        trade['iv_converged'] = bool(solved)
+    return int(len(missing) - converged.sum())
+
+def calculate_option_deltas(option_trades, stock_price=None):
+    """
+    Calculate the Black-Scholes deltas of many options in one vectorized call
+    
+    Args:
+        option_trades: List of option trade dictionaries
+        stock_price: Current stock price (if not provided, uses strike * 0.98 for puts, strike * 1.02 for calls)
+        
+    Returns:
+        Array of delta values between 0-1 (absolute values)
+    """
+    strikes, years, is_call, spots = _trade_arrays(option_trades, stock_price)
+    vols = np.array([trade.get('implied_volatility') or DEFAULT_VOLATILITY for trade in option_trades], dtype=float)
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        deltas = np.abs(np.atleast_1d(option_pricing.black_scholes(
+            spots, strikes, years, vols, option_pricing.RISK_FREE_RATE, is_call)['delta']))
+    
+    # Fallback for contracts the formula can't handle (e.g. a zero strike)
+    in_the_money = np.where(is_call, spots > strikes, spots < strikes)
+    return np.where(np.isfinite(deltas), deltas, in_the_money.astype(float))
 
 def calculate_option_delta(option_data, stock_price=None):
     """
@@ -36,43 +105,7 @@ def calculate_option_delta(option_data, stock_price=None):
     Returns:
         Delta value between 0-1 (absolute value)
     """
-    # Extract option parameters
-    strike = option_data.get('strike_price', 0)
-    days_to_expiration = option_data.get('days_to_expiration', 30)
-    option_type = option_data.get('contract_type', '').lower()
-    
-    # If no stock price provided, estimate based on option type
-    if not stock_price:
-        stock_price = strike * 1.02 if option_type == 'call' else strike * 0.98
-    
-    # Use reasonable defaults for volatility and interest rate if not available
-    volatility = option_data.get('implied_volatility', 0.3)
-    risk_free_rate = 0.05
-    
-    # Convert days to years
-    time_to_expiration = days_to_expiration / 365.0
-    
-    # Avoid division by zero or negative time
-    if time_to_expiration <= 0:
-        return 1.0 if option_type == 'call' and stock_price > strike else 0.0
-    
-    # Calculate d1 from Black-Scholes
-    try:
-        d1 = (log(stock_price / strike) + (risk_free_rate + 0.5 * volatility**2) * time_to_expiration) / (volatility * sqrt(time_to_expiration))
-        
-        # Calculate delta
-        if option_type == 'call':
-            delta = norm.cdf(d1)
-        else:  # put
-            delta = -norm.cdf(-d1)
-    except (ValueError, ZeroDivisionError):
-        # Fallback for calculation errors
-        if option_type == 'call':
-            delta = 1.0 if stock_price > strike else 0.0
-        else:
-            delta = -1.0 if stock_price < strike else 0.0
-    
-    return abs(delta)  # Return absolute value for consistent comparison
+    return float(calculate_option_deltas([option_data], stock_price)[0])
 
 def detect_hedging_pairs(options_trades):
     """
@@ -347,9 +380,12 @@ def calculate_enhanced_sentiment_score(option_trades, stock_price):
                 if 'put' in strategy and isinstance(strategy['put'], dict) and 'id' in strategy['put']:
                     excluded_trades.add(strategy['put']['id'])
     
+    # Delta for every trade at once (directional exposure)
+    deltas = calculate_option_deltas(option_trades, stock_price) if option_trades else []
+    
     # Process each trade that isn't part of a hedge or spread
     directional_trades = []
-    for trade in option_trades:
+    for trade, delta in zip(option_trades, deltas):
         # Skip trades that are part of hedging or strategies
         trade_id = trade.get('id', '')
         if trade_id in excluded_trades:
@@ -364,9 +400,6 @@ def calculate_enhanced_sentiment_score(option_trades, stock_price):
         contracts = trade.get('size', 0)
         premium = trade.get('price', 0) * contracts * 100  # Convert to total premium
         
-        # Calculate delta for this option
-        delta = calculate_option_delta(trade, stock_price)
-        
         # Weight by delta (directional exposure)
         delta_weighted_contracts = contracts * delta
         
@@ -492,6 +525,11 @@ def analyze_institutional_sentiment(option_trades, stock_price):
         
         print(f"Analyzing {len(option_trades)} trades for institutional sentiment")
         
+        # Real volatilities for delta weighting, solved from the trade prices
+        unconverged = solve_trade_volatilities(option_trades, stock_price)
+        if unconverged:
+            print(f"Implied volatility didn't converge for {unconverged} trades, using {DEFAULT_VOLATILITY:.0%}")
+        
         # Calculate enhanced sentiment metrics
         sentiment = calculate_enhanced_sentiment_score(option_trades, stock_price)
         
@@ -565,7 +603,8 @@ def analyze_institutional_sentiment(option_trades, stock_price):
             'clustering': {
                 'largest_cluster': largest_cluster,
                 'cluster_pct': cluster_pct
-            }
+            },
+            'iv_unconverged': unconverged
         }
         
         # Log analysis results
@@ -3,8 +3,28 @@ import pandas as pd
 import numpy as np
 from datetime import datetime, date, timedelta
 import math
-from scipy.stats import norm
+import re
 from calculate_dynamic_theta_decay import project_theta_decay
+import american_pricing
+import option_pricing
+import scenario_grid
+import volatility_surface
+from ttl_cache import TTLCache
+from technical_analysis import parse_expiry
+
+# Downloaded Yahoo chains (calls and puts) by (ticker, expiration) and spot
+# prices by ticker. The Greeks tables and volatility surfaces below are built
+# from these, so each expiration is downloaded once per CHAIN_GREEKS_TTL.
+CHAIN_GREEKS_TTL = 60
+yahoo_chain_cache = TTLCache(128, default_ttl=CHAIN_GREEKS_TTL)
+spot_price_cache = TTLCache(64, default_ttl=CHAIN_GREEKS_TTL)
+
+# Option chains with model Greeks by (ticker, expiration, type), so changing
+# the strike on the calculator page doesn't refetch or reprice the chain
+chain_greeks_cache = TTLCache(64, default_ttl=CHAIN_GREEKS_TTL)
+
+# Volatility surfaces by ticker, refreshed with the chains they were built from
+volatility_surface_cache = TTLCache(32, default_ttl=CHAIN_GREEKS_TTL)
 
 # Create a copy of the function in this file if the import fails
 def format_ticker_local(ticker):
@@ -130,9 +150,164 @@ def get_option_chain(stock, expiration_date, option_type):
         # For other errors, return empty DataFrame
         return pd.DataFrame()  # Return empty DataFrame on other errors
 
+def get_dividend_yield(stock):
+    """
+    Trailing annual dividend yield of a stock as a fraction (0.01 = 1%)
+    
+    Args:
+        stock: yfinance Ticker object
+    
+    Returns:
+        Dividend yield, 0.0 if unknown
+    """
+    try:
+        return float(stock.info.get('trailingAnnualDividendYield') or 0.0)
+    except Exception:
+        return 0.0
+
+def fetch_option_chain(stock, expiration_date):
+    """
+    Get a ticker's Yahoo chain for one expiration, downloading it at most once per CHAIN_GREEKS_TTL
+    
+    Args:
+        stock: yfinance Ticker object
+        expiration_date: string in format 'YYYY-MM-DD'
+    
+    Returns:
+        The yfinance option chain (calls and puts)
+    """
+    key = (stock.ticker.upper(), expiration_date)
+    chain, found = yahoo_chain_cache.get(key)
+    if not found:
+        chain = stock.option_chain(expiration_date)
+        yahoo_chain_cache.set(key, chain)
+    return chain
+
+def get_spot_price(stock):
+    """
+    Current price of a ticker, cached for CHAIN_GREEKS_TTL seconds like its chains
+    
+    Args:
+        stock: yfinance Ticker object
+    
+    Returns:
+        Current stock price
+    """
+    ticker = stock.ticker.upper()
+    price, found = spot_price_cache.get(ticker)
+    if not found:
+        price = stock.info.get('currentPrice')
+        if price is None:
+            price = stock.history(period='1d')['Close'].iloc[-1]
+        spot_price_cache.set(ticker, price)
+    return price
+
+def get_chain_greeks(stock, expiration_date, option_type):
+    """
+    Get an option chain with Black-Scholes Greeks for every strike
+    
+    The chain is fetched once and priced in one vectorized call (see
+    option_pricing.chain_greeks); results are cached for CHAIN_GREEKS_TTL seconds.
+    Strikes without a usable Yahoo implied volatility get one solved from
+    their mid or last price. price_american holds the Bjerksund-Stensland
+    American value of each contract.
+    
+    Args:
+        stock: yfinance Ticker object
+        expiration_date: string in format 'YYYY-MM-DD'
+        option_type: 'call' or 'put'
+    
+    Returns:
+        Tuple of (chain DataFrame with Greeks columns, current stock price)
+    """
+    key = (stock.ticker.upper(), expiration_date, option_type.lower())
+    cached, found = chain_greeks_cache.get(key)
+    if found:
+        return cached
+    
+    current_price = get_spot_price(stock)
+    options = fetch_option_chain(stock, expiration_date)
+    chain = options.calls if option_type.lower() == 'call' else options.puts
+    
+    # Greeks some data sources provide are kept in place of the model values
+    market_greeks = [name for name in ('delta', 'gamma', 'theta', 'vega') if name in chain.columns]
+    provided = chain[market_greeks].rename(columns=lambda name: f"market_{name}")
+    
+    today = datetime.now().date()
+    expiry = datetime.strptime(expiration_date, '%Y-%m-%d').date()
+    days_to_expiration = (expiry - today).days
+    
+    # Yahoo leaves placeholder vols on illiquid strikes; solve those from the quotes
+    chain = option_pricing.chain_implied_volatility(chain.drop(columns=market_greeks), current_price,
+                                                    days_to_expiration, option_type.lower())
+    placeholder = ~(chain['impliedVolatility'] >= option_pricing.MIN_QUOTED_IV) & chain['iv_converged']
+    chain.loc[placeholder, 'impliedVolatility'] = chain.loc[placeholder, 'iv_solved']
+    
+    priced = option_pricing.chain_greeks(chain, current_price, days_to_expiration, option_type.lower())
+    
+    # Listed equity options are American: early exercise value for deep ITM puts and dividend payers
+    priced['price_american'] = american_pricing.bjerksund_stensland(
+        current_price, priced['strike'].to_numpy(dtype=float),
+        option_pricing.years_to_expiration(days_to_expiration), priced['impliedVolatility'].to_numpy(dtype=float),
+        option_type=option_type.lower(), dividend_yield=get_dividend_yield(stock))
+    priced = priced.join(provided)
+    result = (priced, current_price)
+    chain_greeks_cache.set(key, result)
+    return result
+
+def get_volatility_surface(stock):
+    """
+    Get the implied volatility surface of a ticker (see volatility_surface)
+    
+    The surface is built from the nearest chains in yahoo_chain_cache (only
+    expirations not fetched yet are downloaded, and get_chain_greeks reuses
+    them) and cached for CHAIN_GREEKS_TTL seconds, so pricing other strikes
+    or dates in that window is array interpolation.
+    
+    Args:
+        stock: yfinance Ticker object
+    
+    Returns:
+        VolatilitySurface, or None if the chains have no usable vols
+    """
+    ticker = stock.ticker.upper()
+    surface, found = volatility_surface_cache.get(ticker)
+    if found:
+        return surface
+    
+    try:
+        surface = volatility_surface.build_surface(
+            stock, option_chain=lambda expiration: fetch_option_chain(stock, expiration), spot=get_spot_price(stock))
+    except Exception as e:
+        print(f"Error building volatility surface for {ticker}: {str(e)}")
+        surface = None
+    volatility_surface_cache.set(ticker, surface)
+    return surface
+
+def get_cached_volatility_surface(ticker):
+    """
+    Get a ticker's volatility surface only if one is already cached
+    
+    For request paths (stop-loss, bot replies) that must never start the
+    multi-expiration download a new surface needs.
+    
+    Args:
+        ticker: Stock ticker symbol
+    
+    Returns:
+        VolatilitySurface, or None if none is cached
+    """
+    surface, _ = volatility_surface_cache.get(ticker.upper())
+    return surface
+
+def clear_chain_caches():
+    """Drop all cached chains, spot prices, Greeks tables and volatility surfaces"""
+    for cache in (yahoo_chain_cache, spot_price_cache, chain_greeks_cache, volatility_surface_cache):
+        cache.clear()
+
 def get_option_greeks(stock, expiration_date, strike_price, option_type):
     """
-    Calculate option Greeks (Delta, Gamma, Theta, Vega) using the Black-Scholes model.
+    Calculate option Greeks (Delta, Gamma, Theta, Vega, Rho) using the Black-Scholes model.
     
     Args:
         stock: yfinance Ticker object or None
@@ -149,164 +324,164 @@ def get_option_greeks(stock, expiration_date, strike_price, option_type):
             print("No ticker object provided for Greeks calculation")
             return None
             
-        # Get current stock price
-        try:
-            current_price = stock.info.get('currentPrice', stock.history(period='1d')['Close'].iloc[-1])
-        except Exception as e:
-            print(f"Error getting current price: {e}")
-            return None
-        
-        # Get option chain to find implied volatility
-        options = stock.option_chain(expiration_date)
-        
-        if option_type.lower() == 'call':
-            chain = options.calls
-        else:
-            chain = options.puts
+        chain, current_price = get_chain_greeks(stock, expiration_date, option_type)
         
         # Find the option with the given strike price
         option = chain[chain['strike'] == strike_price]
         
         if option.empty:
             return None
+        row = option.iloc[0]
         
-        # Extract parameters
-        implied_volatility = option['impliedVolatility'].iloc[0]
-        
-        # Calculate days to expiration
-        today = datetime.now().date()
-        expiry = datetime.strptime(expiration_date, '%Y-%m-%d').date()
-        days_to_expiration = (expiry - today).days
-        time_to_expiration = days_to_expiration / 365.0  # Convert to years
-        
-        # Use a risk-free rate (1-year Treasury Bill rate is approximately 5% as of writing)
-        risk_free_rate = 0.05
-        
-        # Calculate d1 and d2 for Black-Scholes
-        d1 = (np.log(current_price / strike_price) + (risk_free_rate + 0.5 * implied_volatility ** 2) * time_to_expiration) / (implied_volatility * np.sqrt(time_to_expiration))
-        d2 = d1 - implied_volatility * np.sqrt(time_to_expiration)
-        
-        # Calculate Greeks
-        if option_type.lower() == 'call':
-            delta = norm.cdf(d1)
-            gamma = norm.pdf(d1) / (current_price * implied_volatility * np.sqrt(time_to_expiration))
-            theta = -((current_price * norm.pdf(d1) * implied_volatility) / (2 * np.sqrt(time_to_expiration))) - risk_free_rate * strike_price * np.exp(-risk_free_rate * time_to_expiration) * norm.cdf(d2)
-            vega = current_price * np.sqrt(time_to_expiration) * norm.pdf(d1) * 0.01  # Multiply by 0.01 to get the impact of a 1% change in volatility
-        else:  # put option
-            delta = norm.cdf(d1) - 1
-            gamma = norm.pdf(d1) / (current_price * implied_volatility * np.sqrt(time_to_expiration))
-            theta = -((current_price * norm.pdf(d1) * implied_volatility) / (2 * np.sqrt(time_to_expiration))) + risk_free_rate * strike_price * np.exp(-risk_free_rate * time_to_expiration) * norm.cdf(-d2)
-            vega = current_price * np.sqrt(time_to_expiration) * norm.pdf(d1) * 0.01
-        
-        # Using the actual option price to adjust the Greek calculations
-        option_price = option['lastPrice'].iloc[0]
-        
-        # Attempt to get more accurate Greeks from the market data
-        try:
-            options = stock.option_chain(expiration_date)
-            if option_type.lower() == 'call':
-                chain = options.calls
-            else:
-                chain = options.puts
-                
-            exact_option = chain[chain['strike'] == strike_price]
-            
-            if not exact_option.empty:
-                # Some brokers provide these values
-                if 'delta' in exact_option.columns:
-                    delta = exact_option['delta'].iloc[0]
-                if 'gamma' in exact_option.columns:
-                    gamma = exact_option['gamma'].iloc[0]
-                if 'theta' in exact_option.columns:
-                    theta = exact_option['theta'].iloc[0]
-                if 'vega' in exact_option.columns:
-                    vega = exact_option['vega'].iloc[0]
-        except:
-            # If fetching exact Greeks fails, continue with calculated values
-            pass
+        greeks = {}
+        for name in ('delta', 'gamma', 'theta', 'vega'):
+            # Some brokers provide these values
+            market_value = row.get(f"market_{name}")
+            greeks[name] = market_value if market_value is not None and not pd.isna(market_value) else row[name]
         
         return {
-            'delta': delta,
-            'gamma': gamma,
-            'theta': theta / 365.0,  # Convert to daily theta
-            'vega': vega,
-            'implied_volatility': implied_volatility,
-            'price': option_price  # Add the option price to the return dictionary
+            **greeks,  # theta is daily
+            'rho': row['rho'],
+            'implied_volatility': row['impliedVolatility'],
+            'price': row['lastPrice']  # Add the option price to the return dictionary
         }
     except Exception as e:
         print(f"Error calculating Greeks: {str(e)}")
-        # Provide reasonable default values based on option type
-        if option_type.lower() == 'call':
-            return {
-                'error': 'Unable to retrieve market data for this option',
-                'data_available': False
-            }
-        else:
-            return {
-                'error': 'Unable to retrieve market data for this option',
-                'data_available': False
-            }
+        return {
+            'error': 'Unable to retrieve market data for this option',
+            'data_available': False
+        }
+
+def normalize_expiration(expiration, today=None):
+    """
+    Turn a parsed expiration ('2025-06-20', '6/20', '6/20/25', ...) into 'YYYY-MM-DD'
+    
+    Month/day without a year means the next such date (this year or next).
+    
+    Args:
+        expiration: Expiration text from a query
+        today: Date to resolve a missing year against (defaults to today)
+    
+    Returns:
+        'YYYY-MM-DD' string, or None if the text isn't a date
+    """
+    if not expiration:
+        return None
+    text = expiration.strip()
+    month_day = re.match(r'^(\d{1,2})[/-](\d{1,2})$', text)
+    if month_day:
+        today = today or datetime.now().date()
+        try:
+            candidate = date(today.year, int(month_day.group(1)), int(month_day.group(2)))
+            if candidate < today:
+                candidate = date(today.year + 1, candidate.month, candidate.day)
+        except ValueError:
+            return None
+        return candidate.strftime('%Y-%m-%d')
+    parsed = parse_expiry(text)
+    return parsed.strftime('%Y-%m-%d') if parsed else None
 
-def calculate_option_price(current_price, target_price, strike_price, greeks, days_to_expiration, option_type):
+def get_option_quote(ticker_symbol, option_type, strike_price, expiration_date):
     """
-    Estimate the future option price based on a target stock price using the option Greeks.
+    Price one contract from its chain's vectorized Greeks (used by the Discord bot)
+    
+    Args:
+        ticker_symbol: Stock ticker symbol
+        option_type: 'call' or 'put'
+        strike_price: Requested strike (the closest listed strike is used)
+        expiration_date: Requested expiration 'YYYY-MM-DD' (the closest listed one is used)
+    
+    Returns:
+        Dictionary with ticker, option_type, strike, expiration, days_to_expiration,
+        current_price, price, implied_volatility, delta, gamma, theta (daily),
+        vega, rho and warning (None or a note about a substituted expiration)
+    
+    Raises:
+        ValueError: If the ticker has no options or no contracts for the expiration
+    """
+    stock = yf.Ticker(format_ticker(ticker_symbol))
+    expiration, warning = handle_expiration_date_validation(expiration_date, stock)
+    if expiration is None:
+        raise ValueError(warning)
+    
+    chain, current_price = get_chain_greeks(stock, expiration, option_type)
+    if chain.empty:
+        raise ValueError(f"No {option_type} contracts listed for {expiration}")
+    row = chain.iloc[(chain['strike'] - strike_price).abs().argmin()]
+    
+    days_to_expiration = (datetime.strptime(expiration, '%Y-%m-%d').date() - datetime.now().date()).days
+    return {
+        'ticker': stock.ticker,
+        'option_type': option_type,
+        'strike': float(row['strike']),
+        'expiration': expiration,
+        'days_to_expiration': days_to_expiration,
+        'current_price': float(current_price),
+        'price': float(row['lastPrice']),
+        'implied_volatility': float(row['impliedVolatility']),
+        'delta': float(row['delta']),
+        'gamma': float(row['gamma']),
+        'theta': float(row['theta']),
+        'vega': float(row['vega']),
+        'rho': float(row['rho']),
+        'warning': warning
+    }
+
+def option_volatility(current_price, strike_price, greeks, days_to_expiration, option_type):
+    """
+    Volatility to reprice an option with: the quoted implied volatility, or
+    one solved from the option price when no usable quote is available
+    
+    Returns:
+        Volatility, or None if neither is available
+    """
+    volatility = greeks.get('implied_volatility')
+    if volatility is not None and volatility >= option_pricing.MIN_QUOTED_IV:
+        return float(volatility)
+    
+    price = greeks.get('price', 0)
+    if not price:
+        return None
+    volatility, converged = option_pricing.implied_volatility(
+        price, current_price, strike_price, option_pricing.years_to_expiration(days_to_expiration),
+        option_type=option_type)
+    return volatility if converged else None
+
+def calculate_option_price(current_price, target_price, strike_price, greeks, days_to_expiration, option_type,
+                           days_held=0):
+    """
+    Estimate the future option price based on a target stock price.
+    
+    The option is fully repriced with Black-Scholes at the target price and
+    date (see scenario_grid), keeping its implied volatility, instead of
+    being extrapolated from its Greeks.
     
     Args:
         current_price: Current stock price
         target_price: Target stock price
         strike_price: Option strike price
-        greeks: Dictionary with option Greeks
+        greeks: Dictionary with option Greeks (implied_volatility and price are used)
         days_to_expiration: Number of days to option expiration
         option_type: 'call' or 'put'
+        days_held: Days from now until the target is reached (0 = right away)
     
     Returns:
         Estimated option price at the target stock price
     """
     try:
-        if not greeks:
-            # If Greeks aren't available, use intrinsic value calculation
-            if option_type.lower() == 'call':
-                intrinsic_value = max(0, target_price - strike_price)
-                return intrinsic_value
-            else:
-                intrinsic_value = max(0, strike_price - target_price)
-                return intrinsic_value
-        
-        # We don't have a ticker, so skip trying to get option chain data
-        stock = None
-        expiry_date = (datetime.now() + timedelta(days=days_to_expiration)).strftime('%Y-%m-%d')
-        # Don't try to get option data without a valid ticker
-        
-        # We don't have a valid ticker object, so estimate the current option price using intrinsic value
-        current_option_price = greeks.get('price', 0)
-        if current_option_price == 0:
-            # Fallback if price not in greeks dictionary
+        volatility = option_volatility(current_price, strike_price, greeks, days_to_expiration,
+                                       option_type.lower()) if greeks else None
+        if volatility is None:
+            # Without a volatility only the intrinsic value can be estimated
             if option_type.lower() == 'call':
-                current_option_price = max(0, current_price - strike_price)
+                return max(0, target_price - strike_price)
             else:
-                current_option_price = max(0, strike_price - current_price)
-        
-        # Calculate price change using Greeks
-        delta = greeks.get('delta', 0)
-        gamma = greeks.get('gamma', 0)
-        theta = greeks.get('theta', 0)
-        
-        # Calculate price change due to stock price movement
-        price_change = delta * (target_price - current_price)
+                return max(0, strike_price - target_price)
         
-        # Add adjustment for convexity (gamma)
-        gamma_adjustment = 0.5 * gamma * (target_price - current_price) ** 2
-        
-        # Add adjustment for time decay (theta)
-        theta_adjustment = theta * days_to_expiration
-        
-        # Calculate estimated option price
-        estimated_price = current_option_price + price_change + gamma_adjustment + theta_adjustment
-        
-        # Ensure the option price is never negative
-        estimated_price = max(0, estimated_price)
-        
-        return estimated_price
+        grid = scenario_grid.build_scenario_grid(current_price, strike_price, days_to_expiration, volatility,
+                                                 option_type.lower(), prices=[target_price], days=[days_held],
+                                                 vol_shocks=[0.0])
+        return float(grid['values'][0, 0, 0])
     except Exception as e:
         print(f"Error calculating option price: {str(e)}")
         # Fallback to intrinsic value calculation
@@ -392,17 +567,11 @@ def get_option_price(ticker_symbol, option_type, strike_price, expiration_date):
             returns = np.log(hist_data['Close'] / hist_data['Close'].shift(1))
             volatility = returns.std() * np.sqrt(252)  # Annualized volatility
             
-            # Simple Black-Scholes approximation
-            T = days_to_expiration / 365.0
-            r = 0.05  # Risk-free rate
-            
-            d1 = (np.log(current_price / strike_price) + (r + 0.5 * volatility**2) * T) / (volatility * np.sqrt(T))
-            d2 = d1 - volatility * np.sqrt(T)
-            
-            if option_type.lower() == 'call':
-                price = current_price * norm.cdf(d1) - strike_price * np.exp(-r * T) * norm.cdf(d2)
-            else:
-                price = strike_price * np.exp(-r * T) * norm.cdf(-d2) - current_price * norm.cdf(-d1)
+            # American approximation (Bjerksund-Stensland), including the dividend yield
+            price = american_pricing.bjerksund_stensland(current_price, strike_price,
+                                                         option_pricing.years_to_expiration(days_to_expiration),
+                                                         volatility, option_type=option_type.lower(),
+                                                         dividend_yield=get_dividend_yield(stock))
                 
             return max(0.05, price)
             
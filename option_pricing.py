@@ -0,0 +1,295 @@
+"""
+Vectorized Black-Scholes pricing and Greeks for whole option chains
+
+Every input may be a scalar or a NumPy array; arrays are broadcast together,
+so one call prices every strike of a chain (or a grid of scenarios). The
+formulas are the ones option_calculator used per strike:
+- theta is per year (divide by DAYS_PER_YEAR for daily theta)
+- vega is per 1 point of volatility (0.01), rho per 1 point of rate
+
+Contracts with no time or no volatility left are valued at intrinsic value,
+with a 0/1 delta and zero gamma, theta, vega and rho.
+
+implied_volatility inverts prices the same way: a safeguarded Newton
+iteration runs on every contract at once, and the few contracts still
+unresolved after IV_MAX_ITERATIONS (usually deep ITM/OTM, where vega
+vanishes) are finished with Brent's method on their remaining bracket.
+"""
+import numpy as np
+from scipy.optimize import brentq
+from scipy.special import ndtr
+
+# Risk-free rate used across the app (roughly the 1-year Treasury Bill rate)
+RISK_FREE_RATE = 0.05
+
+# Calendar days per year for time to expiration and daily theta
+DAYS_PER_YEAR = 365.0
+
+# Implied volatility search range and stopping rules
+IV_MIN = 1e-4
+IV_MAX = 5.0
+IV_TOLERANCE = 1e-10  # in volatility units
+IV_MAX_ITERATIONS = 20
+
+# Yahoo reports placeholder vols (0.00001, ...) for illiquid strikes
+MIN_QUOTED_IV = 0.01
+
+_SQRT_2PI = np.sqrt(2.0 * np.pi)
+
+
+def is_call_array(option_type):
+    """
+    Normalize option types to a boolean array (True for calls)
+
+    Args:
+        option_type: bool or 'call'/'put' (any case), scalar or array-like
+
+    Returns:
+        Boolean ndarray
+    """
+    types = np.asarray(option_type)
+    if types.dtype.kind in 'USO':
+        return np.char.lower(types.astype(str)) == 'call'
+    return types.astype(bool)
+
+
+def years_to_expiration(days):
+    """Convert calendar days to expiration into years"""
+    return np.asarray(days, dtype=float) / DAYS_PER_YEAR
+
+
+def _norm_pdf(x):
+    return np.exp(-0.5 * x * x) / _SQRT_2PI
+
+
+def _unwrap(values):
+    """Return Python floats for scalar inputs, arrays otherwise"""
+    return {name: (float(value) if value.ndim == 0 else value) for name, value in values.items()}
+
+
+def black_scholes(spot, strike, time, vol, rate=RISK_FREE_RATE, option_type='call', dividend_yield=0.0):
+    """
+    Price European options and compute their Greeks
+
+    Args:
+        spot: Underlying price(s)
+        strike: Strike price(s)
+        time: Time to expiration in years
+        vol: Annualized volatility (0.30 = 30%)
+        rate: Continuously compounded risk-free rate
+        option_type: 'call'/'put' or booleans (True = call), scalar or array
+        dividend_yield: Continuous dividend yield
+
+    Returns:
+        Dictionary with price, delta, gamma, theta, vega and rho, each a float
+        for scalar inputs or an array of the broadcast shape
+    """
+    spot, strike, time, vol, rate, dividend_yield = np.broadcast_arrays(
+        *(np.asarray(x, dtype=float) for x in (spot, strike, time, vol, rate, dividend_yield)))
+    is_call = np.broadcast_to(is_call_array(option_type), spot.shape)
+
+    live = (time > 0) & (vol > 0)
+    # Placeholders where the option has expired keep the formulas finite
+    t = np.where(live, time, 1.0)
+    sigma = np.where(live, vol, 1.0)
+    sqrt_t = np.sqrt(t)
+
+    d1 = (np.log(spot / strike) + (rate - dividend_yield + 0.5 * sigma ** 2) * t) / (sigma * sqrt_t)
+    d2 = d1 - sigma * sqrt_t
+    pdf_d1 = _norm_pdf(d1)
+    spot_discount = np.exp(-dividend_yield * t)
+    strike_discount = np.exp(-rate * t)
+
+    # Calls use N(d), puts N(-d) with the signs flipped
+    sign = np.where(is_call, 1.0, -1.0)
+    n1 = ndtr(sign * d1)
+    n2 = ndtr(sign * d2)
+
+    price = sign * (spot * spot_discount * n1 - strike * strike_discount * n2)
+    delta = sign * spot_discount * n1
+    gamma = spot_discount * pdf_d1 / (spot * sigma * sqrt_t)
+    theta = (-(spot * spot_discount * pdf_d1 * sigma) / (2 * sqrt_t)
+             - sign * rate * strike * strike_discount * n2
+             + sign * dividend_yield * spot * spot_discount * n1)
+    vega = spot * spot_discount * sqrt_t * pdf_d1 * 0.01
+    rho = sign * strike * t * strike_discount * n2 * 0.01
+
+    intrinsic = np.maximum(sign * (spot - strike), 0.0)
+    expired_delta = np.where(intrinsic > 0, sign, 0.0)
+    return _unwrap({
+        'price': np.where(live, price, intrinsic),
+        'delta': np.where(live, delta, expired_delta),
+        'gamma': np.where(live, gamma, 0.0),
+        'theta': np.where(live, theta, 0.0),
+        'vega': np.where(live, vega, 0.0),
+        'rho': np.where(live, rho, 0.0),
+    })
+
+
+def black_scholes_price(spot, strike, time, vol, rate=RISK_FREE_RATE, option_type='call', dividend_yield=0.0):
+    """European option price(s) (see black_scholes)"""
+    return black_scholes(spot, strike, time, vol, rate, option_type, dividend_yield)['price']
+
+
+def chain_greeks(chain, spot, days_to_expiration, option_type, rate=RISK_FREE_RATE):
+    """
+    Compute Greeks for every contract of a yfinance option chain at once
+
+    Args:
+        chain: DataFrame with 'strike' and 'impliedVolatility' columns
+        spot: Current underlying price
+        days_to_expiration: Calendar days to expiration
+        option_type: 'call' or 'put'
+        rate: Risk-free rate
+
+    Returns:
+        Copy of the chain with price_model, delta, gamma, theta (daily),
+        vega and rho columns added
+    """
+    result = chain.copy()
+    greeks = black_scholes(spot, result['strike'].to_numpy(dtype=float),
+                           years_to_expiration(days_to_expiration),
+                           result['impliedVolatility'].to_numpy(dtype=float), rate, option_type)
+    result['price_model'] = greeks['price']
+    result['delta'] = greeks['delta']
+    result['gamma'] = greeks['gamma']
+    result['theta'] = greeks['theta'] / DAYS_PER_YEAR
+    result['vega'] = greeks['vega']
+    result['rho'] = greeks['rho']
+    return result
+
+
+def implied_volatility(price, spot, strike, time, rate=RISK_FREE_RATE, option_type='call', dividend_yield=0.0):
+    """
+    Solve for the volatilities that reproduce the given option prices
+
+    Newton steps are taken on all contracts together, each one kept inside
+    a [low, high] bracket that shrinks on every evaluation; a step that
+    would leave the bracket is replaced by bisection. Contracts left after
+    IV_MAX_ITERATIONS are solved one by one with Brent's method.
+
+    Args:
+        price: Option price(s) to invert (mid or last)
+        spot: Underlying price(s)
+        strike: Strike price(s)
+        time: Time to expiration in years
+        rate: Continuously compounded risk-free rate
+        option_type: 'call'/'put' or booleans (True = call), scalar or array
+        dividend_yield: Continuous dividend yield
+
+    Returns:
+        Tuple of (volatilities, converged). Contracts that can't be solved
+        (expired, price outside the no-arbitrage bounds, vol above IV_MAX)
+        get NaN and converged False.
+    """
+    price, spot, strike, time, rate, dividend_yield = np.broadcast_arrays(
+        *(np.asarray(x, dtype=float) for x in (price, spot, strike, time, rate, dividend_yield)))
+    is_call = np.broadcast_to(is_call_array(option_type), price.shape)
+    vols = np.full(price.shape, np.nan)
+    converged = np.zeros(price.shape, dtype=bool)
+
+    # No-arbitrage bounds: above intrinsic value, below the spot (calls) or discounted strike (puts)
+    forward_spot = spot * np.exp(-dividend_yield * time)
+    discounted_strike = strike * np.exp(-rate * time)
+    lower = np.maximum(np.where(is_call, forward_spot - discounted_strike, discounted_strike - forward_spot), 0.0)
+    upper = np.where(is_call, forward_spot, discounted_strike)
+    solvable = np.isfinite(price) & (time > 0) & (price > lower) & (price < upper)
+
+    # By put-call parity an ITM option's time value is the price of the OTM
+    # option at the same strike, which is what gets solved: it has no
+    # intrinsic value to drown the precision of deep ITM prices
+    index = np.flatnonzero(solvable)
+    target = (price - lower).ravel()[index]
+    s, k, t, r, q = (x.ravel()[index] for x in (spot, strike, time, rate, dividend_yield))
+    call = (forward_spot <= discounted_strike).ravel()[index]
+
+    keep = target <= black_scholes_price(s, k, t, IV_MAX, r, call, q)
+    index, target, s, k, t, r, q, call = (x[keep] for x in (index, target, s, k, t, r, q, call))
+    low = np.full(index.size, IV_MIN)
+    high = np.full(index.size, IV_MAX)
+
+    # Start from the Manaster-Koehler guess, or Brenner-Subrahmanyam near the money
+    moneyness = np.abs(np.log(s / k) + (r - q) * t)
+    sigma = np.sqrt(2.0 * moneyness / t)
+    sigma = np.where(sigma > 0.05, sigma, target / s * np.sqrt(2.0 * np.pi / t))
+    sigma = np.clip(sigma, IV_MIN, IV_MAX)
+
+    flat_vols, flat_converged = vols.reshape(-1), converged.reshape(-1)
+    active = np.arange(index.size)
+    for _ in range(IV_MAX_ITERATIONS):
+        if not active.size:
+            break
+        greeks = black_scholes(s[active], k[active], t[active], sigma[active], r[active], call[active], q[active])
+        model = greeks['price']
+        error = model - target[active]
+
+        # Tighten the bracket around the root
+        too_high = error > 0
+        high[active] = np.where(too_high, sigma[active], high[active])
+        low[active] = np.where(too_high, low[active], sigma[active])
+
+        # Newton on log prices converges quickly even far in the wings,
+        # where prices (and vega) are exponentially small
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+            step = sigma[active] - np.log(model / target[active]) * model / (greeks['vega'] * 100.0)
+        inside = np.isfinite(step) & (step >= low[active]) & (step <= high[active])
+        new_sigma = np.where(inside, step, 0.5 * (low[active] + high[active]))
+        new_sigma = np.where(error == 0, sigma[active], new_sigma)
+
+        done = (error == 0) | (np.abs(new_sigma - sigma[active]) < IV_TOLERANCE) | \
+               (high[active] - low[active] < IV_TOLERANCE)
+        sigma[active] = new_sigma
+        finished = active[done]
+        flat_vols[index[finished]] = sigma[finished]
+        flat_converged[index[finished]] = True
+        active = active[~done]
+
+    # Brent fallback on whatever is left, inside the bracket Newton narrowed down
+    for i in active:
+        def pricing_error(vol):
+            return black_scholes_price(s[i], k[i], t[i], vol, r[i], call[i], q[i]) - target[i]
+        try:
+            flat_vols[index[i]] = brentq(pricing_error, low[i], high[i], xtol=IV_TOLERANCE)
+            flat_converged[index[i]] = True
+        except ValueError:
+            pass
+
+    if vols.ndim == 0:
+        return float(vols), bool(converged)
+    return vols, converged
+
+
+def market_prices(chain):
+    """
+    Prices to invert for a yfinance chain: the bid/ask mid where both sides
+    are quoted, the last trade otherwise
+    """
+    price = chain['lastPrice'].to_numpy(dtype=float)
+    if 'bid' in chain.columns and 'ask' in chain.columns:
+        bid = chain['bid'].to_numpy(dtype=float)
+        ask = chain['ask'].to_numpy(dtype=float)
+        quoted = (bid > 0) & (ask >= bid)
+        price = np.where(quoted, 0.5 * (bid + ask), price)
+    return price
+
+
+def chain_implied_volatility(chain, spot, days_to_expiration, option_type, rate=RISK_FREE_RATE):
+    """
+    Solve implied volatility for every contract of a yfinance chain at once
+
+    Args:
+        chain: DataFrame with 'strike' and 'lastPrice' (and optionally 'bid'/'ask') columns
+        spot: Current underlying price
+        days_to_expiration: Calendar days to expiration
+        option_type: 'call' or 'put'
+        rate: Risk-free rate
+
+    Returns:
+        Copy of the chain with iv_solved and iv_converged columns added
+    """
+    result = chain.copy()
+    vols, converged = implied_volatility(market_prices(result), spot, result['strike'].to_numpy(dtype=float),
+                                         years_to_expiration(days_to_expiration), rate, option_type)
+    result['iv_solved'] = vols
+    result['iv_converged'] = converged
+    return result
@@ -3,7 +3,8 @@ import yfinance as yf
 import pandas as pd
 import numpy as np
 import datetime
-from option_calculator import calculate_option_price, get_option_chain, get_option_greeks
+from option_calculator import calculate_option_price, get_option_chain, get_option_greeks, get_chain_greeks, get_volatility_surface
+from scenario_grid import DEFAULT_VOL_SHOCKS, build_scenario_grid, grid_slice, price_range
 from technical_analysis import get_support_levels, get_stop_loss_recommendation
 from unusual_activity import get_unusual_options_activity
 from utils_file import validate_inputs, format_ticker
@@ -154,7 +155,8 @@ try:
                     "Delta": f"{greeks['delta']:.4f}",
                     "Gamma": f"{greeks['gamma']:.4f}",
                     "Theta": f"{greeks['theta']:.4f}",
-                    "Vega": f"{greeks['vega']:.4f}"
+                    "Vega": f"{greeks['vega']:.4f}",
+                    "Rho": f"{greeks['rho']:.4f}"
                 }
                 greeks_df = pd.DataFrame(list(greeks_data.items()), columns=["Greek", "Value"])
                 st.table(greeks_df)
@@ -166,11 +168,21 @@ try:
                 - **Gamma:** Rate of change of Delta with respect to underlying price
                 - **Theta:** Option price decay per day
                 - **Vega:** Sensitivity to changes in implied volatility
+                - **Rho:** Sensitivity to a 1% change in interest rates
                 """)
+                
+                # Greeks for the whole chain come from the same cached, vectorized pricing
+                with st.expander("Greeks for all strikes"):
+                    chain_greeks, _ = get_chain_greeks(stock, expiration_date, option_type.lower())
+                    st.dataframe(chain_greeks[['strike', 'lastPrice', 'price_american', 'impliedVolatility', 'delta', 'gamma', 'theta', 'vega', 'rho']]
+                                 .set_index('strike').round(4))
             else:
                 st.warning("Greeks data not available for this option")
         
         with estimate_col:
+            # When the target should be reached
+            days_held = st.slider("Days Until Target Is Reached", 0, max(days_to_expiration, 1), 0)
+            
             # Calculate estimated option price
             estimated_price = calculate_option_price(
                 current_price, 
@@ -178,7 +190,8 @@ try:
                 strike_price, 
                 greeks, 
                 days_to_expiration,
-                option_type.lower()
+                option_type.lower(),
+                days_held
             )
             
             # Display estimated option price
@@ -224,6 +237,36 @@ try:
                     
                 st.markdown(f"<p style='color:{color}'>Risk Assessment: {risk_assessment}</p>", unsafe_allow_html=True)
         
+        # Profit/loss over a grid of stock prices and dates, fully repriced in one call
+        surface = get_volatility_surface(stock)
+        if greeks and greeks.get('implied_volatility'):
+            st.subheader("Profit/Loss Scenarios per Contract")
+            vol_shock = st.select_slider(
+                "Implied Volatility Change (points)",
+                options=[int(shock * 100) for shock in DEFAULT_VOL_SHOCKS],
+                value=0
+            )
+            grid = build_scenario_grid(
+                current_price,
+                strike_price,
+                days_to_expiration,
+                greeks['implied_volatility'],
+                option_type.lower(),
+                entry_price=selected_option['lastPrice'],
+                prices=price_range(current_price, include=[target_price]),
+                surface=surface
+            )
+            pnl_table = grid_slice(grid, vol_shock / 100)
+            pnl_table.index = [f"${price:.2f}" for price in pnl_table.index]
+            pnl_table.columns = [(today + datetime.timedelta(days=int(day))).strftime('%b %d') for day in pnl_table.columns]
+            st.dataframe(pnl_table.round(0), use_container_width=True)
+        
+        if surface is not None:
+            with st.expander("Implied Volatility Surface"):
+                surface_table = surface.to_frame()
+                surface_table.columns = [(today + datetime.timedelta(days=int(day))).strftime('%b %d') for day in surface_table.columns]
+                st.dataframe((surface_table * 100).round(1), use_container_width=True)
+        
         # Unusual Options Activity
         st.header("Unusual Options Activity")
         
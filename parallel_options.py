@@ -4,6 +4,7 @@ This module implements concurrent processing for options data
 to improve performance when analyzing many options simultaneously.
 """
 
+import asyncio
 import concurrent.futures
 from functools import partial
 import threading
@@ -16,14 +17,23 @@ import os
 import re
 import time
 from datetime import datetime, timedelta, date
-import requests
-from polygon_trades import get_option_trade_data, format_timestamp
+import polygon_client
+from polygon_client import polygon_get
+import polygon_snapshot
+import pipeline_metrics
+from polygon_trades import select_significant_trade, format_timestamp, build_trades_url, merge_trades
 
 # Configuration
-MAX_WORKERS = 8  # Adjust based on your CPU cores
+# Upper bound on worker threads; the number of requests actually in flight
+# is adapted to observed latency and 429s by polygon_client.concurrency
+MAX_WORKERS = polygon_client.MAX_CONCURRENCY
 BATCH_SIZE = None  # None means auto-determine based on number of options
-BASE_URL = "https://api.polygon.io"
+BASE_URL = polygon_client.BASE_URL
 POLYGON_API_KEY = os.environ.get('POLYGON_API_KEY', '')
+MIN_TRADE_DATE = "2025-04-07"  # Only score trades on or after this date
+# Entry fields taken from a top candidate's /v3/trades call; its score is not
+# (the snapshot score ranks every contract on the same basis)
+TRADE_DETAIL_FIELDS = ('transaction_date', 'exchange', 'timestamp', 'timestamp_human')
 
 # Thread-local storage for error tracking
 # This helps us track errors across multiple worker threads
@@ -69,8 +79,265 @@ def filter_trades_by_date(trades, min_date=None):
         print(f"Error filtering trades by date: {str(e)}")
         return trades  # Return original trades if there's an error
 
+def get_trades_from_response(option_symbol, response):
+    """
+    Turn a Polygon trades response into the list of trades to score
+    
+    Args:
+        option_symbol: Option symbol the trades belong to
+        response: Response object (sync or async client) from build_trades_url
+        
+    Returns:
+        The contract's rolling trade window after the date filter, or None if the response is
+        an error or contains no usable trades
+    """
+    global forbidden_errors
+    
+    # Handle API error responses
+    if response.status_code != 200:
+        if response.status_code == 403:
+            with error_lock:
+                forbidden_errors += 1
+            if forbidden_errors > 5:
+                print(f"Multiple 403 errors for {option_symbol}, API access issue detected")
+        return None
+        
+    # Merge the new trades into the contract's rolling window
+    data = response.json()
+    new_trades = data.get('results', [])
+    trades = merge_trades(option_symbol, new_trades)
+    
+    # Print number of trades found
+    print(f"Found {len(new_trades)} new trades for {option_symbol} ({len(trades)} held)")
+    
+    # Skip if no trades
+    if not trades:
+        return None
+        
+    # Filter trades by date (only include trades after April 7th, 2025)
+    trades = filter_trades_by_date(trades, MIN_TRADE_DATE)
+    
+    # Skip if no trades remain after filtering
+    if not trades:
+        print(f"No trades found after {MIN_TRADE_DATE} for {option_symbol}")
+        return None
+    
+    return trades
+
+def build_option_entry(option, trades, stock_price, ticker, trade_info=None, option_data=None):
+    """
+    Score an option's trades and build the entry used in the results
+    
+    Args:
+        option: The option data to analyze
+        trades: Filtered list of trades for this option (may be empty when
+            option_data is given)
+        stock_price: Current price of the underlying stock
+        ticker: The underlying stock ticker symbol
+        trade_info: Most significant trade from polygon_trades, if available
+        option_data: Snapshot contract used when no trades were fetched
+        
+    Returns:
+        Tuple of (option_data, unusualness_score, is_unusual, sentiment)
+    """
+    with pipeline_metrics.stage('scoring'):
+        return _build_option_entry(option, trades, stock_price, ticker, trade_info, option_data)
+
+def _build_option_entry(option, trades, stock_price, ticker, trade_info=None, option_data=None):
+    """Implementation of build_option_entry (timed as the 'scoring' stage)"""
+    option_symbol = option.get('ticker')
+    strike = option.get('strike_price')
+    expiry = option.get('expiration_date')
+    contract_type = option.get('contract_type', '').lower()
+    
+    # Get the scoring function - defined at module level to avoid circular imports
+    # as we're importing it locally inside the function
+    try:
+        # First try importing directly
+        from polygon_integration import calculate_unusualness_score
+    except ImportError:
+        # If that fails, define a simple scoring function as fallback
+        print("Warning: Could not import calculate_unusualness_score, using simple fallback")
+        def calculate_unusualness_score(option, trades, stock_price, option_data=None):
+            """Fallback scoring function mimicking the main implementation"""
+            score = 0
+            score_breakdown = {}
+            
+            # Extract basic option information
+            strike = option.get('strike_price', 0)
+            contract_type = option.get('contract_type', '').lower()
+            expiration_date = option.get('expiration_date', '')
+            open_interest = option.get('open_interest', 0)
+            
+            # If we have no trades or basic data is missing, return 0 score
+            if not trades or not strike or not contract_type or not expiration_date:
+                return 0, {}
+            
+            # 1. Large Block Trades (0-25 points)
+            large_trades = [t for t in trades if t.get('size', 0) >= 10]
+            largest_trade_size = max([t.get('size', 0) for t in trades], default=0)
+            
+            # Score based on largest single trade size
+            block_trade_score = 0
+            if largest_trade_size >= 100:
+                block_trade_score = 25  # Very large block
+            elif largest_trade_size >= 50:
+                block_trade_score = 20
+            elif largest_trade_size >= 20:
+                block_trade_score = 15
+            elif largest_trade_size >= 10:
+                block_trade_score = 10
+            elif largest_trade_size >= 5:
+                block_trade_score = 5
+            
+            score += block_trade_score
+            score_breakdown['block_trade'] = block_trade_score
+            
+            # 2. Total Volume Score (0-20 points)
+            # Note: Since Polygon.io returns 0 for open interest, we're using absolute volume scoring
+            total_volume = sum(t.get('size', 0) for t in trades)
+            
+            volume_score = 0
+            if total_volume >= 200:
+                volume_score = 20  # Very high volume
+            elif total_volume >= 100:
+                volume_score = 15
+            elif total_volume >= 50:
+                volume_score = 10
+            elif total_volume >= 20:
+                volume_score = 5
+            elif total_volume >= 10:
+                volume_score = 3
+            
+            score += volume_score
+            score_breakdown['volume_score'] = volume_score
+            
+            # 3. Volume Concentration (0-15 points)
+            # Higher score when volume is concentrated in fewer trades
+            volume_concentration_score = 0
+            avg_trade_size = total_volume / len(trades) if len(trades) > 0 else 0
+            
+            if avg_trade_size >= 20:
+                volume_concentration_score = 15  # Large average trade size
+            elif avg_trade_size >= 10:
+                volume_concentration_score = 10
+            elif avg_trade_size >= 5:
+                volume_concentration_score = 5
+            
+            score += volume_concentration_score
+            score_breakdown['volume_concentration'] = volume_concentration_score
+            
+            # 3. Strike Price Distance (0-15 points)
+            if stock_price > 0:
+                strike_distance = abs(strike - stock_price) / stock_price
+                
+                strike_score = 0
+                if strike_distance >= 0.2:  # 20%+ OTM
+                    strike_score = 15
+                elif strike_distance >= 0.1:  # 10-20% OTM
+                    strike_score = 10
+                elif strike_distance >= 0.05:  # 5-10% OTM
+                    strike_score = 5
+                
+                score += strike_score
+                score_breakdown['strike_distance'] = strike_score
+            
+            # 4. Premium Size (0-20 points)
+            avg_price = sum(t.get('price', 0) * t.get('size', 0) for t in trades) / total_volume if total_volume > 0 else 0
+            total_premium = total_volume * 100 * avg_price  # Each contract is 100 shares
+            
+            premium_score = 0
+            if total_premium >= 1000000:  # $1M+
+                premium_score = 20
+            elif total_premium >= 500000:  # $500K+
+                premium_score = 15
+            elif total_premium >= 100000:  # $100K+
+                premium_score = 10
+            elif total_premium >= 50000:  # $50K+
+                premium_score = 5
+            
+            score += premium_score
+            score_breakdown['premium_size'] = premium_score
+            
+            # Calculate total score (max 100)
+            final_score = min(score, 100)
+            
+            # Add basic trade information for reference
+            score_breakdown['total_volume'] = total_volume
+            score_breakdown['total_premium'] = total_premium
+            score_breakdown['largest_trade'] = largest_trade_size
+            if open_interest > 0:
+                score_breakdown['vol_oi_ratio'] = round(total_volume / open_interest, 2)
+            
+            return final_score, score_breakdown
+    
+    # Calculate unusualness score
+    unusualness_score, score_breakdown = calculate_unusualness_score(option, trades, stock_price, option_data)
+    print(f"Option {option_symbol} received unusualness score: {unusualness_score}")
+    
+    # Calculate metrics for the activity
+    if trades or not option_data:
+        total_volume = sum(t.get('size', 0) for t in trades)
+        avg_price = sum(t.get('price', 0) * t.get('size', 0) for t in trades) / total_volume if total_volume > 0 else 0
+    else:
+        activity = polygon_snapshot.get_snapshot_activity(option_data)
+        total_volume = activity['total_volume']
+        avg_price = activity['avg_price']
+    total_premium = total_volume * 100 * avg_price  # Each contract is 100 shares
+    
+    # Determine sentiment based on option type
+    sentiment = None
+    if contract_type == 'call':
+        sentiment = 'bullish'
+    elif contract_type == 'put':
+        sentiment = 'bearish'
+    
+    # Create option data entry
+    option_entry = {
+        'contract': f"{ticker} {strike} {expiry} {contract_type.upper()}",
+        'volume': total_volume,
+        'avg_price': avg_price,
+        'premium': total_premium,
+        'sentiment': sentiment,
+        'unusualness_score': unusualness_score,
+        'score_breakdown': score_breakdown
+    }
+    
+    # Add detailed transaction information if we have it
+    if trade_info:
+        if 'date' in trade_info:
+            option_entry['transaction_date'] = trade_info['date']
+        
+        # Include exchange information
+        if 'exchange' in trade_info:
+            option_entry['exchange'] = trade_info['exchange']
+            
+        # Include exact timestamp if available
+        if 'timestamp' in trade_info:
+            option_entry['timestamp'] = trade_info['timestamp']
+            
+        # Include human-readable timestamp if available
+        if 'timestamp_human' in trade_info:
+            option_entry['timestamp_human'] = trade_info['timestamp_human']
+    
+    # Make sure volume is always available
+    if 'volume' not in option_entry:
+        option_entry['volume'] = 0
+        
+    # If we have trade info, use the actual trade size for volume calculation
+    if trade_info and 'size' in trade_info and trade_info['size'] > 0:
+        option_entry['contract_volume'] = trade_info['size']
+    else:
+        # Fallback to 1 (minimum) if no significant trades found
+        option_entry['contract_volume'] = 1
+    
+    # Is this option unusual enough to report?
+    is_unusual = unusualness_score >= 30
+    
+    return option_entry, unusualness_score, is_unusual, sentiment
+
 # Function to process a single option
-def process_single_option(option, stock_price, headers, ticker):
+def process_single_option(option, stock_price, headers, ticker, option_data=None):
     """
     Process a single option to determine if it has unusual activity
     This function is designed to be run in parallel by the ThreadPoolExecutor
@@ -80,246 +347,72 @@ def process_single_option(option, stock_price, headers, ticker):
         stock_price: Current price of the underlying stock
         headers: API request headers
         ticker: The underlying stock ticker symbol
+        option_data: Snapshot contract, if the option came from snapshot ingestion
         
     Returns:
         Tuple of (option_data, unusualness_score, is_unusual, sentiment)
     """
-    global forbidden_errors
-    
     try:
         option_symbol = option.get('ticker')
         strike = option.get('strike_price')
-        expiry = option.get('expiration_date')
         contract_type = option.get('contract_type', '').lower()
         
         # Print progress info
         print(f"Processing {option_symbol} ({contract_type.upper()} {strike})")
         
-        # Get trades for this option
-        endpoint = f"{BASE_URL}/v3/trades/{option_symbol}?limit=50&order=desc&apiKey={POLYGON_API_KEY}"
-        
-        # Make the API call with proper headers
-        response = requests.get(endpoint, headers=headers)
-        
-        # Handle API error responses
-        if response.status_code != 200:
-            if response.status_code == 403:
-                with error_lock:
-                    forbidden_errors += 1
-                if forbidden_errors > 5:
-                    print(f"Multiple 403 errors for {option_symbol}, API access issue detected")
-            return None, 0, False, None
-            
-        data = response.json()
-        trades = data.get('results', [])
-        
-        # Print number of trades found
-        print(f"Found {len(trades)} trades for {option_symbol}")
+        # Get trades for this option (only those newer than its high-water mark)
+        endpoint = build_trades_url(option_symbol)
         
-        # Skip if no trades
-        if not trades:
-            return None, 0, False, None
-            
-        # Filter trades by date (only include trades after April 7th, 2025)
-        min_date = "2025-04-07"
-        trades = filter_trades_by_date(trades, min_date)
+        # Make the API call with proper headers over the shared pooled session
+        with pipeline_metrics.stage('trade_fetch'):
+            response = polygon_get(endpoint, headers=headers)
         
-        # Skip if no trades remain after filtering
+        trades = get_trades_from_response(option_symbol, response)
         if not trades:
-            print(f"No trades found after {min_date} for {option_symbol}")
             return None, 0, False, None
         
-        # Get the scoring function - defined at module level to avoid circular imports
-        # as we're importing it locally inside the function
-        try:
-            # First try importing directly
-            from polygon_integration import calculate_unusualness_score
-        except ImportError:
-            # If that fails, define a simple scoring function as fallback
-            print("Warning: Could not import calculate_unusualness_score, using simple fallback")
-            def calculate_unusualness_score(option, trades, stock_price):
-                """Fallback scoring function mimicking the main implementation"""
-                score = 0
-                score_breakdown = {}
-                
-                # Extract basic option information
-                strike = option.get('strike_price', 0)
-                contract_type = option.get('contract_type', '').lower()
-                expiration_date = option.get('expiration_date', '')
-                open_interest = option.get('open_interest', 0)
-                
-                # If we have no trades or basic data is missing, return 0 score
-                if not trades or not strike or not contract_type or not expiration_date:
-                    return 0, {}
-                
-                # 1. Large Block Trades (0-25 points)
-                large_trades = [t for t in trades if t.get('size', 0) >= 10]
-                largest_trade_size = max([t.get('size', 0) for t in trades], default=0)
-                
-                # Score based on largest single trade size
-                block_trade_score = 0
-                if largest_trade_size >= 100:
-                    block_trade_score = 25  # Very large block
-                elif largest_trade_size >= 50:
-                    block_trade_score = 20
-                elif largest_trade_size >= 20:
-                    block_trade_score = 15
-                elif largest_trade_size >= 10:
-                    block_trade_score = 10
-                elif largest_trade_size >= 5:
-                    block_trade_score = 5
-                
-                score += block_trade_score
-                score_breakdown['block_trade'] = block_trade_score
-                
-                # 2. Total Volume Score (0-20 points)
-                # Note: Since Polygon.io returns 0 for open interest, we're using absolute volume scoring
-                total_volume = sum(t.get('size', 0) for t in trades)
-                
-                volume_score = 0
-                if total_volume >= 200:
-                    volume_score = 20  # Very high volume
-                elif total_volume >= 100:
-                    volume_score = 15
-                elif total_volume >= 50:
-                    volume_score = 10
-                elif total_volume >= 20:
-                    volume_score = 5
-                elif total_volume >= 10:
-                    volume_score = 3
-                
-                score += volume_score
-                score_breakdown['volume_score'] = volume_score
-                
-                # 3. Volume Concentration (0-15 points)
-                # Higher score when volume is concentrated in fewer trades
-                volume_concentration_score = 0
-                avg_trade_size = total_volume / len(trades) if len(trades) > 0 else 0
-                
-                if avg_trade_size >= 20:
-                    volume_concentration_score = 15  # Large average trade size
-                elif avg_trade_size >= 10:
-                    volume_concentration_score = 10
-                elif avg_trade_size >= 5:
-                    volume_concentration_score = 5
-                
-                score += volume_concentration_score
-                score_breakdown['volume_concentration'] = volume_concentration_score
-                
-                # 3. Strike Price Distance (0-15 points)
-                if stock_price > 0:
-                    strike_distance = abs(strike - stock_price) / stock_price
-                    
-                    strike_score = 0
-                    if strike_distance >= 0.2:  # 20%+ OTM
-                        strike_score = 15
-                    elif strike_distance >= 0.1:  # 10-20% OTM
-                        strike_score = 10
-                    elif strike_distance >= 0.05:  # 5-10% OTM
-                        strike_score = 5
-                    
-                    score += strike_score
-                    score_breakdown['strike_distance'] = strike_score
-                
-                # 4. Premium Size (0-20 points)
-                avg_price = sum(t.get('price', 0) * t.get('size', 0) for t in trades) / total_volume if total_volume > 0 else 0
-                total_premium = total_volume * 100 * avg_price  # Each contract is 100 shares
-                
-                premium_score = 0
-                if total_premium >= 1000000:  # $1M+
-                    premium_score = 20
-                elif total_premium >= 500000:  # $500K+
-                    premium_score = 15
-                elif total_premium >= 100000:  # $100K+
-                    premium_score = 10
-                elif total_premium >= 50000:  # $50K+
-                    premium_score = 5
-                
-                score += premium_score
-                score_breakdown['premium_size'] = premium_score
-                
-                # Calculate total score (max 100)
-                final_score = min(score, 100)
-                
-                # Add basic trade information for reference
-                score_breakdown['total_volume'] = total_volume
-                score_breakdown['total_premium'] = total_premium
-                score_breakdown['largest_trade'] = largest_trade_size
-                if open_interest > 0:
-                    score_breakdown['vol_oi_ratio'] = round(total_volume / open_interest, 2)
-                
-                return final_score, score_breakdown
+        # Get the actual transaction date from the trades we already have
+        # (already date-filtered, so no second /v3/trades call is needed)
+        trade_info = select_significant_trade(option_symbol, trades, min_size=5, min_date=None)
+        if trade_info:
+            print(f"Found {'significant' if trade_info.get('size', 0) > 0 else 'recent'} trade with size {trade_info.get('size', 0)} for {option_symbol}")
         
-        # Calculate unusualness score
-        unusualness_score, score_breakdown = calculate_unusualness_score(option, trades, stock_price)
-        print(f"Option {option_symbol} received unusualness score: {unusualness_score}")
+        return build_option_entry(option, trades, stock_price, ticker, trade_info, option_data)
         
-        # Calculate metrics for the activity
-        total_volume = sum(t.get('size', 0) for t in trades)
-        avg_price = sum(t.get('price', 0) * t.get('size', 0) for t in trades) / total_volume if total_volume > 0 else 0
-        total_premium = total_volume * 100 * avg_price  # Each contract is 100 shares
+    except Exception as e:
+        print(f"Error processing option {option.get('ticker', 'unknown')}: {str(e)}")
+        return None, 0, False, None
+
+async def process_single_option_async(option, stock_price, headers, ticker, option_data=None):
+    """
+    Async version of process_single_option, run as a task on the event loop
+    
+    Args:
+        option: The option data to analyze
+        stock_price: Current price of the underlying stock
+        headers: API request headers
+        ticker: The underlying stock ticker symbol
+        option_data: Snapshot contract, if the option came from snapshot ingestion
         
-        # Determine sentiment based on option type
-        sentiment = None
-        if contract_type == 'call':
-            sentiment = 'bullish'
-        elif contract_type == 'put':
-            sentiment = 'bearish'
+    Returns:
+        Tuple of (option_data, unusualness_score, is_unusual, sentiment)
+    """
+    try:
+        option_symbol = option.get('ticker')
+        endpoint = build_trades_url(option_symbol)
         
-        # Get the actual transaction date if available
-        trade_info = None
-        try:
-            # Use the same date filter as we did for the options
-            min_date = "2025-04-07"
-            trade_info = get_option_trade_data(option_symbol, min_size=5, min_date=min_date)
-            if trade_info:
-                print(f"Found {'significant' if trade_info.get('size', 0) > 0 else 'recent'} trade with size {trade_info.get('size', 0)} for {option_symbol}")
-        except Exception as e:
-            print(f"Error getting trade data for {option_symbol}: {str(e)}")
-        
-        # Create option data entry
-        option_entry = {
-            'contract': f"{ticker} {strike} {expiry} {contract_type.upper()}",
-            'volume': total_volume,
-            'avg_price': avg_price,
-            'premium': total_premium,
-            'sentiment': sentiment,
-            'unusualness_score': unusualness_score,
-            'score_breakdown': score_breakdown
-        }
-        
-        # Add detailed transaction information if we have it
-        if trade_info:
-            if 'date' in trade_info:
-                option_entry['transaction_date'] = trade_info['date']
-            
-            # Include exchange information
-            if 'exchange' in trade_info:
-                option_entry['exchange'] = trade_info['exchange']
-                
-            # Include exact timestamp if available
-            if 'timestamp' in trade_info:
-                option_entry['timestamp'] = trade_info['timestamp']
-                
-            # Include human-readable timestamp if available
-            if 'timestamp_human' in trade_info:
-                option_entry['timestamp_human'] = trade_info['timestamp_human']
+        # Imported here so the synchronous thread-pool path never needs aiohttp
+        from async_polygon_client import async_polygon_get
+        with pipeline_metrics.stage('trade_fetch'):
+            response = await async_polygon_get(endpoint, headers=headers)
         
-        # Make sure volume is always available
-        if 'volume' not in option_entry:
-            option_entry['volume'] = 0
-            
-        # If we have trade info, use the actual trade size for volume calculation
-        if trade_info and 'size' in trade_info and trade_info['size'] > 0:
-            option_entry['contract_volume'] = trade_info['size']
-        else:
-            # Fallback to 1 (minimum) if no significant trades found
-            option_entry['contract_volume'] = 1
+        trades = get_trades_from_response(option_symbol, response)
+        if not trades:
+            return None, 0, False, None
         
-        # Is this option unusual enough to report?
-        is_unusual = unusualness_score >= 30
+        trade_info = select_significant_trade(option_symbol, trades, min_size=5, min_date=None)
         
-        return option_entry, unusualness_score, is_unusual, sentiment
+        return build_option_entry(option, trades, stock_price, ticker, trade_info, option_data)
         
     except Exception as e:
         print(f"Error processing option {option.get('ticker', 'unknown')}: {str(e)}")
@@ -345,11 +438,14 @@ def analyze_options_in_parallel(near_money_options, stock_price, headers, ticker
     
     # Determine optimal number of workers
     # Adjust max_workers based on the number of options to process
-    worker_count = min(max_workers, len(near_money_options))
+    worker_count = max(1, min(max_workers, len(near_money_options)))
     
     print(f"Found {len(near_money_options)} near-the-money options to analyze")
     print(f"Using {worker_count} parallel workers for analysis")
     
+    # Make sure the shared connection pool has a slot for every worker
+    polygon_client.get_session(pool_size=max_workers)
+    
     # Prepare the partial function with fixed parameters
     process_func = partial(process_single_option, stock_price=stock_price, headers=headers, ticker=ticker)
     
@@ -381,6 +477,181 @@ def analyze_options_in_parallel(near_money_options, stock_price, headers, ticker
             except Exception as e:
                 print(f"Error processing results for {option_symbol}: {str(e)}")
     
+    return summarize_analyzed_options(all_options, unusual_activity)
+
+async def analyze_options_in_parallel_async(near_money_options, stock_price, headers, ticker):
+    """
+    Analyze options concurrently on the running event loop
+    
+    All contracts are scheduled at once; the number actually in flight is
+    bounded by the shared semaphore in async_polygon_client, so concurrent
+    tickers share one budget instead of each starting a thread pool.
+    
+    Args:
+        near_money_options: List of options to analyze
+        stock_price: Current price of the underlying stock
+        headers: API request headers
+        ticker: The stock ticker symbol
+        
+    Returns:
+        Dictionary with results including unusual options, sentiment counts, etc.
+    """
+    print(f"Found {len(near_money_options)} near-the-money options to analyze (async)")
+    
+    results = await asyncio.gather(
+        *(process_single_option_async(option, stock_price, headers, ticker) for option in near_money_options),
+        return_exceptions=True
+    )
+    
+    all_options = []
+    unusual_activity = []
+    for option, result in zip(near_money_options, results):
+        if isinstance(result, Exception):
+            print(f"Error processing results for {option.get('ticker', 'unknown')}: {str(result)}")
+            continue
+        option_entry, unusualness_score, is_unusual, sentiment = result
+        if option_entry:
+            all_options.append(option_entry)
+            if is_unusual:
+                unusual_activity.append(option_entry.copy())
+    
+    return summarize_analyzed_options(all_options, unusual_activity)
+
+def rank_option_snapshots(near_money_options, stock_price, ticker):
+    """
+    Score every snapshot contract from its day aggregates
+    
+    Args:
+        near_money_options: Flattened snapshot contracts to analyze
+        stock_price: Current price of the underlying stock
+        ticker: The stock ticker symbol
+        
+    Returns:
+        List of (option, entry_tuple) for contracts that traded today, sorted
+        by unusualness score and premium, highest first
+    """
+    scored = []
+    for option in near_money_options:
+        if not polygon_snapshot.get_snapshot_activity(option)['total_volume']:
+            continue
+        try:
+            result = build_option_entry(option, [], stock_price, ticker,
+                                        polygon_snapshot.get_snapshot_trade_info(option), option)
+            scored.append((option, result))
+        except Exception as e:
+            print(f"Error scoring snapshot for {option.get('ticker', 'unknown')}: {str(e)}")
+    
+    scored.sort(key=lambda item: (item[1][1], item[1][0].get('premium', 0)), reverse=True)
+    return scored
+
+def collect_snapshot_results(scored, refined):
+    """
+    Add trade-level details for the top candidates to the snapshot results
+    
+    Every contract keeps its snapshot score, so the ranking and is_unusual
+    are on one basis; the /v3/trades call only fills in the details the
+    snapshot lacks (TRADE_DETAIL_FIELDS and the largest trade).
+    
+    Args:
+        scored: Output of rank_option_snapshots
+        refined: Dictionary of option symbol -> entry tuple from a /v3/trades call
+        
+    Returns:
+        Dictionary with results including unusual options, sentiment counts, etc.
+    """
+    all_options = []
+    unusual_activity = []
+    for option, result in scored:
+        option_entry, unusualness_score, is_unusual, sentiment = result
+        # Snapshot entry unchanged if the trades call failed or found nothing
+        refined_result = refined.get(option.get('ticker'))
+        if refined_result and refined_result[0]:
+            trade_entry = refined_result[0]
+            option_entry = dict(option_entry)
+            option_entry.update({field: trade_entry[field] for field in TRADE_DETAIL_FIELDS if field in trade_entry})
+            if 'largest_trade' in trade_entry.get('score_breakdown', {}):
+                option_entry['largest_trade'] = trade_entry['score_breakdown']['largest_trade']
+        all_options.append(option_entry)
+        if is_unusual:
+            unusual_activity.append(option_entry.copy())
+    
+    return summarize_analyzed_options(all_options, unusual_activity)
+
+def analyze_option_snapshots(near_money_options, stock_price, headers, ticker,
+                             top_n=polygon_snapshot.TOP_CANDIDATES, max_workers=MAX_WORKERS):
+    """
+    Analyze snapshot contracts, fetching per-contract trades for the top candidates only
+    
+    Args:
+        near_money_options: Flattened snapshot contracts (polygon_snapshot.get_option_snapshots)
+        stock_price: Current price of the underlying stock
+        headers: API request headers
+        ticker: The stock ticker symbol
+        top_n: Number of highest-scoring contracts to fetch trade details for
+        max_workers: Maximum number of parallel worker threads
+        
+    Returns:
+        Dictionary with results including unusual options, sentiment counts, etc.
+    """
+    scored = rank_option_snapshots(near_money_options, stock_price, ticker)
+    candidates = [option for option, _ in scored[:top_n]]
+    print(f"Scored {len(scored)} traded contracts from the snapshot, fetching trades for top {len(candidates)}")
+    
+    refined = {}
+    if candidates:
+        polygon_client.get_session(pool_size=max_workers)
+        with concurrent.futures.ThreadPoolExecutor(max_workers=min(max_workers, len(candidates))) as executor:
+            futures = {
+                executor.submit(process_single_option, option, stock_price, headers, ticker, option): option
+                for option in candidates
+            }
+            for future in concurrent.futures.as_completed(futures):
+                refined[futures[future].get('ticker')] = future.result()
+    
+    return collect_snapshot_results(scored, refined)
+
+async def analyze_option_snapshots_async(near_money_options, stock_price, headers, ticker,
+                                         top_n=polygon_snapshot.TOP_CANDIDATES):
+    """
+    Async version of analyze_option_snapshots, run on the bot's event loop
+    
+    Args:
+        near_money_options: Flattened snapshot contracts (polygon_snapshot.get_option_snapshots_async)
+        stock_price: Current price of the underlying stock
+        headers: API request headers
+        ticker: The stock ticker symbol
+        top_n: Number of highest-scoring contracts to fetch trade details for
+        
+    Returns:
+        Dictionary with results including unusual options, sentiment counts, etc.
+    """
+    scored = rank_option_snapshots(near_money_options, stock_price, ticker)
+    candidates = [option for option, _ in scored[:top_n]]
+    print(f"Scored {len(scored)} traded contracts from the snapshot, fetching trades for top {len(candidates)} (async)")
+    
+    results = await asyncio.gather(
+        *(process_single_option_async(option, stock_price, headers, ticker, option) for option in candidates),
+        return_exceptions=True
+    )
+    refined = {
+        option.get('ticker'): result
+        for option, result in zip(candidates, results)
+        if not isinstance(result, Exception)
+    }
+    
+    return collect_snapshot_results(scored, refined)
+
+def summarize_analyzed_options(all_options, unusual_activity):
+    """
+    Build the cached result structure from the analyzed options
+    
+    Args:
+        all_options: Entries for every option that had trades
+        unusual_activity: Entries that scored as unusual
+        
+    Returns:
+        Dictionary with the top unusual options and overall sentiment counts
+    """
     # Calculate sentiment counts from ALL options analyzed (not just unusual ones)
     # Use contract volume to weight the sentiment counts
     all_bullish_count = sum(item.get('contract_volume', 1) for item in all_options if item.get('sentiment') == 'bullish')
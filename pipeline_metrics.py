@@ -0,0 +1,280 @@
+"""
+Stage timing for the unusual activity pipeline
+
+The scan is instrumented with `with pipeline_metrics.stage('trade_fetch'):`
+blocks. Times are exclusive: a stage nested inside another (e.g. a chain
+page fetched while the filter iterates the streaming chain) is subtracted
+from its parent, so the stage totals add up to the work actually done.
+Totals are summed across worker threads and asyncio tasks, so with
+parallelism they can exceed the wall time of the scan.
+
+Cache effectiveness is tracked with counters and fixed-bucket histograms
+(see CacheMetrics): hits, misses and stale serves of the unusual activity
+cache, the age of entries when they are served, and how long scans that
+refresh a ticker take. Recording is O(1), so it is safe on the request path;
+get_cache_metrics() is the query API (used by the bot's "cache stats" command).
+"""
+import bisect
+import contextvars
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+# Stages reported by the benchmark, in pipeline order
+STAGES = ('chain_fetch', 'filter', 'trade_fetch', 'scoring', 'institutional_analysis', 'formatting')
+
+# Histogram bucket upper bounds in seconds: entry age when served, scan duration
+AGE_BUCKETS = (1, 5, 15, 30, 60, 120, 300, 600, 1800, 3600, 4 * 3600, 24 * 3600)
+DURATION_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+
+# Tickers with their own refresh-duration histogram (least recently refreshed dropped)
+MAX_TRACKED_TICKERS = 500
+
+# The innermost open stage of the current thread/task (a one-item list
+# accumulating time spent in its child stages)
+_current_frame = contextvars.ContextVar('pipeline_stage_frame', default=None)
+
+
+class StageTimer:
+    """Thread-safe accumulator of exclusive time and call counts per stage"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._seconds = {}
+        self._calls = {}
+
+    @contextmanager
+    def stage(self, name):
+        """Time the enclosed block as stage `name`"""
+        parent = _current_frame.get()
+        frame = [0.0]
+        token = _current_frame.set(frame)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            _current_frame.reset(token)
+            if parent is not None:
+                parent[0] += elapsed
+            exclusive = max(0.0, elapsed - frame[0])
+            with self._lock:
+                self._seconds[name] = self._seconds.get(name, 0.0) + exclusive
+                self._calls[name] = self._calls.get(name, 0) + 1
+
+    def snapshot(self):
+        """
+        Get the accumulated timings
+
+        Returns:
+            Dictionary of stage name -> {'seconds': float, 'calls': int}
+        """
+        with self._lock:
+            return {name: {'seconds': self._seconds[name], 'calls': self._calls[name]}
+                    for name in self._seconds}
+
+    def reset(self):
+        with self._lock:
+            self._seconds.clear()
+            self._calls.clear()
+
+
+stage_timer = StageTimer()
+
+
+def stage(name):
+    """Time a block of the pipeline as stage `name` (see STAGES)"""
+    return stage_timer.stage(name)
+
+
+def get_stage_timings():
+    return stage_timer.snapshot()
+
+
+def reset_stage_timings():
+    stage_timer.reset()
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram of non-negative values
+
+    Not locked on its own: the owning CacheMetrics serializes access.
+
+    Args:
+        bounds: Increasing bucket upper bounds; larger values go in an overflow bucket
+    """
+
+    def __init__(self, bounds):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-quantile (the max for the overflow bucket)"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank and bucket_count:
+                return min(self.bounds[index], self.max) if index < len(self.bounds) else self.max
+        return self.max
+
+    def snapshot(self):
+        """
+        Returns:
+            Dictionary with count, mean, p50, p95, max and per-bucket counts
+            (keyed by upper bound, 'inf' for the overflow bucket)
+        """
+        buckets = dict(zip(self.bounds + ('inf',), self.counts))
+        return {
+            'count': self.count,
+            'mean': self.total / self.count if self.count else 0.0,
+            'p50': self.quantile(0.5),
+            'p95': self.quantile(0.95),
+            'max': self.max,
+            'buckets': buckets,
+        }
+
+
+class CacheMetrics:
+    """Thread-safe counters and histograms for the unusual activity cache"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+            self.stale_serves = 0
+            self.hit_age = Histogram(AGE_BUCKETS)
+            self.stale_age = Histogram(AGE_BUCKETS)
+            self.refresh = Histogram(DURATION_BUCKETS)
+            self.refresh_by_ticker = OrderedDict()
+
+    def record_hit(self, age):
+        with self._lock:
+            self.hits += 1
+            self.hit_age.observe(age)
+
+    def record_miss(self):
+        with self._lock:
+            self.misses += 1
+
+    def record_stale_serve(self, age):
+        with self._lock:
+            self.stale_serves += 1
+            self.stale_age.observe(age)
+
+    def record_refresh(self, ticker, seconds):
+        with self._lock:
+            self.refresh.observe(seconds)
+            histogram = self.refresh_by_ticker.pop(ticker, None) or Histogram(DURATION_BUCKETS)
+            histogram.observe(seconds)
+            self.refresh_by_ticker[ticker] = histogram
+            if len(self.refresh_by_ticker) > MAX_TRACKED_TICKERS:
+                self.refresh_by_ticker.popitem(last=False)
+
+    @contextmanager
+    def refresh_timer(self, ticker):
+        """Record the duration of the enclosed scan as a refresh of `ticker`"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_refresh(ticker, time.perf_counter() - start)
+
+    def snapshot(self, top=10):
+        """
+        Get the current counters and histograms
+
+        Args:
+            top: Number of tickers to include in slowest_refreshes
+
+        Returns:
+            Dictionary with hits, misses, stale_serves, lookups, hit_rate
+            (fresh hits / lookups), served_from_cache_rate (fresh or stale),
+            hit_age, stale_age and refresh histogram snapshots, and
+            slowest_refreshes: [(ticker, histogram snapshot)] by mean duration
+        """
+        with self._lock:
+            lookups = self.hits + self.misses + self.stale_serves
+            slowest = sorted(self.refresh_by_ticker.items(),
+                             key=lambda item: item[1].total / item[1].count, reverse=True)[:top]
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'stale_serves': self.stale_serves,
+                'lookups': lookups,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'served_from_cache_rate': (self.hits + self.stale_serves) / lookups if lookups else 0.0,
+                'hit_age': self.hit_age.snapshot(),
+                'stale_age': self.stale_age.snapshot(),
+                'refresh': self.refresh.snapshot(),
+                'slowest_refreshes': [(ticker, histogram.snapshot()) for ticker, histogram in slowest],
+            }
+
+
+cache_metrics = CacheMetrics()
+
+
+def record_cache_hit(age):
+    """Count a fresh cache hit for an entry `age` seconds old"""
+    cache_metrics.record_hit(age)
+
+
+def record_cache_miss():
+    cache_metrics.record_miss()
+
+
+def record_stale_serve(age):
+    """Count a stale result served while it refreshes (see cache_module.lookup_cache)"""
+    cache_metrics.record_stale_serve(age)
+
+
+def refresh_timer(ticker):
+    """Time the enclosed scan as a refresh of `ticker`"""
+    return cache_metrics.refresh_timer(ticker)
+
+
+def get_cache_metrics(top=10):
+    return cache_metrics.snapshot(top)
+
+
+def reset_cache_metrics():
+    cache_metrics.reset()
+
+
+def format_cache_metrics(metrics):
+    """
+    Format get_cache_metrics() output as a short plain-text report
+
+    Args:
+        metrics: Dictionary from get_cache_metrics
+
+    Returns:
+        Multi-line string
+    """
+    hit_age, refresh = metrics['hit_age'], metrics['refresh']
+    lines = [
+        f"Lookups: {metrics['lookups']} ({metrics['hits']} hits, {metrics['stale_serves']} stale, {metrics['misses']} misses)",
+        f"Hit rate: {metrics['hit_rate']:.0%} fresh, {metrics['served_from_cache_rate']:.0%} served from cache",
+        f"Age at hit: p50 {hit_age['p50']:.0f}s, p95 {hit_age['p95']:.0f}s, max {hit_age['max']:.0f}s",
+        f"Refreshes: {refresh['count']}, p50 {refresh['p50']:.1f}s, p95 {refresh['p95']:.1f}s, max {refresh['max']:.1f}s",
+    ]
+    for ticker, histogram in metrics['slowest_refreshes']:
+        lines.append(f"  {ticker}: {histogram['count']} refreshes, mean {histogram['mean']:.1f}s, max {histogram['max']:.1f}s")
+    return "\n".join(lines)
@@ -0,0 +1,554 @@
+"""
+Shared HTTP client for Polygon.io requests
+
+Every module that talks to Polygon.io (polygon_integration, parallel_options,
+polygon_trades) goes through the single process-wide session defined here so
+that TCP/TLS connections are pooled and kept alive between calls instead of
+being re-established for every option contract we analyze.
+
+All outbound calls are also metered by one thread-safe token bucket, and
+429 responses (with their Retry-After header) are handled here so that
+parallel scans stay within the plan's request budget.
+
+The number of requests in flight is governed by an AIMD controller: it
+grows by one slot per window of healthy responses and halves on 429s or
+timeouts. A per-endpoint circuit breaker fails fast after repeated 5xx/403
+responses instead of spending the user's wait on doomed retries.
+"""
+import asyncio
+import contextvars
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+BASE_URL = os.getenv('POLYGON_BASE_URL', 'https://api.polygon.io')
+
+# Default number of pooled connections per host. Callers that run many
+# worker threads (see parallel_options.MAX_WORKERS) ask for a larger pool
+# through get_session(pool_size=...).
+DEFAULT_POOL_SIZE = 8
+
+# Per-endpoint (connect, read) timeouts in seconds, matched by path prefix.
+# Trade and last-trade lookups are small and should fail fast; reference
+# listings return up to 1000 contracts per page and need longer to read.
+DEFAULT_TIMEOUT = (3.05, 10)
+ENDPOINT_TIMEOUTS = [
+    ('/v3/trades/', (3.05, 5)),
+    ('/v2/last/trade/', (3.05, 5)),
+    ('/v3/reference/options/contracts', (3.05, 15)),
+    ('/v3/reference/tickers', (3.05, 15)),
+]
+
+# Request budget shared by every thread. Override per deployment to match
+# the Polygon.io plan (e.g. POLYGON_RATE_LIMIT_RPS=5 on the starter plan).
+RATE_LIMIT_RPS = float(os.getenv('POLYGON_RATE_LIMIT_RPS', '20'))
+RATE_LIMIT_BURST = int(os.getenv('POLYGON_RATE_LIMIT_BURST', '8'))
+
+# How many times a 429 is retried before it is handed back to the caller
+MAX_RATE_LIMIT_RETRIES = 3
+DEFAULT_RETRY_AFTER = 1.0
+MAX_RETRY_AFTER = 30.0
+
+# Adaptive (AIMD) concurrency bounds for requests in flight across all threads
+MIN_CONCURRENCY = int(os.getenv('POLYGON_MIN_CONCURRENCY', '2'))
+MAX_CONCURRENCY = int(os.getenv('POLYGON_MAX_CONCURRENCY', '32'))
+INITIAL_CONCURRENCY = 8
+# Responses slower than this stop the additive increase
+LATENCY_TARGET = 2.0
+# Congestion signals within this window only cut the limit once
+DECREASE_COOLDOWN = 1.0
+
+# Consecutive 5xx/403/network failures that open an endpoint's circuit,
+# and how long it stays open before a single probe request is let through
+BREAKER_FAILURE_THRESHOLD = 5
+BREAKER_COOLDOWN = 30.0
+
+_session = None
+_pool_size = 0
+_session_lock = threading.Lock()
+
+# Counter of the request_counter() block the current context runs in, if any
+_request_counter = contextvars.ContextVar('polygon_request_counter', default=None)
+
+
+class RequestCounter:
+    """Tokens taken inside one request_counter() block"""
+
+    def __init__(self):
+        self.count = 0
+
+
+@contextmanager
+def request_counter():
+    """
+    Count the requests made by the current context
+
+    Tasks created inside the block (and asyncio.to_thread calls) share its
+    context and are counted; concurrent requests from other tasks and
+    threads are not. Worker threads of a ThreadPoolExecutor don't inherit
+    the context, so the synchronous parallel scan is not counted.
+
+    Yields:
+        RequestCounter whose count grows with each token taken
+    """
+    counter = RequestCounter()
+    token = _request_counter.set(counter)
+    try:
+        yield counter
+    finally:
+        _request_counter.reset(token)
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket rate limiter
+
+    Tokens refill continuously at `rate` per second up to `burst`. Each
+    request takes one token; when the bucket is empty the caller is told how
+    long to wait for its reserved slot, so concurrent threads are spaced out
+    evenly instead of all retrying at once.
+    """
+
+    def __init__(self, rate, burst):
+        self.rate = float(rate)
+        self.burst = max(1, int(burst))
+        self._tokens = float(self.burst)
+        self._last_refill = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def configure(self, rate=None, burst=None):
+        """Change the budget at runtime (e.g. after a plan upgrade)"""
+        with self._lock:
+            self._refill(time.monotonic())
+            if rate is not None:
+                self.rate = float(rate)
+            if burst is not None:
+                self.burst = max(1, int(burst))
+                self._tokens = min(self._tokens, self.burst)
+
+    def _refill(self, now):
+        elapsed = now - self._last_refill
+        if elapsed > 0:
+            self._tokens = min(self.burst, self._tokens + elapsed * self.rate)
+            self._last_refill = now
+
+    def reserve(self):
+        """
+        Take one token without blocking
+
+        Returns:
+            Seconds the caller must wait before using its token (0 if none)
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens -= 1
+            counter = _request_counter.get()
+            if counter is not None:
+                counter.count += 1
+            wait = 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+            return max(wait, self._blocked_until - now)
+
+    def acquire(self):
+        """Block the calling thread until a token is available"""
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def pause(self, seconds):
+        """Hold back every caller for `seconds` (used for 429 Retry-After)"""
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+            # Drain the bucket so the burst doesn't fire the moment we resume
+            self._tokens = min(self._tokens, 0.0)
+
+    def reset(self):
+        """Refill the bucket and lift any Retry-After pause"""
+        with self._lock:
+            self._tokens = float(self.burst)
+            self._last_refill = time.monotonic()
+            self._blocked_until = 0.0
+
+
+rate_limiter = TokenBucket(RATE_LIMIT_RPS, RATE_LIMIT_BURST)
+
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """Raised instead of sending a request while the endpoint's circuit is open"""
+
+
+class AdaptiveConcurrency:
+    """
+    Additive-increase / multiplicative-decrease limit on requests in flight
+
+    Every healthy response adds 1/limit to the limit (one extra slot per
+    window of `limit` responses). A 429 or timeout halves it, at most once
+    per DECREASE_COOLDOWN so one burst of throttled responses counts once.
+    """
+
+    def __init__(self, initial, minimum, maximum, latency_target=LATENCY_TARGET):
+        self.minimum = max(1, int(minimum))
+        self.maximum = max(self.minimum, int(maximum))
+        self.latency_target = latency_target
+        self.initial = float(min(max(initial, self.minimum), self.maximum))
+        self._limit = self.initial
+        self._in_flight = 0
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+        # (loop, future) of coroutines waiting in acquire_async
+        self._async_waiters = deque()
+
+    @property
+    def limit(self):
+        """Current number of requests allowed in flight"""
+        return int(self._limit)
+
+    @property
+    def in_flight(self):
+        return self._in_flight
+
+    async def acquire_async(self):
+        """Wait on the running event loop until a slot is free (used by the async client)"""
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._cond:
+                if self._in_flight < int(self._limit):
+                    self._in_flight += 1
+                    return
+                future = loop.create_future()
+                self._async_waiters.append((loop, future))
+            try:
+                await future
+            except asyncio.CancelledError:
+                with self._cond:
+                    if future.done() and not future.cancelled():
+                        # Woken but cancelled before taking the slot: pass the wakeup on
+                        self._wake_async(1)
+                raise
+
+    def _wake_async(self, count):
+        """Wake up to `count` async waiters; call with the condition held"""
+        while count > 0 and self._async_waiters:
+            loop, future = self._async_waiters.popleft()
+            if future.done():
+                continue
+            loop.call_soon_threadsafe(_resolve_waiter, future)
+            count -= 1
+
+    def acquire(self):
+        """Block the calling thread until a slot is free"""
+        with self._cond:
+            while self._in_flight >= int(self._limit):
+                self._cond.wait()
+            self._in_flight += 1
+
+    def release(self):
+        with self._cond:
+            self._in_flight -= 1
+            # Threads and coroutines both re-check the limit when woken
+            self._cond.notify()
+            self._wake_async(1)
+
+    def on_success(self, latency):
+        """Record a healthy response; grow the limit if latency is on target"""
+        with self._cond:
+            if latency <= self.latency_target and self._limit < self.maximum:
+                previous = int(self._limit)
+                self._limit = min(self.maximum, self._limit + 1.0 / self._limit)
+                if int(self._limit) > previous:
+                    self._cond.notify_all()
+                    self._wake_async(len(self._async_waiters))
+
+    def on_congestion(self):
+        """Record a 429 or timeout; halve the limit"""
+        with self._cond:
+            now = time.monotonic()
+            if now - self._last_decrease < DECREASE_COOLDOWN:
+                return
+            self._last_decrease = now
+            self._limit = max(self.minimum, self._limit / 2)
+            print(f"Polygon congestion detected, reducing concurrency to {int(self._limit)}")
+
+    def reset(self):
+        """Return the limit to its initial value (requests in flight keep their slots)"""
+        with self._cond:
+            self._limit = self.initial
+            self._last_decrease = 0.0
+            self._cond.notify_all()
+            self._wake_async(len(self._async_waiters))
+
+
+def _resolve_waiter(future):
+    """Wake an acquire_async waiter (runs on the waiter's own loop)"""
+    if not future.done():
+        future.set_result(None)
+
+
+class CircuitBreaker:
+    """
+    Per-endpoint circuit breaker
+
+    After `failure_threshold` consecutive failures the endpoint group's
+    circuit opens and requests fail immediately. Once `cooldown` seconds
+    have passed one probe request is allowed (half-open): success closes
+    the circuit, failure opens it again.
+    """
+
+    def __init__(self, failure_threshold=BREAKER_FAILURE_THRESHOLD, cooldown=BREAKER_COOLDOWN):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._failures = {}
+        self._opened_at = {}
+        self._probing = set()
+        self._lock = threading.Lock()
+
+    def state(self, group):
+        """Return 'closed', 'open' or 'half-open' for an endpoint group"""
+        with self._lock:
+            opened_at = self._opened_at.get(group)
+            if opened_at is None:
+                return 'closed'
+            if group in self._probing or time.monotonic() - opened_at >= self.cooldown:
+                return 'half-open'
+            return 'open'
+
+    def allow(self, group):
+        """Return True if a request to this endpoint group may be sent"""
+        with self._lock:
+            opened_at = self._opened_at.get(group)
+            if opened_at is None:
+                return True
+            if time.monotonic() - opened_at < self.cooldown or group in self._probing:
+                return False
+            self._probing.add(group)
+            return True
+
+    def record_success(self, group):
+        with self._lock:
+            self._failures[group] = 0
+            if self._opened_at.pop(group, None) is not None:
+                print(f"Circuit closed for {group}")
+            self._probing.discard(group)
+
+    def record_failure(self, group):
+        with self._lock:
+            failures = self._failures.get(group, 0) + 1
+            self._failures[group] = failures
+            if group in self._probing or (failures >= self.failure_threshold and group not in self._opened_at):
+                self._opened_at[group] = time.monotonic()
+                self._probing.discard(group)
+                print(f"Circuit open for {group} after {failures} consecutive failures, failing fast for {self.cooldown:.0f} seconds")
+
+    def reset(self):
+        with self._lock:
+            self._failures.clear()
+            self._opened_at.clear()
+            self._probing.clear()
+
+
+concurrency = AdaptiveConcurrency(INITIAL_CONCURRENCY, MIN_CONCURRENCY, MAX_CONCURRENCY)
+circuit_breaker = CircuitBreaker()
+
+
+def get_endpoint_group(url):
+    """
+    Group a Polygon URL by endpoint for the circuit breaker
+
+    Args:
+        url: Full request URL
+
+    Returns:
+        The first two path segments, e.g. '/v3/trades' or '/v3/snapshot'
+    """
+    parts = [part for part in urlparse(url).path.split('/') if part]
+    return '/' + '/'.join(parts[:2])
+
+
+def check_circuit(group):
+    """Raise CircuitOpenError if requests to this endpoint group should fail fast"""
+    if not circuit_breaker.allow(group):
+        raise CircuitOpenError(f"Circuit open for {group}, skipping request")
+
+
+def record_response(group, status_code, latency):
+    """
+    Feed a response into the concurrency controller and circuit breaker
+
+    Args:
+        group: Endpoint group from get_endpoint_group
+        status_code: HTTP status of the response
+        latency: Seconds the request took
+    """
+    if status_code == 429:
+        concurrency.on_congestion()
+        # The server is up and answering; don't count throttling as an outage
+        circuit_breaker.record_success(group)
+    elif status_code == 403 or status_code >= 500:
+        circuit_breaker.record_failure(group)
+    else:
+        circuit_breaker.record_success(group)
+        concurrency.on_success(latency)
+
+
+def record_error(group, timed_out):
+    """
+    Feed a network error into the concurrency controller and circuit breaker
+
+    Args:
+        group: Endpoint group from get_endpoint_group
+        timed_out: True for timeouts (a congestion signal), False for other errors
+    """
+    if timed_out:
+        concurrency.on_congestion()
+    circuit_breaker.record_failure(group)
+
+
+def parse_retry_after(response):
+    """
+    Read the Retry-After header of a 429 response
+
+    Args:
+        response: requests.Response with status 429
+
+    Returns:
+        Seconds to wait, clamped to MAX_RETRY_AFTER
+    """
+    value = response.headers.get('Retry-After') if response is not None else None
+    if not value:
+        return DEFAULT_RETRY_AFTER
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            retry_at = parsedate_to_datetime(value)
+            seconds = (retry_at - datetime.now(timezone.utc)).total_seconds()
+        except (TypeError, ValueError):
+            return DEFAULT_RETRY_AFTER
+    return min(max(seconds, 0.0), MAX_RETRY_AFTER)
+
+
+def _mount_adapter(session, pool_size):
+    """Mount a pooled adapter on the session for both schemes"""
+    # pool_block=True makes extra threads wait for a pooled connection rather
+    # than opening throwaway connections that are discarded after one request
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, pool_block=True, max_retries=0)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+
+
+def get_session(pool_size=None):
+    """
+    Get the process-wide keep-alive session, creating it on first use
+
+    Args:
+        pool_size: Minimum number of pooled connections required by the caller
+            (typically its worker count). The pool grows but never shrinks.
+
+    Returns:
+        requests.Session shared by all Polygon callers
+    """
+    global _session, _pool_size
+
+    wanted = max(pool_size or 0, DEFAULT_POOL_SIZE)
+
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            _session.headers.update({'User-Agent': 'OptionsWizard/1.0'})
+            _mount_adapter(_session, wanted)
+            _pool_size = wanted
+        elif wanted > _pool_size:
+            _mount_adapter(_session, wanted)
+            _pool_size = wanted
+        return _session
+
+
+def get_timeout(url):
+    """
+    Get the (connect, read) timeout to use for a Polygon URL
+
+    Args:
+        url: Full request URL
+
+    Returns:
+        Tuple of (connect_timeout, read_timeout) in seconds
+    """
+    path = urlparse(url).path
+    for prefix, timeout in ENDPOINT_TIMEOUTS:
+        if path.startswith(prefix):
+            return timeout
+    return DEFAULT_TIMEOUT
+
+
+def polygon_get(url, headers=None, timeout=None):
+    """
+    Issue a rate-limited GET request to Polygon.io over the shared session
+
+    The call waits for a token from the shared bucket and a slot from the
+    adaptive concurrency controller first. A 429 response pauses the bucket
+    for the server's Retry-After and is retried up to MAX_RATE_LIMIT_RETRIES
+    times before being returned to the caller.
+
+    Args:
+        url: Full request URL (including apiKey)
+        headers: Optional extra headers for this request
+        timeout: Optional timeout override; defaults to the per-endpoint value
+
+    Returns:
+        requests.Response
+
+    Raises:
+        CircuitOpenError if the endpoint's circuit is open
+        requests.exceptions.RequestException on network errors
+    """
+    session = get_session()
+    timeout = timeout or get_timeout(url)
+    group = get_endpoint_group(url)
+
+    for attempt in range(MAX_RATE_LIMIT_RETRIES + 1):
+        check_circuit(group)
+        rate_limiter.acquire()
+        concurrency.acquire()
+        start = time.monotonic()
+        try:
+            response = session.get(url, headers=headers, timeout=timeout)
+        except requests.exceptions.Timeout:
+            record_error(group, timed_out=True)
+            raise
+        except requests.exceptions.RequestException:
+            # Connection errors and broken bodies (ChunkedEncodingError, ...)
+            # must still count, or a failed half-open probe never clears
+            record_error(group, timed_out=False)
+            raise
+        finally:
+            concurrency.release()
+
+        record_response(group, response.status_code, time.monotonic() - start)
+        if response.status_code != 429 or attempt == MAX_RATE_LIMIT_RETRIES:
+            return response
+
+        retry_after = parse_retry_after(response)
+        print(f"Rate limited by Polygon API, pausing all requests for {retry_after:.1f} seconds...")
+        rate_limiter.pause(retry_after)
+
+    return response
+
+
+def close_session():
+    """Close the shared session and release its pooled connections"""
+    global _session, _pool_size
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
+            _pool_size = 0
@@ -9,10 +9,17 @@ import json
 import random
 import time
 from datetime import datetime
+from urllib.parse import urlencode
 from dotenv import load_dotenv
-from polygon_trades import get_option_trade_data
+from polygon_trades import get_option_trade_data, build_trades_url, merge_trades
 import math
+import asyncio
+import threading
 import cache_module
+import polygon_client
+import polygon_snapshot
+import pipeline_metrics
+from single_flight import SingleFlight, AsyncSingleFlight
 
 # Import the institutional sentiment analysis module
 try:
@@ -29,12 +36,40 @@ except ImportError:
 # Load environment variables
 load_dotenv()
 POLYGON_API_KEY = os.getenv('POLYGON_API_KEY')
-BASE_URL = "https://api.polygon.io"
+BASE_URL = polygon_client.BASE_URL
 
 # Cache for ticker validity to minimize API calls
 valid_ticker_cache = set()
 exchange_ticker_cache = {}
-option_chain_cache = {}
+# Contract lists by (ticker, filters), bounded and expiring at the next session
+option_chain_cache = cache_module.option_chain_cache
+
+# Concurrent scans of the same ticker are coalesced into one (see single_flight)
+_scan_flight = SingleFlight()
+_async_scan_flight = AsyncSingleFlight()
+
+# Tickers with a stale-while-revalidate refresh running in the background,
+# and the asyncio tasks running them (held so they aren't garbage collected)
+_refreshing = set()
+_refreshing_lock = threading.Lock()
+_background_refreshes = set()
+
+# Page size and safety cap for /v3/reference/options/contracts pagination
+CONTRACTS_PAGE_LIMIT = 1000
+MAX_CONTRACT_PAGES = 50
+
+
+class OptionChainError(Exception):
+    """Raised when a contracts listing can't be read to the end (a page failed)"""
+
+
+# Server-side strike filters are widened to buckets of about this fraction of
+# the stock price, so the cached listing's key survives small price moves
+STRIKE_BUCKET_FRACTION = 0.05
+
+# Optimize for high-volume tickers to avoid timeout issues. Also the default
+# prewarm watchlist (see prewarm_scheduler) and used by unusual_activity.
+HIGH_VOLUME_TICKERS = frozenset({'AAPL', 'MSFT', 'TSLA', 'SPY', 'QQQ', 'NVDA', 'AMZN', 'GOOGL', 'META', 'AMD'})
 
 # Cache for unusual options activity with timestamps now handled by cache_module.py
 # See cache_module.py for implementation details
@@ -49,12 +84,10 @@ def get_headers():
         'User-Agent': 'OptionsWizard/1.0'  # Add user agent to reduce chance of rate limiting
     }
     
-import time
-# Global trackers for rate limiting
-_last_api_call = 0
-_min_call_interval = 0.4  # Hybrid approach: slightly faster than conservative 0.6
-_consecutive_calls = 0
-_max_retries = 3  # Reduced maximum retries to fail faster to YF fallback
+# Rate limiting is handled by the shared token bucket in polygon_client,
+# which every outbound Polygon call (sequential or parallel) goes through
+_max_retries = 3  # Maximum retries for network errors
+_retry_backoff = 0.5  # Seconds before the first network-error retry, doubled each time
 
 # Flag to identify API endpoints that previously would fall back to Yahoo Finance
 # Now returns False for all endpoints as we're using Polygon.io exclusively
@@ -68,136 +101,67 @@ def is_fallback_endpoint(url):
 
 def handle_rate_limit(retry_after=1):
     """
-    Handle rate limiting from Polygon API by sleeping
+    Handle rate limiting from Polygon API by pausing every caller
     
     Args:
         retry_after: Seconds to wait before retrying (default: 1 second)
     """
     print(f"Rate limited by Polygon API, waiting {retry_after} seconds...")
-    time.sleep(retry_after)
-    
+    polygon_client.rate_limiter.pause(retry_after)
+    
+class ErrorResponse:
+    """Stand-in response returned when a call fails without an HTTP response"""
+    def __init__(self, status_code, message):
+        self.status_code = status_code
+        self.text = message
+        self.headers = {}
+    def json(self):
+        return {"error": self.text}
+
 def throttled_api_call(url, headers=None, retry_count=0):
     """
-    Make an API call with built-in throttling to avoid rate limits
-    With faster fallback for price/options endpoints
+    Make an API call through the shared rate limiter
+    
+    Throttling, adaptive concurrency, 429/Retry-After handling and the
+    circuit breaker all live in polygon_client.polygon_get; this wrapper
+    only retries network errors, with a short bounded backoff.
     
     Args:
         url: The URL to call
         headers: Optional headers dictionary
-        retry_count: Current retry attempt (internal tracking)
+        retry_count: Number of network-error retries already used
         
     Returns:
-        Response object from requests
-    """
-    global _last_api_call, _min_call_interval, _consecutive_calls, _max_retries
-    
-    # Check if this is a price or options lookup that should quickly fall back
-    quick_fallback = is_fallback_endpoint(url)
-    
-    # For price/options endpoints, use fewer retries before falling back to YF
-    effective_max_retries = 1 if quick_fallback else _max_retries
-    
-    # Safety check for excessive retries
-    if retry_count > effective_max_retries:
-        if quick_fallback:
-            print(f"Quick fallback triggered for {url} - Will try Yahoo Finance")
-            # Let the calling function handle Yahoo fallback
-            class FallbackResponse:
-                def __init__(self):
-                    self.status_code = 503  # Service unavailable
-                    self.text = "Fallback to Yahoo Finance recommended"
-                def json(self):
-                    return {"status": "error", "message": "Fallback to Yahoo Finance recommended"}
-            return FallbackResponse()
-        else:
-            print(f"Maximum retries ({_max_retries}) exceeded for URL: {url}")
-            # Return a simulated response with error status
-            class MockResponse:
-                def __init__(self):
-                    self.status_code = 500
-                    self.text = "Maximum retries exceeded"
-                def json(self):
-                    return {"error": "Maximum retries exceeded"}
-            return MockResponse()
-    
-    # Calculate time since last API call
-    now = time.time()
-    time_since_last_call = now - _last_api_call
-    
-    # Adaptive delay - but less aggressive scaling for hybrid approach
-    # For price/options lookups, use even less delay to get quick answers
-    if quick_fallback:
-        adaptive_delay = _min_call_interval * (1 + min(_consecutive_calls // 10, 3))
-    else:
-        adaptive_delay = _min_call_interval * (1 + min(_consecutive_calls // 8, 4))
-    
-    # If we've made a call too recently, sleep to avoid rate limiting
-    if time_since_last_call < adaptive_delay:
-        sleep_time = adaptive_delay - time_since_last_call
-        time.sleep(sleep_time)
-    
-    # Make the API call
-    try:
-        response = requests.get(url, headers=headers, timeout=10)  # Shorter timeout for quicker fallback
-        
-        # Debug log for 403 errors
-        if response.status_code == 403:
-            print(f"403 Forbidden error for URL: {url}")
-            print(f"Response: {response.text}")
-            # Reset consecutive calls counter
-            _consecutive_calls = 0
+        Response object from requests, or an ErrorResponse (503 while the
+        endpoint's circuit is open, 500 once retries are exhausted)
+    """
+    while retry_count <= _max_retries:
+        try:
+            # Shared keep-alive session with per-endpoint timeouts and rate limiting
+            response = polygon_client.polygon_get(url, headers=headers)
             
-            # For price/options lookups with 403, don't retry - go straight to YF
-            if quick_fallback:
-                print(f"403 on price/options lookup, recommending YF fallback")
-                return response  # Let the caller handle YF fallback
-        elif response.status_code == 200:
-            # Successful call
-            _consecutive_calls += 1
-        
-        # Update last call time
-        _last_api_call = time.time()
-        
-        # Handle rate limiting with exponential backoff
-        if response.status_code == 429:
-            # Price/options lookups should fall back after one rate limit
-            if quick_fallback and retry_count >= 0:
-                print(f"Rate limited on price/options lookup, recommending YF fallback")
-                return response  # Let the caller handle YF fallback
+            # Debug log for 403 errors
+            if response.status_code == 403:
+                print(f"403 Forbidden error for URL: {url}")
+                print(f"Response: {response.text}")
                 
-            # Each retry waits longer (3, 6, 12, 24 seconds...)
-            backoff_delay = 3 * (2 ** retry_count)
-            handle_rate_limit(backoff_delay)
-            # Reset consecutive calls counter
-            _consecutive_calls = 0
-            # Retry with incremented counter
-            return throttled_api_call(url, headers, retry_count + 1)
+            return response
             
-        return response
-        
-    except requests.exceptions.RequestException as e:
-        print(f"Request error: {str(e)}")
-        # Reset consecutive calls counter
-        _consecutive_calls = 0
-        
-        # For price/options lookups with connection issues, go straight to YF
-        if quick_fallback:
-            print(f"Connection error on price/options lookup, recommending YF fallback")
-            class FallbackResponse:
-                def __init__(self):
-                    self.status_code = 503  # Service unavailable
-                    self.text = "Network error - Fallback to Yahoo Finance"
-                def json(self):
-                    return {"status": "error", "message": "Network error"}
-            return FallbackResponse()
-            
-        # For other endpoints, retry with a delay
-        time.sleep(2)
-        return throttled_api_call(url, headers, retry_count + 1)
-    except Exception as e:
-        print(f"Unexpected error in API call: {str(e)}")
-        _consecutive_calls = 0
-        return None
+        except polygon_client.CircuitOpenError as e:
+            # Fail fast rather than make the user wait on doomed retries
+            print(str(e))
+            return ErrorResponse(503, str(e))
+        except requests.exceptions.RequestException as e:
+            print(f"Request error: {str(e)}")
+            retry_count += 1
+            if retry_count <= _max_retries:
+                time.sleep(_retry_backoff * 2 ** (retry_count - 1))
+        except Exception as e:
+            print(f"Unexpected error in API call: {str(e)}")
+            return None
+    
+    print(f"Maximum retries ({_max_retries}) exceeded for URL: {url}")
+    return ErrorResponse(500, "Maximum retries exceeded")
 
 def fetch_all_tickers():
     """
@@ -463,7 +427,201 @@ def get_current_price(ticker):
         print(f"No fallback to Yahoo Finance - using only Polygon.io data as requested")
         return None
 
-def get_option_chain(ticker, expiration_date=None):
+async def get_current_price_async(ticker):
+    """
+    Async version of get_current_price for use on the bot's event loop
+    
+    Args:
+        ticker: The stock ticker symbol
+        
+    Returns:
+        Current price or None if unavailable
+    """
+    if not ticker:
+        return None
+    
+    ticker = ticker.upper()
+    
+    try:
+        from async_polygon_client import async_polygon_get
+        endpoint = f"{BASE_URL}/v2/last/trade/{ticker}?apiKey={POLYGON_API_KEY}"
+        response = await async_polygon_get(endpoint, headers=get_headers())
+        
+        if response.status_code != 200:
+            print(f"Error fetching current price for {ticker}: {response.status_code}")
+            return None
+        
+        result = response.json().get('results')
+        if result:
+            return result.get('p')  # 'p' is the price field
+        
+        print(f"Polygon returned empty result for {ticker}")
+        return None
+        
+    except Exception as e:
+        print(f"Error fetching current price for {ticker}: {str(e)}")
+        return None
+
+def build_option_contracts_url(ticker, expiration_date=None, expiration_date_gte=None,
+                               expiration_date_lte=None, strike_price_gte=None,
+                               strike_price_lte=None, contract_type=None):
+    """
+    Build the first-page URL for /v3/reference/options/contracts with server-side filters
+    
+    Args:
+        ticker: Underlying ticker symbol (uppercase)
+        expiration_date: Exact expiration date (YYYY-MM-DD)
+        expiration_date_gte / expiration_date_lte: Expiration date range (YYYY-MM-DD)
+        strike_price_gte / strike_price_lte: Strike price range
+        contract_type: 'call' or 'put'
+        
+    Returns:
+        Full URL including the API key
+    """
+    params = {'underlying_ticker': ticker, 'limit': CONTRACTS_PAGE_LIMIT}
+    if expiration_date:
+        params['expiration_date'] = expiration_date
+    if expiration_date_gte:
+        params['expiration_date.gte'] = expiration_date_gte
+    if expiration_date_lte:
+        params['expiration_date.lte'] = expiration_date_lte
+    if strike_price_gte is not None:
+        params['strike_price.gte'] = round(strike_price_gte, 2)
+    if strike_price_lte is not None:
+        params['strike_price.lte'] = round(strike_price_lte, 2)
+    if contract_type:
+        params['contract_type'] = contract_type.lower()
+    params['apiKey'] = POLYGON_API_KEY
+    return f"{BASE_URL}/v3/reference/options/contracts?{urlencode(params)}"
+
+def next_page_url(next_url):
+    """Add the API key to a Polygon next_url cursor (Polygon strips it)"""
+    separator = '&' if '?' in next_url else '?'
+    return f"{next_url}{separator}apiKey={POLYGON_API_KEY}"
+
+def option_chain_key(ticker, filters):
+    """Cache key for a contracts listing: the ticker plus its non-empty filters"""
+    return (ticker, tuple(sorted((k, v) for k, v in filters.items() if v is not None)))
+
+def iter_option_contracts(ticker, max_pages=MAX_CONTRACT_PAGES, **filters):
+    """
+    Stream option contracts for an underlying, following next_url cursors
+    
+    Contracts are yielded as each page arrives so callers can start filtering
+    before the last page has been downloaded. A listing that was read to the
+    end is cached until the next session (see cache_module.cache_option_chain)
+    and later calls with the same filters are served from the cache.
+    
+    Args:
+        ticker: The stock ticker symbol
+        max_pages: Safety cap on the number of pages to follow
+        **filters: Server-side filters accepted by build_option_contracts_url
+            (expiration_date, expiration_date_gte, expiration_date_lte,
+            strike_price_gte, strike_price_lte, contract_type)
+            
+    Yields:
+        Option contract dictionaries from Polygon
+        
+    Raises:
+        OptionChainError: If a page can't be fetched (nothing is cached)
+    """
+    if not ticker:
+        return
+    
+    ticker = ticker.upper()
+    cache_key = option_chain_key(ticker, filters)
+    cached, found = cache_module.get_cached_option_chain(cache_key)
+    if found:
+        yield from cached
+        return
+    
+    url = build_option_contracts_url(ticker, **filters)
+    page_count = 0
+    contracts = []
+    
+    while url and page_count < max_pages:
+        with pipeline_metrics.stage('chain_fetch'):
+            response = throttled_api_call(url, headers=get_headers())
+            data = response.json() if response and response.status_code == 200 else None
+        
+        if data is None:
+            # A partial listing would pass for a small chain; fail the whole listing instead
+            raise OptionChainError(f"Error fetching option contracts page {page_count + 1} for {ticker}: "
+                                   f"{response.status_code if response else 'No response'}")
+        
+        page_count += 1
+        
+        page = data.get('results', [])
+        contracts.extend(page)
+        for contract in page:
+            yield contract
+        
+        next_url = data.get('next_url')
+        url = next_page_url(next_url) if next_url else None
+    
+    if url:
+        print(f"Stopped after {max_pages} pages of option contracts for {ticker}")
+    elif contracts:
+        cache_module.cache_option_chain(cache_key, contracts)
+
+async def aiter_option_contracts(ticker, max_pages=MAX_CONTRACT_PAGES, **filters):
+    """
+    Async version of iter_option_contracts for use on the bot's event loop
+    
+    Args:
+        ticker: The stock ticker symbol
+        max_pages: Safety cap on the number of pages to follow
+        **filters: Server-side filters accepted by build_option_contracts_url
+            
+    Yields:
+        Option contract dictionaries from Polygon
+        
+    Raises:
+        OptionChainError: If a page can't be fetched (nothing is cached)
+    """
+    from async_polygon_client import async_polygon_get
+    
+    if not ticker:
+        return
+    
+    ticker = ticker.upper()
+    cache_key = option_chain_key(ticker, filters)
+    cached, found = cache_module.get_cached_option_chain(cache_key)
+    if found:
+        for contract in cached:
+            yield contract
+        return
+    
+    url = build_option_contracts_url(ticker, **filters)
+    page_count = 0
+    contracts = []
+    
+    while url and page_count < max_pages:
+        with pipeline_metrics.stage('chain_fetch'):
+            response = await async_polygon_get(url, headers=get_headers())
+            data = response.json() if response.status_code == 200 else None
+        
+        if data is None:
+            # A partial listing would pass for a small chain; fail the whole listing instead
+            raise OptionChainError(f"Error fetching option contracts page {page_count + 1} for {ticker}: "
+                                   f"{response.status_code}")
+        
+        page_count += 1
+        
+        page = data.get('results', [])
+        contracts.extend(page)
+        for contract in page:
+            yield contract
+        
+        next_url = data.get('next_url')
+        url = next_page_url(next_url) if next_url else None
+    
+    if url:
+        print(f"Stopped after {max_pages} pages of option contracts for {ticker}")
+    elif contracts:
+        cache_module.cache_option_chain(cache_key, contracts)
+
+def get_option_chain(ticker, expiration_date=None, **filters):
     """
     Get the option chain for a given stock and expiration date
     
@@ -471,9 +629,10 @@ def get_option_chain(ticker, expiration_date=None):
         ticker: The stock ticker symbol
         expiration_date: Optional date string in YYYY-MM-DD format
             If None, gets all available expiration dates
+        **filters: Optional server-side filters (see iter_option_contracts)
             
     Returns:
-        Dictionary with option chain data
+        List of option contracts across all pages, or None if any page failed
     """
     if not ticker:
         return None
@@ -484,45 +643,38 @@ def get_option_chain(ticker, expiration_date=None):
     # This ensures consistent data quality and avoids mixing data sources
     print(f"Using Polygon.io for {ticker} option chain")
     
-    # Check cache first if we have an expiration date
-    cache_key = f"{ticker}_{expiration_date}"
-    if expiration_date and cache_key in option_chain_cache:
-        return option_chain_cache[cache_key]
-    
     try:
-        # Build the API endpoint with a larger limit to ensure we get enough options
-        # This is crucial for unusual activity detection which needs near-the-money options
-        if expiration_date:
-            endpoint = f"{BASE_URL}/v3/reference/options/contracts?underlying_ticker={ticker}&expiration_date={expiration_date}&limit=1000&apiKey={POLYGON_API_KEY}"
-        else:
-            endpoint = f"{BASE_URL}/v3/reference/options/contracts?underlying_ticker={ticker}&limit=1000&apiKey={POLYGON_API_KEY}"
+        # Follow every page so large chains (SPY, QQQ, TSLA) aren't truncated;
+        # complete listings are served from option_chain_cache until the next session
+        return list(iter_option_contracts(ticker, expiration_date=expiration_date, **filters))
         
-        # Use throttled API call
-        response = throttled_api_call(endpoint, headers=get_headers())
+    except Exception as e:
+        print(f"Error fetching option chain for {ticker}: {str(e)}")
+        print(f"No fallback to Yahoo Finance - using only Polygon.io data as requested")
+        return None
+
+async def get_option_chain_async(ticker, expiration_date=None, **filters):
+    """
+    Async version of get_option_chain for use on the bot's event loop
+    
+    Args:
+        ticker: The stock ticker symbol
+        expiration_date: Optional date string in YYYY-MM-DD format
+        **filters: Optional server-side filters (see iter_option_contracts)
             
-        # If response indicates an error, return None (no fallback)
-        if not response or response.status_code in [403, 429, 503]:
-            print(f"Error fetching option chain for {ticker}: {response.status_code if response else 'No response'}")
-            print(f"No fallback to Yahoo Finance - using only Polygon.io data as requested")
-            return None
-        
-        # Process successful Polygon response
-        if response.status_code != 200:
-            print(f"Error fetching option chain for {ticker}: {response.status_code}")
-            return None
-        
-        data = response.json()
-        results = data.get('results', [])
-        
-        if expiration_date:
-            # Cache the results for this expiration date
-            option_chain_cache[cache_key] = results
-        
-        return results
+    Returns:
+        List of option contracts, or None on error
+    """
+    if not ticker:
+        return None
+    
+    ticker = ticker.upper()
+    
+    try:
+        return [contract async for contract in aiter_option_contracts(ticker, expiration_date=expiration_date, **filters)]
         
     except Exception as e:
         print(f"Error fetching option chain for {ticker}: {str(e)}")
-        print(f"No fallback to Yahoo Finance - using only Polygon.io data as requested")
         return None
 
 def get_option_expirations(ticker):
@@ -541,19 +693,9 @@ def get_option_expirations(ticker):
     ticker = ticker.upper()
     
     try:
-        endpoint = f"{BASE_URL}/v3/reference/options/contracts?underlying_ticker={ticker}&limit=1000&apiKey={POLYGON_API_KEY}"
-        response = throttled_api_call(endpoint, headers=get_headers())
-        
-        if response.status_code != 200:
-            print(f"Error fetching option expirations for {ticker}: {response.status_code}")
-            return []
-        
-        data = response.json()
-        results = data.get('results', [])
-        
-        # Extract unique expiration dates
+        # Extract unique expiration dates across every page of contracts
         expirations = set()
-        for option in results:
+        for option in iter_option_contracts(ticker):
             exp_date = option.get('expiration_date')
             if exp_date:
                 expirations.add(exp_date)
@@ -637,7 +779,8 @@ def calculate_unusualness_score(option, trades, stock_price, option_data=None):
         option: The option data from Polygon API
         trades: List of trades for this option
         stock_price: Current price of the underlying stock
-        option_data: Additional option data if available
+        option_data: Snapshot contract (see polygon_snapshot.snapshot_to_option)
+            used in place of the trade list when no trades were fetched
         
     Returns:
         A score from 0-100 indicating how unusual the option activity is,
@@ -653,14 +796,29 @@ def calculate_unusualness_score(option, trades, stock_price, option_data=None):
     open_interest = option.get('open_interest', 0)
     implied_volatility = option.get('implied_volatility', 0)
     
-    # If we have no trades or basic data is missing, return 0 score
-    if not trades or not strike or not contract_type or not expiration_date:
+    # If basic data is missing, return 0 score
+    if not strike or not contract_type or not expiration_date:
         return 0, {}
     
-    # 1. Large Block Trades (0-25 points)
-    large_trades = [t for t in trades if t.get('size', 0) >= 10]  # Trades with 10+ contracts
-    largest_trade_size = max([t.get('size', 0) for t in trades], default=0)
+    if trades:
+        largest_trade_size = max([t.get('size', 0) for t in trades], default=0)
+        total_volume = sum(t.get('size', 0) for t in trades)
+        avg_trade_size = total_volume / len(trades)
+        avg_price = sum(t.get('price', 0) * t.get('size', 0) for t in trades) / total_volume if total_volume > 0 else 0
+    elif option_data:
+        # Snapshot ingestion: the day's aggregates stand in for the trade list
+        activity = polygon_snapshot.get_snapshot_activity(option_data)
+        if not activity['total_volume']:
+            return 0, {}
+        largest_trade_size = activity['largest_trade']
+        total_volume = activity['total_volume']
+        avg_trade_size = activity['avg_trade_size']
+        avg_price = activity['avg_price']
+    else:
+        # No trades and no snapshot data
+        return 0, {}
     
+    # 1. Large Block Trades (0-25 points)
     # Score based on largest single trade size
     block_trade_score = 0
     if largest_trade_size >= 100:
@@ -679,8 +837,6 @@ def calculate_unusualness_score(option, trades, stock_price, option_data=None):
     
     # 2. Total Volume Score (0-20 points)
     # Note: Since Polygon.io returns 0 for open interest, we're using absolute volume scoring
-    total_volume = sum(t.get('size', 0) for t in trades)
-    
     volume_score = 0
     if total_volume >= 200:
         volume_score = 20  # Very high volume
@@ -699,8 +855,6 @@ def calculate_unusualness_score(option, trades, stock_price, option_data=None):
     # 3. Volume Concentration (0-15 points)
     # Higher score when volume is concentrated in fewer trades
     volume_concentration_score = 0
-    avg_trade_size = total_volume / len(trades) if len(trades) > 0 else 0
-    
     if avg_trade_size >= 20:
         volume_concentration_score = 15  # Large average trade size
     elif avg_trade_size >= 10:
@@ -748,7 +902,6 @@ def calculate_unusualness_score(option, trades, stock_price, option_data=None):
         print(f"Error calculating expiry score: {e}")
     
     # 5. Premium Size (0-20 points)
-    avg_price = sum(t.get('price', 0) * t.get('size', 0) for t in trades) / total_volume if total_volume > 0 else 0
     total_premium = total_volume * 100 * avg_price  # Each contract is 100 shares
     
     premium_score = 0
@@ -777,74 +930,106 @@ def calculate_unusualness_score(option, trades, stock_price, option_data=None):
     return final_score, score_breakdown
 
 
-def get_unusual_options_activity(ticker):
+def get_price_range_multiplier(ticker, high_performance=None):
     """
-    Get unusual options activity for a ticker based on volume spikes
+    Get the strike distance (as a fraction of the stock price) used by the scan
     
     Args:
-        ticker: Stock ticker symbol
+        ticker: Stock ticker symbol (uppercase)
+        high_performance: Use the narrower price range; None reads HIGH_PERFORMANCE_MODE
         
     Returns:
-        Dictionary with unusual options activity data
+        Maximum |strike - price| / price for a contract to be analyzed
     """
-    if not ticker:
-        return None
+    # Fall back to the process-wide flag set by unusual_activity
+    if high_performance is None:
+        high_performance = os.environ.get('HIGH_PERFORMANCE_MODE', 'false').lower() == 'true'
+    
+    # Per user request: use at least 20% price range for all tickers
+    price_range_multiplier = 0.25  # 25% is the default
+    
+    # For high volume tickers, use the minimum required range (20%)
+    if ticker in HIGH_VOLUME_TICKERS:
+        price_range_multiplier = 0.20  # 20% of current price
+        print(f"Using optimized price range ({price_range_multiplier*100}%) for high-volume ticker {ticker}")
+    elif high_performance:
+        # For high performance mode requests, use the minimum (20%)
+        price_range_multiplier = 0.20  # 20% of current price 
+        print(f"Using high-performance price range ({price_range_multiplier*100}%) for {ticker}")
+    
+    return price_range_multiplier
+
+
+def get_strike_bucket(stock_price):
+    """
+    Width of the strike buckets server-side filters are rounded to
     
-    ticker = ticker.upper()
-    current_time = datetime.now()
-    today = current_time.strftime('%Y-%m-%d')
+    Args:
+        stock_price: Current price of the underlying stock
+        
+    Returns:
+        The smallest 1/2.5/5 x 10^n step covering STRIKE_BUCKET_FRACTION of the price
+    """
+    target = stock_price * STRIKE_BUCKET_FRACTION
+    magnitude = 10 ** math.floor(math.log10(target))
+    for step in (1.0, 2.5, 5.0):
+        if step * magnitude >= target:
+            return step * magnitude
+    return 10.0 * magnitude
+
+
+def get_strike_filters(stock_price, price_range_multiplier):
+    """
+    Build server-side strike filters for iter_option_contracts
     
-    # Check if we have cached data for this ticker that's still valid
-    print(f"DEBUG: Cache check before API call - {ticker} {'in' if cache_module.cache_contains(ticker) else 'not in'} cache")
-    cache_module.print_cache_contents()  # Debug: print all cache contents
-    cached_data, found = cache_module.get_from_cache(ticker)
-    if found:
-        print(f"DEBUG: Using cached data for {ticker} with {len(cached_data) if cached_data else 0} items")
-        return cached_data
-    print(f"DEBUG: Cache miss for {ticker}, fetching fresh data from API")
+    The bounds are rounded outwards to strike buckets (see get_strike_bucket)
+    so repeated scans between price ticks share one cached listing;
+    select_near_money_options applies the exact range locally.
     
-    try:
-        # Get options for today's date
-        chain = get_option_chain(ticker)
-        
-        if not chain:
-            print(f"No option chain found for {ticker}")
-            print(f"No fallback to Yahoo Finance - using only Polygon.io data as requested")
-            return None
-        
-        # Get current stock price for context
-        stock_price = get_current_price(ticker)
+    Args:
+        stock_price: Current price of the underlying stock
+        price_range_multiplier: Fraction of the price to keep on either side
         
-        # Track potential unusual activity and ALL options for comprehensive market sentiment
-        unusual_activity = []
-        all_options = []  # Track ALL analyzed options to get a complete view of market sentiment
-        forbidden_error_count = 0
-        processed_options = 0
+    Returns:
+        Dictionary with strike_price_gte / strike_price_lte (empty if no price)
+    """
+    if not stock_price:
+        return {}
+    bucket = get_strike_bucket(stock_price)
+    # The small tolerance keeps exact multiples (75.0) from being widened by float noise
+    low = math.floor(stock_price * (1 - price_range_multiplier) / bucket + 1e-9) * bucket
+    high = math.ceil(stock_price * (1 + price_range_multiplier) / bucket - 1e-9) * bucket
+    return {'strike_price_gte': round(max(low, 0.0), 2), 'strike_price_lte': round(high, 2)}
+
+
+def select_near_money_options(chain, stock_price, ticker, high_performance=None, price_range_multiplier=None):
+    """
+    Filter an option chain down to the near-the-money contracts worth scanning
+    
+    Args:
+        chain: Iterable of option contracts, either a list from get_option_chain
+            or the iter_option_contracts generator (filtered as pages arrive)
+        stock_price: Current price of the underlying stock
+        ticker: Stock ticker symbol (uppercase)
+        high_performance: Use the narrower price range; None reads HIGH_PERFORMANCE_MODE
+        price_range_multiplier: Precomputed range from get_price_range_multiplier
         
-        # Filter options to include more strikes (25% from current price) and minimum open interest
-        near_money_options = []
-        total_options = len(chain) if chain else 0
-        filtered_by_strike = 0
-        filtered_by_interest = 0
-        
-        # Optimize for high-volume tickers to avoid timeout issues
-        high_volume_tickers = {'AAPL', 'MSFT', 'TSLA', 'SPY', 'QQQ', 'NVDA', 'AMZN', 'GOOGL', 'META', 'AMD'}
-        high_performance_mode = os.environ.get('HIGH_PERFORMANCE_MODE', 'false').lower() == 'true'
-        
-        # Per user request: use at least 20% price range for all tickers
-        price_range_multiplier = 0.25  # 25% is the default
-        
-        # For high volume tickers, use the minimum required range (20%)
-        if ticker in high_volume_tickers:
-            price_range_multiplier = 0.20  # 20% of current price
-            print(f"Using optimized price range ({price_range_multiplier*100}%) for high-volume ticker {ticker}")
-        elif high_performance_mode:
-            # For high performance mode requests, use the minimum (20%)
-            price_range_multiplier = 0.20  # 20% of current price 
-            print(f"Using high-performance price range ({price_range_multiplier*100}%) for {ticker}")
-        
-        if stock_price:
+    Returns:
+        List of contracts sorted by distance from the current price
+    """
+    # Filter options to include more strikes (25% from current price) and minimum open interest
+    near_money_options = []
+    total_options = 0
+    filtered_by_strike = 0
+    filtered_by_interest = 0
+    
+    if price_range_multiplier is None:
+        price_range_multiplier = get_price_range_multiplier(ticker, high_performance)
+    
+    with pipeline_metrics.stage('filter'):
+        if stock_price and chain:
             for option in chain:
+                total_options += 1
                 option_symbol = option.get('ticker')
                 strike = option.get('strike_price')
                 expiry = option.get('expiration_date')
@@ -866,7 +1051,7 @@ def get_unusual_options_activity(ticker):
                 # We confirmed that filtering by open interest blocks all options with our API key
                 if random.random() < 0.01:  # Only print ~1% of options to avoid flooding logs
                     print(f"DEBUG: Option {option.get('ticker')} - Strike: {strike}, Open Interest: {open_interest}")
-                    
+                
                 # Always include all options regardless of open interest
                 # Use other factors like trade volume for scoring instead
                 interest_filter = True
@@ -878,13 +1063,202 @@ def get_unusual_options_activity(ticker):
                 # Only include options that meet both criteria
                 near_money_options.append(option)
         
-        print(f"Found {len(near_money_options)} options to analyze (within {price_range_multiplier*100:.0f}% of price and min. open interest)")
-        print(f"Filtered out {filtered_by_strike} options outside price range and {filtered_by_interest} with insufficient open interest")
-        print(f"Total options in chain: {total_options}")
-        
         # No longer limiting the number of options - analyze all near-the-money options
         # Sort by proximity to current price for better analysis in the output
         near_money_options.sort(key=lambda x: abs(x.get('strike_price', 0) - stock_price))
+    
+    print(f"Found {len(near_money_options)} options to analyze (within {price_range_multiplier*100:.0f}% of price and min. open interest)")
+    print(f"Filtered out {filtered_by_strike} options outside price range and {filtered_by_interest} with insufficient open interest")
+    print(f"Total options in chain: {total_options}")
+    
+    return near_money_options
+
+
+def get_unusual_activity_from_snapshot(ticker, stock_price, price_range_multiplier):
+    """
+    Run the unusual activity scan from the per-underlying options snapshot
+    
+    The whole near-the-money chain is scored from a few paginated snapshot
+    calls; only the top candidates get a per-contract /v3/trades request.
+    
+    Args:
+        ticker: Stock ticker symbol (uppercase)
+        stock_price: Current price of the underlying stock
+        price_range_multiplier: Strike range from get_price_range_multiplier
+        
+    Returns:
+        Dictionary with unusual options activity data, or None if the
+        snapshot could not be loaded (the caller falls back to the trades scan)
+    """
+    from parallel_options import analyze_option_snapshots
+    
+    snapshots = polygon_snapshot.get_option_snapshots(ticker, **get_strike_filters(stock_price, price_range_multiplier))
+    if snapshots is None:
+        return None
+    
+    near_money_options = select_near_money_options(snapshots, stock_price, ticker,
+                                                   price_range_multiplier=price_range_multiplier)
+    return analyze_option_snapshots(near_money_options, stock_price, get_headers(), ticker)
+
+
+async def get_unusual_activity_from_snapshot_async(ticker, stock_price, price_range_multiplier):
+    """
+    Async version of get_unusual_activity_from_snapshot
+    
+    Args:
+        ticker: Stock ticker symbol (uppercase)
+        stock_price: Current price of the underlying stock
+        price_range_multiplier: Strike range from get_price_range_multiplier
+        
+    Returns:
+        Same as get_unusual_activity_from_snapshot
+    """
+    from parallel_options import analyze_option_snapshots_async
+    
+    snapshots = await polygon_snapshot.get_option_snapshots_async(ticker, **get_strike_filters(stock_price, price_range_multiplier))
+    if snapshots is None:
+        return None
+    
+    near_money_options = select_near_money_options(snapshots, stock_price, ticker,
+                                                   price_range_multiplier=price_range_multiplier)
+    return await analyze_option_snapshots_async(near_money_options, stock_price, get_headers(), ticker)
+
+
+def get_unusual_options_activity(ticker):
+    """
+    Get unusual options activity for a ticker based on volume spikes
+    
+    Concurrent requests for the same ticker share one scan: callers that
+    arrive while a scan is running wait for it and get the same result.
+    With cache_module.STALE_WHILE_REVALIDATE, a recently expired result is
+    returned right away (labeled with 'stale' and 'age_seconds') while a
+    background thread rescans the ticker.
+    
+    Args:
+        ticker: Stock ticker symbol
+        
+    Returns:
+        Dictionary with unusual options activity data
+    """
+    if not ticker:
+        return None
+    
+    ticker = ticker.upper()
+    stale = get_stale_result(ticker)
+    if stale is not None:
+        if _claim_refresh(ticker):
+            threading.Thread(target=_refresh_in_background, args=(ticker,),
+                             name=f"refresh-{ticker}", daemon=True).start()
+        return stale
+    return _scan_flight.do(ticker, scan_unusual_options_activity, ticker)
+
+
+def get_stale_result(ticker):
+    """
+    Get a cached result that expired within the stale grace window
+    
+    Args:
+        ticker: Stock ticker symbol (uppercase)
+        
+    Returns:
+        The cached result labeled with 'stale': True and 'age_seconds', or
+        None if stale-while-revalidate is off or the entry is fresh or missing
+    """
+    if not cache_module.STALE_WHILE_REVALIDATE:
+        return None
+    data, state, age = cache_module.lookup_cache(ticker)
+    if state != 'stale' or not data:
+        return None
+    pipeline_metrics.record_stale_serve(age)
+    print(f"Serving {ticker} from cache ({age:.1f} seconds old) while it refreshes")
+    if isinstance(data, dict):
+        return dict(data, stale=True, age_seconds=age)
+    # Old list format: nothing to label
+    return data
+
+
+def _claim_refresh(ticker):
+    """Mark a background refresh for ticker as started; False if one is already running"""
+    with _refreshing_lock:
+        if ticker in _refreshing:
+            return False
+        _refreshing.add(ticker)
+        return True
+
+
+def _release_refresh(ticker):
+    with _refreshing_lock:
+        _refreshing.discard(ticker)
+
+
+def _refresh_in_background(ticker):
+    """Rescan a ticker so the stale entry is replaced (runs in its own thread)"""
+    try:
+        # The entry is known to be stale: skip the cache check (and its miss)
+        _scan_flight.do(ticker, scan_unusual_options_activity, ticker, use_cache=False)
+    except Exception as e:
+        print(f"Background refresh of {ticker} failed: {str(e)}")
+    finally:
+        _release_refresh(ticker)
+
+
+def scan_unusual_options_activity(ticker, use_cache=True):
+    """
+    Run the unusual options activity scan for a ticker (cache check included)
+    
+    Call get_unusual_options_activity instead so that concurrent requests
+    for the same ticker are coalesced. The time spent scanning is recorded
+    as a refresh of the ticker (see pipeline_metrics.get_cache_metrics).
+    
+    Args:
+        ticker: Stock ticker symbol (uppercase)
+        use_cache: Return a valid cached result instead of scanning
+        
+    Returns:
+        Dictionary with unusual options activity data
+    """
+    if use_cache:
+        cached_data, found = cache_module.get_from_cache(ticker)
+        if found:
+            return cached_data
+        print(f"Cache miss for {ticker}, fetching fresh data from API")
+    
+    with pipeline_metrics.refresh_timer(ticker):
+        return _scan_unusual_options_activity(ticker)
+
+
+def _scan_unusual_options_activity(ticker):
+    """Fetch, score and cache unusual options activity for a ticker (no cache check)"""
+    try:
+        # Get current stock price first so the strike range can be filtered server-side
+        stock_price = get_current_price(ticker)
+        
+        if not stock_price:
+            print(f"No current price for {ticker}, cannot select near-the-money options")
+            print(f"No fallback to Yahoo Finance - using only Polygon.io data as requested")
+            return None
+        
+        price_range_multiplier = get_price_range_multiplier(ticker)
+        
+        # Score the whole chain from the options snapshot when available
+        if polygon_snapshot.INGESTION_MODE == 'snapshot':
+            result_with_metadata = get_unusual_activity_from_snapshot(ticker, stock_price, price_range_multiplier)
+            if result_with_metadata is not None:
+                cache_module.add_to_cache(ticker, result_with_metadata)
+                return result_with_metadata
+            print(f"Options snapshot unavailable for {ticker}, falling back to per-contract trades")
+        
+        # Stream contracts page by page so filtering starts before the last page arrives
+        chain = iter_option_contracts(ticker, **get_strike_filters(stock_price, price_range_multiplier))
+        
+        # Track potential unusual activity and ALL options for comprehensive market sentiment
+        unusual_activity = []
+        all_options = []  # Track ALL analyzed options to get a complete view of market sentiment
+        forbidden_error_count = 0
+        processed_options = 0
+        
+        near_money_options = select_near_money_options(chain, stock_price, ticker,
+                                                       price_range_multiplier=price_range_multiplier)
         
         # Check if we should use parallel processing
         try:
@@ -924,8 +1298,10 @@ def get_unusual_options_activity(ticker):
             contract_type = option.get('contract_type', '').lower()
                 
             # Get trades for this option
-            endpoint = f"{BASE_URL}/v3/trades/{option_symbol}?limit=50&order=desc&apiKey={POLYGON_API_KEY}"
-            response = throttled_api_call(endpoint, headers=get_headers())
+            # Only trades newer than the contract's high-water mark are downloaded
+            endpoint = build_trades_url(option_symbol)
+            with pipeline_metrics.stage('trade_fetch'):
+                response = throttled_api_call(endpoint, headers=get_headers())
             
             processed_options += 1
             
@@ -939,15 +1315,17 @@ def get_unusual_options_activity(ticker):
                 continue
                 
             data = response.json()
-            trades = data.get('results', [])
+            new_trades = data.get('results', [])
+            trades = merge_trades(option_symbol, new_trades)
             
             # Print raw option data for debug
-            print(f"Found {len(trades)} trades for {option_symbol}")
+            print(f"Found {len(new_trades)} new trades for {option_symbol} ({len(trades)} held)")
             
             # Use our scoring system to evaluate unusual activity
             if trades:
                 # Calculate unusualness score
-                unusualness_score, score_breakdown = calculate_unusualness_score(option, trades, stock_price)
+                with pipeline_metrics.stage('scoring'):
+                    unusualness_score, score_breakdown = calculate_unusualness_score(option, trades, stock_price)
                 print(f"Option {option_symbol} received unusualness score: {unusualness_score}")
                 
                 # Calculate metrics for the activity (for ALL options)
@@ -1137,6 +1515,7 @@ def get_unusual_options_activity(ticker):
                                 pass
                         
                         # Create the trade object with all required fields
+                        # (implied volatility is solved from the prices during the analysis)
                         trade = {
                             'id': opt.get('id', opt.get('contract', '')),
                             'symbol': opt.get('contract', ''),
@@ -1148,8 +1527,7 @@ def get_unusual_options_activity(ticker):
                             'expiration_date': expiration_date,
                             'days_to_expiration': days_to_expiration,
                             'sentiment': opt.get('sentiment', ''),
-                            'timestamp': trade_timestamp,  # Numeric timestamp for comparison
-                            'implied_volatility': 0.3  # Default IV for calculations
+                            'timestamp': trade_timestamp  # Numeric timestamp for comparison
                         }
                         
                         # Add human readable timestamps if available
@@ -1169,13 +1547,14 @@ def get_unusual_options_activity(ticker):
                     stock_price = get_current_price(ticker)
                     
                     # Perform institutional sentiment analysis
-                    inst_analysis = analyze_institutional_sentiment(option_trades, stock_price)
+                    with pipeline_metrics.stage('institutional_analysis'):
+                        inst_analysis = analyze_institutional_sentiment(option_trades, stock_price)
+                        
+                        # Generate the human-readable summary
+                        inst_summary = get_human_readable_summary(inst_analysis, ticker)
                     
                     # Add the results to our metadata
                     result_with_metadata['institutional_analysis'] = inst_analysis
-                    
-                    # Generate the human-readable summary
-                    inst_summary = get_human_readable_summary(inst_analysis, ticker)
                     result_with_metadata['institutional_summary'] = inst_summary
                     
                     # If hedging was detected, adjust the sentiment counts
@@ -1220,6 +1599,146 @@ def get_unusual_options_activity(ticker):
         return empty_result
 
 
+async def get_unusual_options_activity_async(ticker, high_performance=None):
+    """
+    Async version of get_unusual_options_activity for the Discord bot
+    
+    Runs the whole scan on the caller's event loop: the chain, price and
+    per-contract trade requests are awaited through async_polygon_client
+    rather than handed to a thread pool. Concurrent requests for the same
+    ticker (e.g. several users asking right after the open) await one scan.
+    A recently expired result is returned right away while a background
+    task on the same loop rescans the ticker (stale-while-revalidate).
+    
+    Args:
+        ticker: Stock ticker symbol
+        high_performance: Use the narrower strike range (see select_near_money_options)
+        
+    Returns:
+        Dictionary with unusual options activity data
+    """
+    if not ticker:
+        return None
+    
+    ticker = ticker.upper()
+    # Cache reads and writes hit SQLite (or the pickle file): keep them off the loop
+    stale = await asyncio.to_thread(get_stale_result, ticker)
+    if stale is not None:
+        if _claim_refresh(ticker):
+            task = asyncio.create_task(_refresh_in_background_async(ticker, high_performance))
+            _background_refreshes.add(task)
+            task.add_done_callback(_background_refreshes.discard)
+        return stale
+    return await _async_scan_flight.do(ticker, scan_unusual_options_activity_async, ticker, high_performance)
+
+
+async def refresh_unusual_options_activity_async(ticker, high_performance=None):
+    """
+    Rescan a ticker even if its cached result is still valid (used for prewarming)
+    
+    Shares the in-flight scan with concurrent requests for the same ticker.
+    
+    Args:
+        ticker: Stock ticker symbol
+        high_performance: Use the narrower strike range (see select_near_money_options)
+        
+    Returns:
+        Dictionary with unusual options activity data
+    """
+    ticker = ticker.upper()
+    return await _async_scan_flight.do(ticker, scan_unusual_options_activity_async, ticker, high_performance,
+                                       use_cache=False)
+
+
+async def _refresh_in_background_async(ticker, high_performance=None):
+    """Rescan a ticker so the stale entry is replaced (runs as a background task)"""
+    try:
+        await _async_scan_flight.do(ticker, scan_unusual_options_activity_async, ticker, high_performance,
+                                    use_cache=False)
+    except Exception as e:
+        print(f"Background refresh of {ticker} failed: {str(e)}")
+    finally:
+        _release_refresh(ticker)
+
+
+async def scan_unusual_options_activity_async(ticker, high_performance=None, use_cache=True):
+    """
+    Run the async unusual options activity scan for a ticker (cache check included)
+    
+    Call get_unusual_options_activity_async instead so that concurrent
+    requests for the same ticker are coalesced. The time spent scanning is
+    recorded as a refresh of the ticker.
+    
+    Args:
+        ticker: Stock ticker symbol (uppercase)
+        high_performance: Use the narrower strike range (see select_near_money_options)
+        use_cache: Return a valid cached result instead of scanning
+        
+    Returns:
+        Dictionary with unusual options activity data
+    """
+    if use_cache:
+        cached_data, found = await asyncio.to_thread(cache_module.get_from_cache, ticker)
+        if found:
+            return cached_data
+    
+    with pipeline_metrics.refresh_timer(ticker):
+        return await _scan_unusual_options_activity_async(ticker, high_performance)
+
+
+async def _scan_unusual_options_activity_async(ticker, high_performance=None):
+    """Fetch, score and cache unusual options activity for a ticker (no cache check)"""
+    from parallel_options import analyze_options_in_parallel_async
+    
+    try:
+        stock_price = await get_current_price_async(ticker)
+        
+        if not stock_price:
+            print(f"No current price for {ticker}, cannot select near-the-money options")
+            return None
+        
+        price_range_multiplier = get_price_range_multiplier(ticker, high_performance)
+        
+        if polygon_snapshot.INGESTION_MODE == 'snapshot':
+            result_with_metadata = await get_unusual_activity_from_snapshot_async(ticker, stock_price, price_range_multiplier)
+            if result_with_metadata is not None:
+                await asyncio.to_thread(cache_module.add_to_cache, ticker, result_with_metadata)
+                return result_with_metadata
+            print(f"Options snapshot unavailable for {ticker}, falling back to per-contract trades")
+        
+        chain = await get_option_chain_async(ticker, **get_strike_filters(stock_price, price_range_multiplier))
+        
+        if not chain:
+            print(f"No option chain found for {ticker}")
+            return None
+        
+        near_money_options = select_near_money_options(chain, stock_price, ticker,
+                                                       price_range_multiplier=price_range_multiplier)
+        
+        result_with_metadata = await analyze_options_in_parallel_async(
+            near_money_options,
+            stock_price,
+            get_headers(),
+            ticker
+        )
+        
+        await asyncio.to_thread(cache_module.add_to_cache, ticker, result_with_metadata)
+        return result_with_metadata
+        
+    except Exception as e:
+        print(f"Error fetching unusual activity for {ticker}: {str(e)}")
+        
+        # Cache error results to prevent repeated API calls that will fail
+        empty_result = {
+            'unusual_options': [],
+            'total_bullish_count': 0,
+            'total_bearish_count': 0,
+            'all_options_analyzed': 0
+        }
+        await asyncio.to_thread(cache_module.add_to_cache, ticker, empty_result)
+        return empty_result
+
+
 def extract_strike_from_symbol(symbol):
     """Extract actual strike price from option symbol like O:TSLA250417C00252500"""
     if not symbol or not symbol.startswith('O:'):
@@ -1247,19 +1766,51 @@ def get_simplified_unusual_activity_summary(ticker):
     """
     ticker = ticker.upper() if ticker else ""
     
-    # Initialize timestamp_str at the function level to avoid "possibly unbound" error
-    timestamp_str = ""
-    
     if not ticker:
         return "Please specify a valid ticker symbol."
     
     print(f"Using Polygon.io data for unusual activity summary for {ticker}")
     
-    # Check if we have ticker in cache before calling the function
-    print(f"DEBUG: Cache check before API call - {ticker} {'in' if cache_module.cache_contains(ticker) else 'not in'} cache")
-        
     result_with_metadata = get_unusual_options_activity(ticker)
     
+    with pipeline_metrics.stage('formatting'):
+        return format_unusual_activity_summary(ticker, result_with_metadata)
+
+async def get_simplified_unusual_activity_summary_async(ticker, high_performance=None):
+    """
+    Async version of get_simplified_unusual_activity_summary
+    
+    Args:
+        ticker: Stock ticker symbol
+        high_performance: Use the narrower strike range (see select_near_money_options)
+        
+    Returns:
+        A string with a conversational summary of unusual options activity
+    """
+    ticker = ticker.upper() if ticker else ""
+    
+    if not ticker:
+        return "Please specify a valid ticker symbol."
+    
+    result_with_metadata = await get_unusual_options_activity_async(ticker, high_performance=high_performance)
+    
+    with pipeline_metrics.stage('formatting'):
+        return format_unusual_activity_summary(ticker, result_with_metadata)
+
+def format_unusual_activity_summary(ticker, result_with_metadata):
+    """
+    Format unusual options activity results as a conversational summary
+    
+    Args:
+        ticker: Stock ticker symbol (uppercase)
+        result_with_metadata: Result from get_unusual_options_activity
+        
+    Returns:
+        A string with a conversational summary of unusual options activity
+    """
+    # Initialize timestamp_str at the function level to avoid "possibly unbound" error
+    timestamp_str = ""
+    
     if not result_with_metadata or len(result_with_metadata) == 0:
         # No fallback to Yahoo Finance - only using Polygon.io data as requested
         print(f"No unusual options activity found for {ticker} in Polygon.io data, and not falling back to Yahoo Finance as requested")
@@ -1520,4 +2071,9 @@ def get_simplified_unusual_activity_summary(ticker):
         if hedging_pct > 5:  # Only show if there's significant hedging (>5%)
             summary += f"\n\n📊 After filtering out {hedging_pct}% hedging activity, the adjusted flow is: {adj_bullish_pct}% bullish / {adj_bearish_pct}% bearish"
     
+    # Stale-while-revalidate results say how old they are
+    if isinstance(result_with_metadata, dict) and result_with_metadata.get('stale'):
+        age_minutes = max(1, round(result_with_metadata.get('age_seconds', 0) / 60))
+        summary += f"\n\n⏳ Data from {age_minutes} minute{'s' if age_minutes != 1 else ''} ago, refreshing now."
+    
     return summary
\ No newline at end of file
@@ -0,0 +1,368 @@
+"""
+Record/replay support for Polygon.io traffic
+
+Recording captures the responses of a real run (through the shared session
+in polygon_client) into a JSON fixture file. Replay serves those responses
+from a local HTTP stand-in for api.polygon.io, so the whole
+get_unusual_options_activity pipeline can be timed and tuned offline and
+repeatably. The stand-in can inject latency, 429s (with Retry-After) and
+403s to exercise the rate limiter, concurrency controller and breaker.
+
+Usage:
+    python polygon_replay.py record AAPL TSLA --out fixtures/polygon/aapl_tsla.json
+    python polygon_replay.py serve fixtures/polygon/aapl_tsla.json --latency 0.05 --rate-limit 0.02
+
+API keys are never written to fixtures: the apiKey parameter is dropped
+from recorded URLs and from next_url cursors.
+"""
+import argparse
+import json
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qsl, urlencode
+
+import polygon_client
+
+# Modules that copy polygon_client.BASE_URL at import time and need to be
+# pointed at the stand-in
+CLIENT_MODULES = ['polygon_client', 'polygon_integration', 'polygon_trades', 'polygon_snapshot', 'parallel_options']
+
+FIXTURE_VERSION = 1
+
+
+def request_key(url):
+    """
+    Normalize a request URL into a fixture key
+
+    Args:
+        url: Full URL or path with query string
+
+    Returns:
+        Path plus sorted query parameters, without the apiKey
+    """
+    parsed = urlparse(url)
+    params = sorted((k, v) for k, v in parse_qsl(parsed.query, keep_blank_values=True) if k != 'apiKey')
+    return f"{parsed.path}?{urlencode(params)}" if params else parsed.path
+
+
+def _strip_api_key(url):
+    parsed = urlparse(url)
+    params = [(k, v) for k, v in parse_qsl(parsed.query, keep_blank_values=True) if k != 'apiKey']
+    return parsed._replace(query=urlencode(params)).geturl()
+
+
+class PolygonRecorder:
+    """
+    Capture every response received by the shared polygon_client session
+
+    Use as a context manager around a live run; the fixture is written on exit.
+    """
+
+    def __init__(self, fixture_path):
+        self.fixture_path = fixture_path
+        self.responses = {}
+        self.base_url = None
+        self._lock = threading.Lock()
+
+    def _on_response(self, response, *args, **kwargs):
+        try:
+            body = response.json()
+        except ValueError:
+            body = response.text
+        if isinstance(body, dict) and body.get('next_url'):
+            body['next_url'] = _strip_api_key(body['next_url'])
+
+        entry = {'status': response.status_code, 'body': body}
+        if 'Retry-After' in response.headers:
+            entry['headers'] = {'Retry-After': response.headers['Retry-After']}
+
+        parsed = urlparse(response.url)
+        with self._lock:
+            # Remember the host so replay can rewrite next_url cursors
+            self.base_url = self.base_url or f"{parsed.scheme}://{parsed.netloc}"
+            self.responses[request_key(response.url)] = entry
+        return response
+
+    def __enter__(self):
+        polygon_client.get_session().hooks['response'].append(self._on_response)
+        return self
+
+    def __exit__(self, *exc):
+        hooks = polygon_client.get_session().hooks['response']
+        if self._on_response in hooks:
+            hooks.remove(self._on_response)
+        self.save()
+        return False
+
+    def save(self):
+        """Write the captured responses to the fixture file"""
+        directory = os.path.dirname(self.fixture_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            fixture = {
+                'version': FIXTURE_VERSION,
+                'base_url': self.base_url or polygon_client.BASE_URL,
+                'recorded_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'responses': self.responses
+            }
+            with open(self.fixture_path, 'w') as f:
+                json.dump(fixture, f)
+        print(f"Recorded {len(self.responses)} responses to {self.fixture_path}")
+
+
+def load_fixture(fixture_path):
+    """
+    Load a recorded fixture file
+
+    Args:
+        fixture_path: Path written by PolygonRecorder
+
+    Returns:
+        Fixture dictionary with 'base_url' and 'responses'
+    """
+    with open(fixture_path) as f:
+        return json.load(f)
+
+
+class PolygonStandIn:
+    """
+    Local HTTP stand-in for api.polygon.io
+
+    Serves recorded responses (or ones added with add_response) and can
+    inject faults. Unknown requests get a 404 like Polygon's NOT_FOUND.
+
+    Args:
+        fixture_path: Optional fixture written by PolygonRecorder
+        latency: Seconds added to every response
+        jitter: Extra random latency, uniform in [0, jitter]
+        rate_limit_rate: Fraction of requests answered with 429
+        retry_after: Retry-After value sent with injected 429s
+        forbidden_prefixes: Path prefixes answered with 403
+        seed: Random seed so injected faults are repeatable
+    """
+
+    def __init__(self, fixture_path=None, latency=0.0, jitter=0.0, rate_limit_rate=0.0,
+                 retry_after=1, forbidden_prefixes=(), seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.forbidden_prefixes = tuple(forbidden_prefixes)
+        self.responses = {}
+        self.recorded_base_url = polygon_client.BASE_URL
+        self.request_log = []
+        self.bytes_served = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = None
+
+        if fixture_path:
+            fixture = load_fixture(fixture_path)
+            self.responses.update(fixture.get('responses', {}))
+            self.recorded_base_url = fixture.get('base_url', self.recorded_base_url)
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self._server.server_port}" if self._server else None
+
+    def add_response(self, url, body, status=200, headers=None):
+        """Register a response for a URL or path (query parameters are normalized)"""
+        entry = {'status': status, 'body': body}
+        if headers:
+            entry['headers'] = headers
+        self.responses[request_key(url)] = entry
+
+    def _lookup(self, url):
+        """
+        Find the response for a request, applying timestamp.gt like Polygon
+
+        An incremental trades request (see polygon_trades.build_trades_url)
+        is answered from the response recorded without timestamp.gt, keeping
+        only the results newer than the requested timestamp.
+        """
+        key = request_key(url)
+        if key in self.responses:
+            return self.responses[key]
+
+        params = parse_qsl(urlparse(url).query, keep_blank_values=True)
+        since = [v for k, v in params if k == 'timestamp.gt']
+        base_key = request_key(urlparse(url)._replace(
+            query=urlencode([(k, v) for k, v in params if k != 'timestamp.gt'])).geturl())
+        entry = self.responses.get(base_key)
+        if not since or entry is None or not isinstance(entry['body'], dict):
+            return None
+
+        since = int(since[0])
+        body = dict(entry['body'])
+        body['results'] = [r for r in body.get('results', []) if r.get('sip_timestamp', 0) > since]
+        return dict(entry, body=body)
+
+    def _pick_fault(self, path):
+        with self._lock:
+            if any(path.startswith(prefix) for prefix in self.forbidden_prefixes):
+                return 403
+            if self.rate_limit_rate and self._random.random() < self.rate_limit_rate:
+                return 429
+            return None
+
+    def _delay(self):
+        with self._lock:
+            extra = self._random.uniform(0, self.jitter) if self.jitter else 0.0
+        return self.latency + extra
+
+    def _render(self, entry):
+        body = entry['body']
+        text = body if isinstance(body, str) else json.dumps(body)
+        # Cursors point at the recorded host; send the client back here instead
+        return text.replace(self.recorded_base_url, self.base_url).encode()
+
+    def _make_handler(self):
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = urlparse(self.path).path
+                key = request_key(self.path)
+                delay = stand_in._delay()
+                if delay > 0:
+                    time.sleep(delay)
+
+                fault = stand_in._pick_fault(path)
+                entry = stand_in._lookup(self.path) if fault is None else None
+                headers = {}
+                if fault == 429:
+                    status, payload = 429, json.dumps({'status': 'ERROR', 'error': 'Too many requests'}).encode()
+                    headers['Retry-After'] = str(stand_in.retry_after)
+                elif fault == 403:
+                    status, payload = 403, json.dumps({'status': 'NOT_AUTHORIZED'}).encode()
+                elif entry is not None:
+                    status, payload = entry['status'], stand_in._render(entry)
+                    headers.update(entry.get('headers', {}))
+                else:
+                    status, payload = 404, json.dumps({'status': 'NOT_FOUND', 'request': key}).encode()
+
+                with stand_in._lock:
+                    stand_in.request_log.append((key, status))
+                    stand_in.bytes_served += len(payload)
+
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self, port=0):
+        """Start serving on a background thread; returns the base URL"""
+        self._server = ThreadingHTTPServer(('127.0.0.1', port), self._make_handler())
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self.base_url
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def status_counts(self):
+        """Count of responses served per status code"""
+        counts = {}
+        with self._lock:
+            for _, status in self.request_log:
+                counts[status] = counts.get(status, 0) + 1
+        return counts
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+
+@contextmanager
+def use_base_url(base_url):
+    """
+    Point every Polygon client module at another base URL (e.g. a stand-in)
+
+    Args:
+        base_url: Base URL to use inside the block
+    """
+    import importlib
+
+    modules = [importlib.import_module(name) for name in CLIENT_MODULES]
+    originals = [module.BASE_URL for module in modules]
+    for module in modules:
+        module.BASE_URL = base_url
+    try:
+        yield
+    finally:
+        for module, original in zip(modules, originals):
+            module.BASE_URL = original
+
+
+def record(tickers, fixture_path):
+    """
+    Run the unusual activity scan against live Polygon and record the traffic
+
+    Args:
+        tickers: Ticker symbols to scan
+        fixture_path: Where to write the fixture
+    """
+    import cache_module
+    import polygon_integration
+
+    with PolygonRecorder(fixture_path):
+        for ticker in tickers:
+            cache_module.remove_from_cache(ticker)
+            polygon_integration.get_unusual_options_activity(ticker)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record or replay Polygon.io traffic")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    record_parser = commands.add_parser('record', help="Record a live unusual activity scan")
+    record_parser.add_argument('tickers', nargs='+')
+    record_parser.add_argument('--out', required=True)
+
+    serve_parser = commands.add_parser('serve', help="Serve a fixture from a local stand-in")
+    serve_parser.add_argument('fixture')
+    serve_parser.add_argument('--port', type=int, default=8765)
+    serve_parser.add_argument('--latency', type=float, default=0.0)
+    serve_parser.add_argument('--jitter', type=float, default=0.0)
+    serve_parser.add_argument('--rate-limit', type=float, default=0.0, help="Fraction of requests answered with 429")
+    serve_parser.add_argument('--forbidden', action='append', default=[], help="Path prefix answered with 403")
+
+    args = parser.parse_args()
+    if args.command == 'record':
+        record([ticker.upper() for ticker in args.tickers], args.out)
+        return
+
+    stand_in = PolygonStandIn(args.fixture, latency=args.latency, jitter=args.jitter,
+                              rate_limit_rate=args.rate_limit, forbidden_prefixes=args.forbidden)
+    base_url = stand_in.start(args.port)
+    print(f"Serving {len(stand_in.responses)} recorded responses at {base_url}")
+    print(f"Run the bot or tests with POLYGON_BASE_URL={base_url}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        stand_in.stop()
+
+
+if __name__ == "__main__":
+    main()
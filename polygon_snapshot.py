@@ -0,0 +1,254 @@
+"""
+Options chain snapshot ingestion from Polygon.io
+
+One request to /v3/snapshot/options/{underlying} returns up to 250 contracts
+together with their day volume, last trade, open interest, implied volatility
+and greeks. The unusual activity scan uses it to score a whole chain in a few
+paginated calls and keeps per-contract /v3/trades requests for the top
+candidates only (see parallel_options.analyze_option_snapshots).
+
+Snapshots are quotes, so they are cached for seconds only
+(cache_module.QUOTE_CACHE_TTL).
+"""
+import os
+from urllib.parse import urlencode
+from dotenv import load_dotenv
+import cache_module
+import polygon_client
+import pipeline_metrics
+from polygon_client import polygon_get
+from polygon_trades import format_timestamp
+
+# Load environment variables
+load_dotenv()
+POLYGON_API_KEY = os.getenv('POLYGON_API_KEY')
+BASE_URL = polygon_client.BASE_URL
+
+# 'snapshot' scores the chain from /v3/snapshot/options; 'trades' keeps the
+# original one-/v3/trades-call-per-contract scan. Snapshot mode falls back to
+# the trades scan automatically if the plan doesn't include snapshots.
+INGESTION_MODE = os.getenv('OPTIONS_INGESTION_MODE', 'snapshot').lower()
+
+# Polygon caps snapshot pages at 250 contracts
+SNAPSHOT_PAGE_LIMIT = 250
+MAX_SNAPSHOT_PAGES = 40
+
+# Number of highest-scoring contracts that get a per-contract trades call
+TOP_CANDIDATES = 10
+
+def build_snapshot_url(ticker, expiration_date_gte=None, expiration_date_lte=None,
+                       strike_price_gte=None, strike_price_lte=None, contract_type=None):
+    """
+    Build the first-page URL for /v3/snapshot/options/{ticker} with server-side filters
+
+    Args:
+        ticker: Underlying ticker symbol (uppercase)
+        expiration_date_gte / expiration_date_lte: Expiration date range (YYYY-MM-DD)
+        strike_price_gte / strike_price_lte: Strike price range
+        contract_type: 'call' or 'put'
+
+    Returns:
+        Full URL including the API key
+    """
+    params = {'limit': SNAPSHOT_PAGE_LIMIT}
+    if expiration_date_gte:
+        params['expiration_date.gte'] = expiration_date_gte
+    if expiration_date_lte:
+        params['expiration_date.lte'] = expiration_date_lte
+    if strike_price_gte is not None:
+        params['strike_price.gte'] = round(strike_price_gte, 2)
+    if strike_price_lte is not None:
+        params['strike_price.lte'] = round(strike_price_lte, 2)
+    if contract_type:
+        params['contract_type'] = contract_type.lower()
+    params['apiKey'] = POLYGON_API_KEY
+    return f"{BASE_URL}/v3/snapshot/options/{ticker}?{urlencode(params)}"
+
+def _next_snapshot_url(next_url):
+    """Add the API key to a next_url cursor (Polygon strips it)"""
+    separator = '&' if '?' in next_url else '?'
+    return f"{next_url}{separator}apiKey={POLYGON_API_KEY}"
+
+def snapshot_to_option(snapshot):
+    """
+    Flatten one snapshot result into the contract dictionary used by the scan
+
+    The contract fields match /v3/reference/options/contracts so the result
+    can go through select_near_money_options and build_option_entry unchanged;
+    the market data is carried alongside.
+
+    Args:
+        snapshot: One entry of the snapshot 'results' list
+
+    Returns:
+        Dictionary with ticker, strike_price, expiration_date, contract_type,
+        open_interest, implied_volatility, greeks, day and last_trade
+    """
+    details = snapshot.get('details', {})
+    return {
+        'ticker': details.get('ticker'),
+        'strike_price': details.get('strike_price'),
+        'expiration_date': details.get('expiration_date'),
+        'contract_type': details.get('contract_type', ''),
+        'open_interest': snapshot.get('open_interest', 0) or 0,
+        'implied_volatility': snapshot.get('implied_volatility', 0) or 0,
+        'greeks': snapshot.get('greeks', {}),
+        'day': snapshot.get('day', {}),
+        'last_trade': snapshot.get('last_trade', {})
+    }
+
+def snapshot_cache_key(ticker, filters):
+    """Cache key for a snapshot request: the ticker plus its non-empty filters"""
+    return (ticker, tuple(sorted((k, v) for k, v in filters.items() if v is not None)))
+
+def _parse_snapshot_page(response, ticker, page_count):
+    """Return the flattened contracts of one page, or None on an error response"""
+    if response is None or response.status_code != 200:
+        print(f"Error fetching options snapshot page {page_count + 1} for {ticker}: {response.status_code if response is not None else 'No response'}")
+        return None, None
+    data = response.json()
+    options = [snapshot_to_option(snapshot) for snapshot in data.get('results', [])]
+    next_url = data.get('next_url')
+    return options, (_next_snapshot_url(next_url) if next_url else None)
+
+def get_option_snapshots(ticker, max_pages=MAX_SNAPSHOT_PAGES, **filters):
+    """
+    Fetch the options snapshot for an underlying, following next_url cursors
+
+    Args:
+        ticker: The stock ticker symbol
+        max_pages: Safety cap on the number of pages to follow
+        **filters: Server-side filters accepted by build_snapshot_url
+
+    Returns:
+        List of flattened contracts (see snapshot_to_option), served from
+        the quote cache for QUOTE_CACHE_TTL seconds, or None if any
+        page failed (e.g. 403 when the plan doesn't include snapshots) so the
+        caller can fall back to the per-contract trades scan
+    """
+    if not ticker:
+        return None
+
+    ticker = ticker.upper()
+    cache_key = snapshot_cache_key(ticker, filters)
+    cached, found = cache_module.get_cached_option_quotes(cache_key)
+    if found:
+        return list(cached)
+
+    url = build_snapshot_url(ticker, **filters)
+    options = []
+    page_count = 0
+
+    try:
+        while url and page_count < max_pages:
+            with pipeline_metrics.stage('chain_fetch'):
+                page, url = _parse_snapshot_page(polygon_get(url), ticker, page_count)
+            if page is None:
+                return None
+            options.extend(page)
+            page_count += 1
+    except Exception as e:
+        print(f"Error fetching options snapshot for {ticker}: {str(e)}")
+        return None
+
+    print(f"Loaded {len(options)} contracts for {ticker} from {page_count} snapshot page(s)")
+    cache_module.cache_option_quotes(cache_key, options)
+    return list(options)
+
+async def get_option_snapshots_async(ticker, max_pages=MAX_SNAPSHOT_PAGES, **filters):
+    """
+    Async version of get_option_snapshots for use on the bot's event loop
+
+    Args:
+        ticker: The stock ticker symbol
+        max_pages: Safety cap on the number of pages to follow
+        **filters: Server-side filters accepted by build_snapshot_url
+
+    Returns:
+        Same as get_option_snapshots
+    """
+    # Imported here so the synchronous callers never need aiohttp
+    from async_polygon_client import async_polygon_get
+
+    if not ticker:
+        return None
+
+    ticker = ticker.upper()
+    cache_key = snapshot_cache_key(ticker, filters)
+    cached, found = cache_module.get_cached_option_quotes(cache_key)
+    if found:
+        return list(cached)
+
+    url = build_snapshot_url(ticker, **filters)
+    options = []
+    page_count = 0
+
+    try:
+        while url and page_count < max_pages:
+            with pipeline_metrics.stage('chain_fetch'):
+                page, url = _parse_snapshot_page(await async_polygon_get(url), ticker, page_count)
+            if page is None:
+                return None
+            options.extend(page)
+            page_count += 1
+    except Exception as e:
+        print(f"Error fetching options snapshot for {ticker}: {str(e)}")
+        return None
+
+    print(f"Loaded {len(options)} contracts for {ticker} from {page_count} snapshot page(s)")
+    cache_module.cache_option_quotes(cache_key, options)
+    return list(options)
+
+def get_snapshot_activity(option):
+    """
+    Summarize a contract's day activity from its snapshot data
+
+    The snapshot has no per-print breakdown, so the last trade's size stands
+    in for both the largest print and the typical print size.
+
+    Args:
+        option: Flattened contract from snapshot_to_option
+
+    Returns:
+        Dictionary with total_volume, avg_price, largest_trade and avg_trade_size
+    """
+    day = option.get('day') or {}
+    last_trade = option.get('last_trade') or {}
+
+    total_volume = day.get('volume', 0) or 0
+    avg_price = day.get('vwap') or day.get('close') or last_trade.get('price', 0) or 0
+    last_size = min(last_trade.get('size', 0) or 0, total_volume)
+
+    return {
+        'total_volume': total_volume,
+        'avg_price': avg_price,
+        'largest_trade': last_size,
+        'avg_trade_size': last_size
+    }
+
+def get_snapshot_trade_info(option):
+    """
+    Build the trade_info dictionary (see polygon_trades) from a snapshot's last trade
+
+    Args:
+        option: Flattened contract from snapshot_to_option
+
+    Returns:
+        Dictionary with date, price, size, exchange and timestamps, or None
+    """
+    last_trade = option.get('last_trade') or {}
+    if not last_trade:
+        return None
+
+    timestamp = last_trade.get('sip_timestamp') or last_trade.get('participant_timestamp')
+    trade_info = {
+        'price': last_trade.get('price'),
+        'size': last_trade.get('size', 0),
+        'exchange': last_trade.get('exchange')
+    }
+    if timestamp:
+        date_str = format_timestamp(timestamp)
+        trade_info['date'] = date_str
+        trade_info['timestamp'] = timestamp
+        trade_info['timestamp_human'] = date_str
+    return trade_info
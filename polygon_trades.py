@@ -2,14 +2,37 @@
 Functions for accessing options trade data from Polygon.io
 """
 import os
-import requests
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime
 from dotenv import load_dotenv
+from polygon_client import polygon_get
+import polygon_client
+import trading_calendar
 
 # Load environment variables
 load_dotenv()
 POLYGON_API_KEY = os.getenv('POLYGON_API_KEY')
-BASE_URL = "https://api.polygon.io"
+BASE_URL = polygon_client.BASE_URL
+
+# Page size for /v3/trades and the size of each contract's rolling window
+TRADES_LIMIT = 50
+# Trades held across all contracts' rolling windows (least recently refreshed
+# contracts dropped first); about 150 bytes each as TRADE_FIELDS tuples
+MAX_TRACKED_TRADES = int(os.getenv('MAX_TRACKED_TRADES', '200000'))
+# Trade fields kept in the rolling state (what the scorers and select_significant_trade read)
+TRADE_FIELDS = ('sip_timestamp', 'size', 'price', 'exchange', 'conditions')
+
+# Rolling per-contract trade state: option symbol -> newest-first list of up to
+# TRADES_LIMIT TRADE_FIELDS tuples. The newest sip_timestamp is the contract's
+# high-water mark, so a refresh only asks Polygon for trades after it
+# (timestamp.gt). The state only covers the current session: it is dropped at
+# the next market open so earlier sessions' trades never enter today's window.
+_trade_state = OrderedDict()
+_tracked_trades = 0
+_state_expires_at = 0.0
+_trade_state_lock = threading.Lock()
 
 def format_timestamp(timestamp_ns):
     """
@@ -29,6 +52,110 @@ def format_timestamp(timestamp_ns):
     # Format in ISO format (YYYY-MM-DD)
     return datetime.fromtimestamp(timestamp_sec).strftime("%Y-%m-%d")
 
+def get_trade_timestamp(trade):
+    """Timestamp (ns) used for ordering and high-water marks"""
+    return trade.get('sip_timestamp') or trade.get('participant_timestamp') or 0
+
+def compact_trade(trade):
+    """Reduce a /v3/trades result to a TRADE_FIELDS tuple"""
+    conditions = trade.get('conditions')
+    return (get_trade_timestamp(trade), trade.get('size', 0), trade.get('price', 0), trade.get('exchange'),
+            tuple(conditions) if conditions else None)
+
+def expand_trade(compact):
+    """Rebuild the trade dictionary the scorers read from a TRADE_FIELDS tuple"""
+    return {field: value for field, value in zip(TRADE_FIELDS, compact) if value is not None}
+
+def _drop_previous_session():
+    """Clear the trade state once the session it was built in is over (call with the lock held)"""
+    global _tracked_trades, _state_expires_at
+    now = time.time()
+    if now >= _state_expires_at:
+        _trade_state.clear()
+        _tracked_trades = 0
+        _state_expires_at = trading_calendar.nyse.next_open_ts()
+
+def get_high_water_mark(option_symbol):
+    """
+    Get the newest trade timestamp already held for a contract
+    
+    Args:
+        option_symbol: Option symbol in Polygon format
+        
+    Returns:
+        sip_timestamp in nanoseconds, or None if the contract has no state yet
+    """
+    with _trade_state_lock:
+        _drop_previous_session()
+        trades = _trade_state.get(option_symbol)
+        return trades[0][0] if trades else None
+
+def build_trades_url(option_symbol, limit=TRADES_LIMIT):
+    """
+    Build the /v3/trades URL for a contract, asking only for trades after its high-water mark
+    
+    Args:
+        option_symbol: Option symbol in Polygon format
+        limit: Maximum number of trades to return (newest first)
+        
+    Returns:
+        Full URL including the API key
+    """
+    url = f"{BASE_URL}/v3/trades/{option_symbol}?limit={limit}&order=desc"
+    high_water = get_high_water_mark(option_symbol)
+    if high_water:
+        url += f"&timestamp.gt={high_water}"
+    return f"{url}&apiKey={POLYGON_API_KEY}"
+
+def merge_trades(option_symbol, new_trades):
+    """
+    Merge newly fetched trades into a contract's rolling state
+    
+    Args:
+        option_symbol: Option symbol in Polygon format
+        new_trades: Trades returned for build_trades_url (newest first)
+        
+    Returns:
+        The contract's rolling window of up to TRADES_LIMIT trades (TRADE_FIELDS
+        dictionaries), newest first
+    """
+    global _tracked_trades
+    with _trade_state_lock:
+        _drop_previous_session()
+        held = _trade_state.pop(option_symbol, [])
+        _tracked_trades -= len(held)
+        high_water = held[0][0] if held else 0
+        
+        # Guard against servers that ignore timestamp.gt
+        fresh = [compact_trade(t) for t in new_trades if get_trade_timestamp(t) > high_water]
+        fresh.sort(key=lambda trade: trade[0], reverse=True)
+        merged = (fresh + held)[:TRADES_LIMIT]
+        
+        if merged:
+            _trade_state[option_symbol] = merged
+            _tracked_trades += len(merged)
+        while _tracked_trades > MAX_TRACKED_TRADES:
+            _, dropped = _trade_state.popitem(last=False)
+            _tracked_trades -= len(dropped)
+    return [expand_trade(trade) for trade in merged]
+
+def reset_trade_state():
+    """Forget every contract's rolling trades (the next scan refetches them in full)"""
+    global _tracked_trades
+    with _trade_state_lock:
+        _trade_state.clear()
+        _tracked_trades = 0
+
+def get_trade_state_stats():
+    """
+    Size of the rolling trade state
+    
+    Returns:
+        Dictionary with contracts, trades and max_trades
+    """
+    with _trade_state_lock:
+        return {'contracts': len(_trade_state), 'trades': _tracked_trades, 'max_trades': MAX_TRACKED_TRADES}
+
 def get_option_trade_data(option_symbol, min_size=5, min_date="2025-04-07"):
     """
     Get the most recent significant trade for a specific option contract
@@ -48,94 +175,141 @@ def get_option_trade_data(option_symbol, min_size=5, min_date="2025-04-07"):
         limit = 50
         endpoint = f'{BASE_URL}/v3/trades/{option_symbol}?limit={limit}&apiKey={POLYGON_API_KEY}'
         
-        response = requests.get(endpoint, timeout=5)
+        response = polygon_get(endpoint)
         
         if response.status_code != 200:
             print(f"Error fetching option trades: {response.status_code}")
             return None
         
         data = response.json()
-        trades = data.get('results', [])
+        return select_significant_trade(option_symbol, data.get('results', []), min_size, min_date)
+    
+    except Exception as e:
+        print(f"Error getting option trade data for {option_symbol}: {str(e)}")
+        # Print traceback for debugging
+        import traceback
+        traceback.print_exc()
+    
+    return None
+
+async def get_option_trade_data_async(option_symbol, min_size=5, min_date="2025-04-07"):
+    """
+    Async version of get_option_trade_data for use on the bot's event loop
+    
+    Args:
+        option_symbol: Option symbol in Polygon format (O:AAPL250417C00100000)
+        min_size: Minimum trade size to consider significant
+        min_date: Minimum date string in YYYY-MM-DD format (e.g., '2025-04-07')
         
-        # If there are trades available, filter by date and get the most significant one
-        if trades:
-            print(f"Found {len(trades)} trades for {option_symbol}")
-            
-            # Filter trades by date if min_date is provided
-            if min_date:
-                try:
-                    min_date_obj = datetime.strptime(min_date, '%Y-%m-%d').date()
-                    filtered_trades = []
-                    
-                    for trade in trades:
-                        # Get timestamp from trade
-                        timestamp = trade.get('participant_timestamp') or trade.get('sip_timestamp')
-                        if timestamp:
-                            # Convert nanoseconds to datetime
-                            trade_date = datetime.fromtimestamp(timestamp / 1e9).date()
-                            # Include only trades on or after min_date
-                            if trade_date >= min_date_obj:
-                                filtered_trades.append(trade)
-                    
-                    trades = filtered_trades
-                    print(f"Filtered to {len(trades)} trades after {min_date}")
-                except Exception as e:
-                    print(f"Error filtering trades by date: {e}")
-            
-            # Skip if no trades after filtering
-            if not trades:
-                print(f"No trades found after {min_date} for {option_symbol}")
-                return {}
+    Returns:
+        Same as get_option_trade_data
+    """
+    # Imported here so the synchronous callers never need aiohttp
+    from async_polygon_client import async_polygon_get
+    
+    try:
+        limit = 50
+        endpoint = f'{BASE_URL}/v3/trades/{option_symbol}?limit={limit}&apiKey={POLYGON_API_KEY}'
+        
+        response = await async_polygon_get(endpoint)
+        
+        if response.status_code != 200:
+            print(f"Error fetching option trades: {response.status_code}")
+            return None
+        
+        data = response.json()
+        return select_significant_trade(option_symbol, data.get('results', []), min_size, min_date)
+    
+    except Exception as e:
+        print(f"Error getting option trade data for {option_symbol}: {str(e)}")
+    
+    return None
+
+def select_significant_trade(option_symbol, trades, min_size=5, min_date="2025-04-07"):
+    """
+    Pick the most recent significant trade out of a page of trades
+    
+    Args:
+        option_symbol: Option symbol in Polygon format (used for logging)
+        trades: List of trade objects from the Polygon trades endpoint
+        min_size: Minimum trade size to consider significant
+        min_date: Minimum date string in YYYY-MM-DD format (e.g., '2025-04-07')
+        
+    Returns:
+        Dictionary with trade data (see get_option_trade_data), or an empty
+        dict if there are no trades after min_date
+    """
+    # If there are trades available, filter by date and get the most significant one
+    if trades:
+        print(f"Found {len(trades)} trades for {option_symbol}")
+        
+        # Filter trades by date if min_date is provided
+        if min_date:
+            try:
+                min_date_obj = datetime.strptime(min_date, '%Y-%m-%d').date()
+                filtered_trades = []
                 
-            # Look for a significant trade (by size)
-            significant_trade = None
-            for trade in trades:
-                size = trade.get('size', 0)
-                if size >= min_size:
-                    significant_trade = trade
-                    print(f"Found significant trade with size {size} for {option_symbol}")
-                    break
-                    
-            # If no significant trade found, use the most recent one
-            if not significant_trade:
-                significant_trade = trades[0]
-                print(f"No significant trade found, using most recent one for {option_symbol}")
-            
-            # Get timestamp (prefer participant_timestamp for more accurate timing when available)
-            timestamp = significant_trade.get('participant_timestamp') or significant_trade.get('sip_timestamp')
-            exchange = significant_trade.get('exchange')
+                for trade in trades:
+                    # Get timestamp from trade
+                    timestamp = trade.get('participant_timestamp') or trade.get('sip_timestamp')
+                    if timestamp:
+                        # Convert nanoseconds to datetime
+                        trade_date = datetime.fromtimestamp(timestamp / 1e9).date()
+                        # Include only trades on or after min_date
+                        if trade_date >= min_date_obj:
+                            filtered_trades.append(trade)
+                
+                trades = filtered_trades
+                print(f"Filtered to {len(trades)} trades after {min_date}")
+            except Exception as e:
+                print(f"Error filtering trades by date: {e}")
+        
+        # Skip if no trades after filtering
+        if not trades:
+            print(f"No trades found after {min_date} for {option_symbol}")
+            return {}
             
-            if timestamp:
-                # Format timestamp for display and store exact time
-                date_str = format_timestamp(timestamp)
+        # Look for a significant trade (by size)
+        significant_trade = None
+        for trade in trades:
+            size = trade.get('size', 0)
+            if size >= min_size:
+                significant_trade = trade
+                print(f"Found significant trade with size {size} for {option_symbol}")
+                break
                 
-                return {
-                    'date': date_str,
-                    'price': significant_trade.get('price'),
-                    'size': significant_trade.get('size'),
-                    'exchange': exchange,
-                    'timestamp': timestamp,  # Store raw timestamp for sorting/precision
-                    'timestamp_human': date_str  # Human readable version
-                }
+        # If no significant trade found, use the most recent one
+        if not significant_trade:
+            significant_trade = trades[0]
+            print(f"No significant trade found, using most recent one for {option_symbol}")
+        
+        # Get timestamp (prefer participant_timestamp for more accurate timing when available)
+        timestamp = significant_trade.get('participant_timestamp') or significant_trade.get('sip_timestamp')
+        exchange = significant_trade.get('exchange')
+        
+        if timestamp:
+            # Format timestamp for display and store exact time
+            date_str = format_timestamp(timestamp)
             
-            # If we have a trade but no timestamp (unlikely), just return price and size
             return {
+                'date': date_str,
                 'price': significant_trade.get('price'),
                 'size': significant_trade.get('size'),
-                'exchange': exchange
+                'exchange': exchange,
+                'timestamp': timestamp,  # Store raw timestamp for sorting/precision
+                'timestamp_human': date_str  # Human readable version
             }
-        else:
-            print(f"No trades found for {option_symbol}")
-            
-            # For future-dated options or those without trade history,
-            # we return an empty dict which indicates the option exists
-            # but we don't have historical trades
-            return {}
-    
-    except Exception as e:
-        print(f"Error getting option trade data for {option_symbol}: {str(e)}")
-        # Print traceback for debugging
-        import traceback
-        traceback.print_exc()
-    
-    return None
\ No newline at end of file
+        
+        # If we have a trade but no timestamp (unlikely), just return price and size
+        return {
+            'price': significant_trade.get('price'),
+            'size': significant_trade.get('size'),
+            'exchange': exchange
+        }
+    else:
+        print(f"No trades found for {option_symbol}")
+        
+        # For future-dated options or those without trade history,
+        # we return an empty dict which indicates the option exists
+        # but we don't have historical trades
+        return {}
@@ -0,0 +1,200 @@
+"""
+Background prewarming of unusual activity results for a watchlist
+
+Popular tickers are rescanned inside the bot process shortly before their
+cached result expires, so users asking about them are served from the cache
+instead of waiting for a full chain scan:
+- During a session: PREWARM_LEAD seconds before each entry expires
+- Before the open: PREOPEN_WARMUP seconds before the session starts (entries
+  made then are served, as stale, right after the open while they refresh)
+- Right after an entry made inside its lead window expires
+
+Refreshes run one at a time, most overdue first, and are spaced so that on
+average prewarming uses at most PREWARM_BUDGET_SHARE of the Polygon request
+budget (polygon_client.rate_limiter), leaving the rest for user requests.
+Only each refresh's own requests are counted (polygon_client.request_counter).
+
+The watchlist is the "prewarm_watchlist" list in config.json (re-read when
+the file changes), defaulting to polygon_integration.HIGH_VOLUME_TICKERS.
+"""
+import asyncio
+import json
+import os
+import time
+
+import cache_module
+import polygon_client
+import polygon_integration
+import trading_calendar
+
+CONFIG_FILE = 'config.json'
+
+# Set PREWARM_ENABLED=0 to keep the bot from prewarming
+PREWARM_ENABLED = os.getenv('PREWARM_ENABLED', '1') != '0'
+
+# Seconds before expiry to refresh during a session, and before the open
+PREWARM_LEAD = float(os.getenv('PREWARM_LEAD', '60'))
+PREOPEN_WARMUP = float(os.getenv('PREOPEN_WARMUP', '600'))
+
+# Average share of the request budget prewarming may use
+PREWARM_BUDGET_SHARE = float(os.getenv('PREWARM_BUDGET_SHARE', '0.5'))
+
+# Shortest gap between refreshes, shortest wait before the same ticker is
+# tried again (e.g. after a failed scan), and the longest single sleep
+MIN_REFRESH_GAP = 1.0
+RETRY_DELAY = 120.0
+MAX_SLEEP = 60.0
+
+
+def load_watchlist(config_file=CONFIG_FILE):
+    """
+    Read the prewarm watchlist from the bot config
+
+    Args:
+        config_file: Path to config.json
+
+    Returns:
+        List of uppercase tickers (HIGH_VOLUME_TICKERS if none are configured)
+    """
+    tickers = None
+    try:
+        with open(config_file, 'r') as f:
+            tickers = json.load(f).get('prewarm_watchlist')
+    except (OSError, ValueError) as e:
+        print(f"Could not read prewarm watchlist from {config_file}: {str(e)}")
+    if tickers is None:
+        return sorted(polygon_integration.HIGH_VOLUME_TICKERS)
+
+    watchlist = []
+    for ticker in tickers:
+        ticker = str(ticker).strip().upper()
+        if ticker and ticker not in watchlist:
+            watchlist.append(ticker)
+    return watchlist
+
+
+async def refresh_ticker(ticker):
+    """Rescan a ticker the way the bot would for a user request"""
+    return await polygon_integration.refresh_unusual_options_activity_async(
+        ticker, high_performance=ticker in polygon_integration.HIGH_VOLUME_TICKERS)
+
+
+class PrewarmScheduler:
+    """
+    Keeps the unusual activity cache warm for a watchlist
+
+    Args:
+        watchlist: Tickers to keep warm (defaults to the config file's watchlist)
+        config_file: Config file to read (and re-read) the watchlist from
+        refresh: Coroutine function rescanning one ticker
+        is_open: Function telling whether the market is open now
+    """
+
+    def __init__(self, watchlist=None, config_file=CONFIG_FILE, refresh=refresh_ticker,
+                 is_open=trading_calendar.is_market_open):
+        self.config_file = config_file
+        self.refresh = refresh
+        self.is_open = is_open
+        self._follow_config = watchlist is None
+        self._config_mtime = -1
+        self.watchlist = [] if watchlist is None else [t.upper() for t in watchlist]
+        self._last_attempt = {}
+        self._task = None
+        self.refreshes = 0
+        self.failures = 0
+
+    def _reload_watchlist(self):
+        if not self._follow_config:
+            return
+        try:
+            mtime = os.path.getmtime(self.config_file)
+        except OSError:
+            mtime = None
+        if mtime != self._config_mtime:
+            self._config_mtime = mtime
+            self.watchlist = load_watchlist(self.config_file)
+            print(f"Prewarm watchlist: {', '.join(self.watchlist)}")
+
+    def next_due(self, ticker, times, now, market_open):
+        """
+        When a ticker should next be refreshed
+
+        Args:
+            ticker: Stock ticker symbol
+            times: (created, valid_until) of its cached entry (see
+                cache_module.get_entry_times_batch), None if not cached
+            now: Current time in epoch seconds
+            market_open: Whether a session is in progress
+
+        Returns:
+            Epoch seconds (now or earlier if it is due)
+        """
+        if times is None:
+            due = now
+        else:
+            created, valid_until = times
+            due = valid_until - (PREWARM_LEAD if market_open else PREOPEN_WARMUP)
+            if created >= due:
+                # Already refreshed inside its lead window: next time is at expiry
+                due = valid_until
+        # Don't hammer a ticker whose scans keep failing
+        return max(due, self._last_attempt.get(ticker, 0) + RETRY_DELAY)
+
+    async def run_once(self):
+        """
+        Refresh the most overdue ticker, if any is due
+
+        Returns:
+            Seconds to wait before the next call
+        """
+        self._reload_watchlist()
+        if not self.watchlist:
+            return MAX_SLEEP
+
+        # Timestamps only, read off the event loop
+        times = await asyncio.to_thread(cache_module.get_entry_times_batch, self.watchlist)
+        now = time.time()
+        market_open = self.is_open()
+        due, ticker = min((self.next_due(t, times.get(t), now, market_open), t) for t in self.watchlist)
+        if due > now:
+            return min(due - now, MAX_SLEEP)
+
+        self._last_attempt[ticker] = now
+        start = time.monotonic()
+        with polygon_client.request_counter() as requests_made:
+            try:
+                await self.refresh(ticker)
+                self.refreshes += 1
+            except Exception as e:
+                self.failures += 1
+                print(f"Prewarm of {ticker} failed: {str(e)}")
+        elapsed = time.monotonic() - start
+
+        # Space refreshes so prewarming averages at most its share of the budget
+        used = requests_made.count
+        budget = polygon_client.rate_limiter.rate * PREWARM_BUDGET_SHARE
+        gap = max(MIN_REFRESH_GAP, used / budget - elapsed)
+        print(f"Prewarmed {ticker} in {elapsed:.1f}s ({used} requests), next refresh in {gap:.1f}s")
+        return gap
+
+    async def run(self):
+        """Refresh due tickers until cancelled"""
+        while True:
+            await asyncio.sleep(await self.run_once())
+
+    def start(self):
+        """Start the scheduler as a task on the running event loop (once)"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+        return self._task
+
+    async def stop(self):
+        """Cancel the scheduler task and wait for it to finish"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
@@ -99,6 +99,24 @@ with col2:
 with col3:
     st.metric("Active Users", "32")
 
+# Unusual activity cache size (the SQLite backend is shared with the bot process)
+st.header("Unusual Activity Cache")
+try:
+    import cache_module
+    report = cache_module.get_cache_report()
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Cached Tickers", f"{report['entries']} / {report['max_entries']}")
+    with col2:
+        st.metric("Cache Size", f"{report['bytes'] / 1e6:.1f} / {report['max_bytes'] / 1e6:.0f} MB")
+    with col3:
+        st.metric("Backend", report['backend'])
+    if report['largest']:
+        st.markdown("**Largest entries**")
+        st.table([{"Ticker": ticker, "Size (KB)": round(size / 1024, 1)} for ticker, size in report['largest']])
+except Exception as e:
+    st.warning(f"Could not read the cache: {str(e)}")
+
 # Add a footer with disclaimer
 st.markdown("---")
 st.markdown("""
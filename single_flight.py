@@ -0,0 +1,132 @@
+"""
+Single-flight request coalescing
+
+When several users ask about the same ticker at the same moment, every
+request misses the cache and would start its own full chain scan. These
+helpers make concurrent callers for one key wait on a single in-flight
+computation and share its result (or its exception), so N requests cost
+one scan. Nothing is cached here: once the call finishes the next caller
+starts a new one (cache_module covers reuse after that).
+"""
+import asyncio
+import threading
+
+
+class _Call:
+    """One in-flight computation shared by every caller for its key"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls with the same key across threads
+
+    The first caller for a key runs the function; callers that arrive while
+    it is running block until it finishes and receive the same result.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn, *args, **kwargs):
+        """
+        Run fn(*args, **kwargs) once for all concurrent callers with this key
+
+        Args:
+            key: Hashable key identifying the computation (e.g. the ticker)
+            fn: Function to run if no call for this key is in flight
+
+        Returns:
+            The function's result
+
+        Raises:
+            Whatever fn raised, re-raised in every waiting caller
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+            else:
+                call.waiters += 1
+
+        if not leader:
+            print(f"Waiting on in-flight request for {key}")
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+            if call.waiters:
+                print(f"Shared result for {key} with {call.waiters} waiting request(s)")
+        return call.result
+
+    def in_flight(self):
+        """Keys that currently have a call running"""
+        with self._lock:
+            return list(self._calls)
+
+
+class AsyncSingleFlight:
+    """
+    Coalesce concurrent coroutine calls with the same key on an event loop
+
+    The first caller starts a task; later callers await the same task. The
+    task is shielded so that one caller being cancelled (e.g. a Discord
+    handler timing out) doesn't cancel the scan for everyone else.
+    """
+
+    def __init__(self):
+        self._tasks = {}
+
+    async def do(self, key, coro_fn, *args, **kwargs):
+        """
+        Await coro_fn(*args, **kwargs) once for all concurrent callers with this key
+
+        Args:
+            key: Hashable key identifying the computation (e.g. the ticker)
+            coro_fn: Coroutine function to run if no call for this key is in flight
+
+        Returns:
+            The coroutine's result
+
+        Raises:
+            Whatever the coroutine raised, re-raised in every waiting caller
+        """
+        loop = asyncio.get_running_loop()
+        task = self._tasks.get(key)
+
+        # A task left over from a different (closed) loop can't be awaited here
+        if task is None or task.done() or task.get_loop() is not loop:
+            task = loop.create_task(coro_fn(*args, **kwargs))
+            self._tasks[key] = task
+
+            def _forget(finished, key=key):
+                if self._tasks.get(key) is finished:
+                    del self._tasks[key]
+
+            task.add_done_callback(_forget)
+        else:
+            print(f"Waiting on in-flight request for {key}")
+
+        return await asyncio.shield(task)
+
+    def in_flight(self):
+        """Keys that currently have a task running"""
+        return [key for key, task in self._tasks.items() if not task.done()]
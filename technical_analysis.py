@@ -2,6 +2,8 @@ import yfinance as yf
 import pandas as pd
 import numpy as np
 import datetime
+import functools
+import option_pricing
 from combined_scalp_stop_loss import calculate_scalp_stop_loss
 
 def calculate_atr(ticker, timeframe):
@@ -42,34 +44,37 @@ def calculate_atr(ticker, timeframe):
     
     return atr
 
+# Expiration formats accepted from users and Polygon, tried in order
+EXPIRY_FORMATS = ('%Y-%m-%d', '%m/%d/%Y', '%m-%d-%Y', '%d %b %Y', '%m/%d/%y')
+
+@functools.lru_cache(maxsize=1024)
+def parse_expiry(expiry):
+    """Parse an expiration date string, or return None if no known format matches"""
+    for fmt in EXPIRY_FORMATS:
+        try:
+            return datetime.datetime.strptime(expiry, fmt).date()
+        except ValueError:
+            continue
+    return None
+
 def get_dte(expiry):
-    """Calculate days to expiration"""
+    """
+    Calculate calendar days to expiration
+    
+    Deliberately calendar days, not trading sessions: the get_trade_horizon
+    thresholds and get_buffer_limit are tuned on calendar DTE.
+    """
     if not expiry:
         return 30  # Default to 30 days if no expiry provided
     
-    # Parse the expiry date
-    try:
-        # Try different date formats
-        try:
-            expiry_date = datetime.datetime.strptime(expiry, '%m/%d/%Y').date()
-        except ValueError:
-            try:
-                expiry_date = datetime.datetime.strptime(expiry, '%m-%d-%Y').date()
-            except ValueError:
-                try:
-                    expiry_date = datetime.datetime.strptime(expiry, '%d %b %Y').date()
-                except ValueError:
-                    # If all fail, try to extract year
-                    if len(expiry.split('/')[-1]) == 2:
-                        expiry = expiry.replace(expiry.split('/')[-1], '20' + expiry.split('/')[-1])
-                    expiry_date = datetime.datetime.strptime(expiry, '%m/%d/%Y').date()
-        
-        # Calculate days to expiration
-        today = datetime.date.today()
-        dte = (expiry_date - today).days
-        return max(0, dte)  # Ensure DTE is not negative
-    except Exception:
+    expiry_date = parse_expiry(expiry)
+    if expiry_date is None:
         return 30  # Default if parsing fails
+    
+    # Calculate days to expiration
+    today = datetime.date.today()
+    dte = (expiry_date - today).days
+    return max(0, dte)  # Ensure DTE is not negative
 
 def get_trade_horizon(dte):
     """Determine trade horizon based on days to expiration"""
@@ -143,17 +148,28 @@ def calculate_stop_loss(ticker, strike, expiry, option_type):
                 'risk_warning': "Unable to determine current market price."
             }
     
-    # Get option price (simplified - in production would use real options data)
-    # This is a simplified calculation for demo purposes
+    # Price the option off the ticker's volatility surface only if one is already
+    # cached; a stop-loss request never downloads chains to build one
+    # (imported here because option_calculator imports this module)
     dte = get_dte(expiry)
-    if option_type == 'call':
-        intrinsic = max(0, current_price - strike)
+    surface_vol = None
+    if dte > 0:
+        from option_calculator import get_cached_volatility_surface
+        surface = get_cached_volatility_surface(ticker)
+        if surface is not None:
+            surface_vol = surface.vol(strike, dte)
+    
+    if surface_vol is not None:
+        option_price = option_pricing.black_scholes_price(current_price, strike, option_pricing.years_to_expiration(dte),
+                                                          surface_vol, option_type=option_type)
     else:
-        intrinsic = max(0, strike - current_price)
-    
-    # Simple time value approximation based on DTE
-    time_value = (current_price * 0.01) * min(dte / 30, 1)
-    option_price = intrinsic + time_value
+        # Simplified fallback: intrinsic value plus a time value approximation based on DTE
+        if option_type == 'call':
+            intrinsic = max(0, current_price - strike)
+        else:
+            intrinsic = max(0, strike - current_price)
+        time_value = (current_price * 0.01) * min(dte / 30, 1)
+        option_price = intrinsic + time_value
     response['current_price'] = option_price
     
     # Get trade horizon and appropriate timeframe
@@ -194,14 +210,19 @@ def calculate_stop_loss(ticker, strike, expiry, option_type):
         else:
             stock_stop_price = current_price * (1 + max_buffer)
     
-    # Calculate option price at stop level (simplified)
-    if option_type == 'call':
-        stop_intrinsic = max(0, stock_stop_price - strike)
+    # Calculate option price at stop level
+    if surface_vol is not None:
+        stop_option_price = option_pricing.black_scholes_price(stock_stop_price, strike,
+                                                               option_pricing.years_to_expiration(dte),
+                                                               surface_vol, option_type=option_type)
     else:
-        stop_intrinsic = max(0, strike - stock_stop_price)
-    
-    stop_time_value = time_value * 0.5  # Assume time value decreases by half at stop
-    stop_option_price = stop_intrinsic + stop_time_value
+        if option_type == 'call':
+            stop_intrinsic = max(0, stock_stop_price - strike)
+        else:
+            stop_intrinsic = max(0, strike - stock_stop_price)
+        
+        stop_time_value = time_value * 0.5  # Assume time value decreases by half at stop
+        stop_option_price = stop_intrinsic + stop_time_value
     
     # Ensure stop price is not negative or zero
     stop_option_price = max(option_price * 0.1, stop_option_price)
@@ -0,0 +1,200 @@
+"""
+Test the AIMD concurrency controller and the per-endpoint circuit breaker
+Runs entirely offline against a small local HTTP server
+"""
+import asyncio
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+import polygon_client
+import polygon_integration
+
+def test_additive_increase_multiplicative_decrease():
+    """Healthy responses grow the limit by one per window; congestion halves it"""
+    controller = polygon_client.AdaptiveConcurrency(initial=4, minimum=2, maximum=10, latency_target=1.0)
+
+    # Each success adds 1/limit, so a window of ~limit successes adds one slot
+    for _ in range(5):
+        controller.on_success(0.1)
+    print(f"Limit after one healthy window: {controller.limit}")
+    assert controller.limit == 5
+
+    # Slow responses don't grow the limit
+    for _ in range(20):
+        controller.on_success(5.0)
+    assert controller.limit == 5
+
+    controller.on_congestion()
+    assert controller.limit == 2
+    # A second signal from the same burst doesn't cut again, and the floor holds
+    controller.on_congestion()
+    assert controller.limit == 2
+
+    for _ in range(200):
+        controller.on_success(0.1)
+    assert controller.limit == 10
+
+def test_limit_bounds_in_flight_threads():
+    """No more than `limit` threads hold a slot at once"""
+    controller = polygon_client.AdaptiveConcurrency(initial=3, minimum=1, maximum=3)
+    lock = threading.Lock()
+    active = [0]
+    peak = [0]
+
+    def worker():
+        controller.acquire()
+        try:
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.05)
+            with lock:
+                active[0] -= 1
+        finally:
+            controller.release()
+
+    threads = [threading.Thread(target=worker) for _ in range(12)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    print(f"Peak in-flight: {peak[0]}")
+    assert peak[0] == 3
+    assert controller.in_flight == 0
+
+def test_async_waiters_are_woken_by_release():
+    """Coroutines wait for a slot without polling and are woken by releases from any thread"""
+    controller = polygon_client.AdaptiveConcurrency(initial=2, minimum=1, maximum=2)
+    active = [0]
+    peak = [0]
+
+    async def worker():
+        await controller.acquire_async()
+        try:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+            await asyncio.sleep(0.02)
+            active[0] -= 1
+        finally:
+            controller.release()
+
+    async def run():
+        # Both slots start out held by a thread that frees them a little later
+        controller.acquire()
+        controller.acquire()
+        threading.Timer(0.05, lambda: (controller.release(), controller.release())).start()
+        start = time.monotonic()
+        await asyncio.gather(*(worker() for _ in range(8)))
+        return time.monotonic() - start
+
+    elapsed = asyncio.run(run())
+    print(f"8 coroutines through 2 slots in {elapsed * 1000:.0f} ms, peak {peak[0]}")
+    assert peak[0] == 2
+    assert controller.in_flight == 0
+    assert elapsed < 0.5
+
+def test_circuit_breaker_fails_fast():
+    """Repeated 5xx responses open the circuit; requests then fail without reaching the server"""
+    calls = []
+    healthy = [False]
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            calls.append(self.path)
+            status = 200 if healthy[0] else 503
+            body = b'{"status": "OK", "results": []}'
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    breaker = polygon_client.circuit_breaker
+    original_cooldown = breaker.cooldown
+    breaker.cooldown = 0.3
+    breaker.reset()
+    try:
+        url = f"http://127.0.0.1:{server.server_port}/v3/trades/O:TEST?apiKey=x"
+        for _ in range(breaker.failure_threshold):
+            assert polygon_integration.throttled_api_call(url).status_code == 503
+        assert breaker.state('/v3/trades') == 'open'
+
+        start = time.monotonic()
+        response = polygon_integration.throttled_api_call(url)
+        elapsed = time.monotonic() - start
+        print(f"Fail-fast response {response.status_code} in {elapsed * 1000:.1f} ms, server calls: {len(calls)}")
+        assert response.status_code == 503
+        assert len(calls) == breaker.failure_threshold
+        assert elapsed < 0.1
+
+        # Other endpoints are unaffected
+        assert breaker.allow('/v3/reference')
+
+        # After the cooldown one probe goes through and closes the circuit
+        time.sleep(0.35)
+        healthy[0] = True
+        assert polygon_integration.throttled_api_call(url).status_code == 200
+        assert breaker.state('/v3/trades') == 'closed'
+    finally:
+        breaker.cooldown = original_cooldown
+        breaker.reset()
+        server.shutdown()
+        server.server_close()
+
+def test_broken_body_fails_the_probe():
+    """A body that can't be read counts as a failure, so a half-open probe never gets stuck"""
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+            self.wfile.write(b'not-a-chunk-size\r\n')
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    breaker = polygon_client.circuit_breaker
+    original_cooldown = breaker.cooldown
+    breaker.cooldown = 0.2
+    breaker.reset()
+    try:
+        url = f"http://127.0.0.1:{server.server_port}/v3/trades/O:TEST"
+        for _ in range(breaker.failure_threshold):
+            try:
+                polygon_client.polygon_get(url)
+                assert False, "Expected a broken body to raise"
+            except requests.exceptions.ChunkedEncodingError:
+                pass
+        assert breaker.state('/v3/trades') == 'open'
+
+        # The half-open probe fails the same way and reopens the circuit
+        time.sleep(0.25)
+        try:
+            polygon_client.polygon_get(url)
+        except requests.exceptions.ChunkedEncodingError:
+            pass
+        assert breaker.state('/v3/trades') == 'open'
+        time.sleep(0.25)
+        assert breaker.allow('/v3/trades')
+    finally:
+        breaker.cooldown = original_cooldown
+        breaker.reset()
+        server.shutdown()
+        server.server_close()
+
+if __name__ == "__main__":
+    test_additive_increase_multiplicative_decrease()
+    test_limit_bounds_in_flight_threads()
+    test_async_waiters_are_woken_by_release()
+    test_circuit_breaker_fails_fast()
+    test_broken_body_fails_the_probe()
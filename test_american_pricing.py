@@ -0,0 +1,66 @@
+"""
+Test the American option pricing engines
+"""
+import numpy as np
+
+import american_pricing
+import option_pricing
+
+def test_approximation_tracks_the_tree():
+    """Bjerksund-Stensland stays close to a fine tree and above the European price"""
+    cases = [(42.0, 40.0, 0.75, 0.35, 0.04, 'call', 0.08),
+             (80.0, 100.0, 1.0, 0.3, 0.05, 'put', 0.0),
+             (100.0, 100.0, 1.0, 0.3, 0.05, 'call', 0.04),
+             (100.0, 110.0, 0.25, 0.25, 0.05, 'put', 0.02)]
+    for spot, strike, years, vol, rate, option_type, dividend in cases:
+        approximation = american_pricing.bjerksund_stensland(spot, strike, years, vol, rate, option_type, dividend)
+        tree = american_pricing.crr_tree(spot, strike, years, vol, rate, option_type, dividend, steps=1000)
+        european = option_pricing.black_scholes_price(spot, strike, years, vol, rate, option_type, dividend)
+        assert isinstance(approximation, float)
+        assert abs(approximation - tree) < 0.07, (option_type, approximation, tree)
+        assert approximation >= european
+
+    # A deep ITM put is worth noticeably more than its European price
+    assert american_pricing.crr_tree(80.0, 100.0, 1.0, 0.3) < american_pricing.crr_tree(80.0, 100.0, 1.0, 0.3, option_type='put')
+    assert american_pricing.bjerksund_stensland(80.0, 100.0, 1.0, 0.3, option_type='put') - \
+        option_pricing.black_scholes_price(80.0, 100.0, 1.0, 0.3, option_type='put') > 1.0
+
+def test_calls_without_dividends_are_european():
+    """Early exercise never pays for a call without dividends"""
+    strikes = np.linspace(60, 140, 9)
+    european = option_pricing.black_scholes_price(100.0, strikes, 0.5, 0.4)
+    assert np.allclose(american_pricing.bjerksund_stensland(100.0, strikes, 0.5, 0.4), european, atol=1e-12)
+    assert np.allclose(american_pricing.crr_tree(100.0, strikes, 0.5, 0.4, steps=500), european, atol=0.03)
+
+def test_tree_is_vectorized_per_contract():
+    """Pricing a chain at once gives each contract's own price; expired ones get intrinsic value"""
+    rng = np.random.default_rng(5)
+    strikes = rng.uniform(60, 140, 12)
+    years = np.append(rng.uniform(0.05, 1.0, 11), 0.0)
+    vols = rng.uniform(0.15, 0.7, 12)
+    types = np.where(np.arange(12) % 2 == 0, 'call', 'put')
+    dividends = rng.uniform(0.0, 0.04, 12)
+
+    for engine in ('bjerksund', 'tree'):
+        chain = american_pricing.american_price(100.0, strikes, years, vols, 0.05, types, dividends, method=engine, steps=100)
+        single = [american_pricing.american_price(100.0, strikes[i], years[i], vols[i], 0.05, types[i], dividends[i],
+                                                  method=engine, steps=100) for i in range(12)]
+        assert np.allclose(chain, single, rtol=0, atol=1e-12)
+        assert chain[-1] == max(strikes[-1] - 100.0, 0.0)  # the last contract is a put
+
+def test_benchmark_runs():
+    """The benchmark reports latency and errors for every engine"""
+    from benchmark_american_pricing import run_benchmark
+
+    results = run_benchmark(contracts=50, steps=(25,), reference_steps=200, repeat=1)
+    assert [r['engine'] for r in results] == ['european', 'bjerksund', 'tree-25']
+    for result in results:
+        print(result)
+        assert result['ms_per_1000'] > 0
+    assert results[1]['mean_abs_error'] < results[0]['mean_abs_error']
+
+if __name__ == "__main__":
+    test_approximation_tracks_the_tree()
+    test_calls_without_dividends_are_european()
+    test_tree_is_vectorized_per_contract()
+    test_benchmark_runs()
@@ -0,0 +1,200 @@
+"""
+Test the SQLite cache backend shared between processes
+"""
+import os
+import pickle
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import cache_module
+
+WRITER = """
+import sys
+import cache_module
+for ticker in sys.argv[1:]:
+    cache_module.add_to_cache(ticker, [{'contract': ticker + ' 100.0 CALL'}])
+"""
+
+def with_database(test):
+    original_backend, original_db = cache_module.CACHE_BACKEND, cache_module.CACHE_DB
+    original_cache_file = cache_module.CACHE_FILE
+    with tempfile.TemporaryDirectory() as directory:
+        cache_module.CACHE_BACKEND = 'sqlite'
+        cache_module.CACHE_DB = os.path.join(directory, 'cache.db')
+        cache_module.CACHE_FILE = os.path.join(directory, 'cache.pickle')
+        try:
+            test(directory)
+        finally:
+            cache_module.CACHE_BACKEND, cache_module.CACHE_DB = original_backend, original_db
+            cache_module.CACHE_FILE = original_cache_file
+
+def run_writer(*tickers):
+    """Add tickers to the cache from a separate process using the same files"""
+    env = dict(os.environ, CACHE_BACKEND='sqlite', CACHE_DB=cache_module.CACHE_DB,
+               CACHE_FILE=cache_module.CACHE_FILE)
+    return subprocess.Popen([sys.executable, '-c', WRITER, *tickers], env=env,
+                            cwd=os.path.dirname(os.path.abspath(cache_module.__file__)),
+                            stdout=subprocess.DEVNULL)
+
+def test_other_process_writes_are_visible():
+    """An entry written by another process is served without reloading anything"""
+    def run(directory):
+        assert cache_module.get_from_cache('AAPL') == (None, False)
+        run_writer('AAPL').wait(timeout=60)
+
+        assert cache_module.cache_contains('AAPL')
+        entry = cache_module.get_backend().get('AAPL')
+        assert entry['data'] == [{'contract': 'AAPL 100.0 CALL'}]
+        assert isinstance(entry['timestamp'], datetime)
+    with_database(run)
+
+def test_concurrent_writers_keep_each_others_entries():
+    """Two processes writing different tickers at once don't overwrite each other"""
+    def run(directory):
+        first = [f"A{i}" for i in range(20)]
+        second = [f"B{i}" for i in range(20)]
+        writers = [run_writer(*first), run_writer(*second)]
+        for writer in writers:
+            assert writer.wait(timeout=60) == 0
+
+        assert cache_module.get_cache_size() == 40
+        assert cache_module.remove_from_cache('A0')
+        assert not cache_module.cache_contains('A0')
+        assert cache_module.get_cache_size() == 39
+    with_database(run)
+
+def test_pickle_cache_is_imported():
+    """A new database starts with the entries of the existing pickle file"""
+    def run(directory):
+        with open(cache_module.CACHE_FILE, 'wb') as f:
+            pickle.dump({'SPY': {'timestamp': datetime(2025, 6, 6, 17, 0), 'data': ['spy']}}, f)
+
+        assert cache_module.get_cache_size() == 1
+        assert cache_module.get_backend().get('SPY')['data'] == ['spy']
+    with_database(run)
+
+def with_pickle_file(test, write_behind=True):
+    original_backend, original_cache_file = cache_module.CACHE_BACKEND, cache_module.CACHE_FILE
+    original_write_behind, original_interval = cache_module.CACHE_WRITE_BEHIND, cache_module.CACHE_FLUSH_INTERVAL
+    with tempfile.TemporaryDirectory() as directory:
+        cache_module.CACHE_BACKEND = 'pickle'
+        cache_module.CACHE_FILE = os.path.join(directory, 'cache.pickle')
+        cache_module.CACHE_WRITE_BEHIND = write_behind
+        cache_module.CACHE_FLUSH_INTERVAL = 0.1
+        try:
+            test(directory)
+        finally:
+            cache_module.remove_from_cache('TEST')
+            # Write any pending change here, before the real cache file is restored
+            cache_module.flush_cache()
+            cache_module.CACHE_BACKEND, cache_module.CACHE_FILE = original_backend, original_cache_file
+            cache_module.CACHE_WRITE_BEHIND, cache_module.CACHE_FLUSH_INTERVAL = original_write_behind, original_interval
+
+def test_write_behind_saves_in_the_background():
+    """add_to_cache returns before the file is written; the flusher saves it shortly after"""
+    def run(directory):
+        cache_module.add_to_cache('TEST', ['entry'])
+        assert not os.path.exists(cache_module.CACHE_FILE)
+        assert cache_module.get_from_cache('TEST')[1]
+
+        deadline = time.time() + 5
+        while not os.path.exists(cache_module.CACHE_FILE) and time.time() < deadline:
+            time.sleep(0.05)
+        with open(cache_module.CACHE_FILE, 'rb') as f:
+            assert pickle.load(f)['TEST']['data'] == ['entry']
+        assert not cache_module.flush_cache()
+        assert os.listdir(directory) == ['cache.pickle']
+    with_pickle_file(run)
+
+def test_failed_save_keeps_the_previous_file():
+    """A write that fails midway leaves the last good snapshot and no temp file"""
+    def run(directory):
+        cache_module.add_to_cache('TEST', ['first'])
+        original_dump = pickle.dump
+
+        def failing_dump(obj, f, *args, **kwargs):
+            f.write(b'partial')
+            raise OSError("disk full")
+
+        cache_module.pickle.dump = failing_dump
+        try:
+            cache_module.add_to_cache('TEST', ['second'])
+        finally:
+            cache_module.pickle.dump = original_dump
+
+        with open(cache_module.CACHE_FILE, 'rb') as f:
+            assert pickle.load(f)['TEST']['data'] == ['first']
+        assert os.listdir(directory) == ['cache.pickle']
+    with_pickle_file(run, write_behind=False)
+
+def check_lru_limits():
+    """Shared checks for both backends: count and byte limits evict least recently used first"""
+    original_limits = cache_module.CACHE_MAX_ENTRIES, cache_module.CACHE_MAX_BYTES
+    original_resolution = cache_module.CACHE_ACCESS_RESOLUTION
+    cache_module.CACHE_MAX_ENTRIES, cache_module.CACHE_MAX_BYTES = 3, 10_000
+    # Record every access so the read below reorders entries written moments ago
+    cache_module.CACHE_ACCESS_RESOLUTION = 0
+    try:
+        for ticker in ('TEST1', 'TEST2', 'TEST3'):
+            cache_module.add_to_cache(ticker, [ticker])
+        cache_module.get_from_cache('TEST1')
+        cache_module.add_to_cache('TEST4', ['TEST4'])
+        assert not cache_module.cache_contains('TEST2')
+        assert all(cache_module.cache_contains(t) for t in ('TEST1', 'TEST3', 'TEST4'))
+
+        # An entry over the byte limit on its own evicts everything else but is kept
+        cache_module.add_to_cache('TEST5', ['x' * 10_000])
+        report = cache_module.get_cache_report()
+        print(f"Report: {report}")
+        assert report['entries'] == cache_module.get_cache_size() == 1
+        assert report['largest'][0][0] == 'TEST5'
+        assert report['bytes'] > 10_000
+    finally:
+        cache_module.CACHE_MAX_ENTRIES, cache_module.CACHE_MAX_BYTES = original_limits
+        cache_module.CACHE_ACCESS_RESOLUTION = original_resolution
+        for ticker in ('TEST1', 'TEST2', 'TEST3', 'TEST4', 'TEST5'):
+            cache_module.remove_from_cache(ticker)
+
+def test_lru_limits_sqlite():
+    """The SQLite backend evicts by last access across the whole database"""
+    with_database(lambda directory: check_lru_limits())
+
+def test_lru_limits_pickle():
+    """The pickle backend keeps its entries in LRU order"""
+    with_pickle_file(lambda directory: check_lru_limits(), write_behind=False)
+
+def test_cache_hits_stay_read_only():
+    """Reading an entry again within CACHE_ACCESS_RESOLUTION doesn't write to the database"""
+    def run(directory):
+        backend = cache_module.get_backend()
+        cache_module.add_to_cache('TEST', ['data'])
+        conn = backend._connect()
+        writes = conn.total_changes
+        for _ in range(5):
+            assert cache_module.get_from_cache('TEST')[1]
+        assert conn.total_changes == writes
+
+        original_resolution = cache_module.CACHE_ACCESS_RESOLUTION
+        cache_module.CACHE_ACCESS_RESOLUTION = 0
+        try:
+            backend.get('TEST')
+            assert conn.total_changes == writes + 1
+            # Timestamp lookups (prewarm scheduling) never count as an access
+            assert 'TEST' in cache_module.get_entry_times_batch(['TEST', 'MISSING'])
+            assert conn.total_changes == writes + 1
+        finally:
+            cache_module.CACHE_ACCESS_RESOLUTION = original_resolution
+    with_database(run)
+
+if __name__ == "__main__":
+    test_other_process_writes_are_visible()
+    test_concurrent_writers_keep_each_others_entries()
+    test_pickle_cache_is_imported()
+    test_write_behind_saves_in_the_background()
+    test_failed_save_keeps_the_previous_file()
+    test_lru_limits_sqlite()
+    test_lru_limits_pickle()
+    test_cache_hits_stay_read_only()
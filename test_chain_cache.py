@@ -0,0 +1,75 @@
+"""
+Test the bounded TTL caches used for option chains and snapshot quotes
+"""
+import cache_module
+from cache_module import TTLCache
+
+class FakeClock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+def test_entries_expire():
+    """Entries expire after their own TTL and the lookups are counted"""
+    clock = FakeClock()
+    cache = TTLCache(10, default_ttl=15, clock=clock)
+    cache.set('quotes', [1, 2, 3])
+    cache.set('contracts', [4], expires_at=clock.now + 3600)
+
+    assert cache.get('quotes') == ([1, 2, 3], True)
+    clock.now += 16
+    assert cache.get('quotes') == (None, False)
+    assert cache.get('contracts') == ([4], True)
+    clock.now += 3600
+    assert 'contracts' not in cache
+
+    stats = cache.stats()
+    print(f"Stats: {stats}")
+    assert stats['hits'] == 2
+    assert stats['misses'] == 1
+    assert stats['expirations'] == 1
+
+def test_least_recently_used_is_evicted():
+    """A full cache drops the entry that was used longest ago"""
+    cache = TTLCache(2)
+    cache.set('AAPL', 'a')
+    cache.set('TSLA', 't')
+    cache.get('AAPL')
+    cache.set('SPY', 's')
+
+    assert 'TSLA' not in cache
+    assert cache.get('AAPL') == ('a', True)
+    assert cache.get('SPY') == ('s', True)
+    assert cache.stats()['evictions'] == 1
+    assert len(cache) == 2
+
+def test_byte_limit_evicts_large_listings():
+    """Least recently used values are dropped once the total size passes max_bytes"""
+    cache = TTLCache(10, max_bytes=100, sizeof=len)
+    cache.set('AAPL', 'a' * 40)
+    cache.set('TSLA', 't' * 40)
+    cache.get('AAPL')
+    cache.set('SPY', 's' * 40)
+
+    assert 'TSLA' not in cache
+    assert cache.stats()['bytes'] == 80
+    # A value larger than the limit is still kept on its own
+    cache.set('QQQ', 'q' * 150)
+    assert len(cache) == 1 and cache.get('QQQ')[1]
+    cache.pop('QQQ')
+    assert cache.stats()['bytes'] == 0
+
+def test_chain_cache_stats():
+    """Both chain caches report their counters"""
+    stats = cache_module.get_chain_cache_stats()
+    assert set(stats) == {'option_chain', 'option_quote'}
+    assert stats['option_quote']['maxsize'] == cache_module.QUOTE_CACHE_SIZE
+    assert stats['option_chain']['max_bytes'] == cache_module.OPTION_CHAIN_CACHE_BYTES
+
+if __name__ == "__main__":
+    test_entries_expire()
+    test_least_recently_used_is_evicted()
+    test_byte_limit_evicts_large_listings()
+    test_chain_cache_stats()
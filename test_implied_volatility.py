@@ -0,0 +1,85 @@
+"""
+Test the batch implied volatility solver and its use in delta weighting
+"""
+import time
+
+import numpy as np
+import pandas as pd
+
+import institutional_sentiment
+import option_pricing
+
+def random_chain(n, seed=1):
+    """n contracts from deep ITM to deep OTM, with the prices they imply"""
+    rng = np.random.default_rng(seed)
+    spot = rng.uniform(5, 800, n)
+    strike = spot * np.exp(rng.uniform(-1.2, 1.2, n))
+    years = rng.uniform(1, 730, n) / 365.0
+    vol = rng.uniform(0.05, 2.0, n)
+    types = np.where(rng.random(n) < 0.5, 'call', 'put')
+    price = option_pricing.black_scholes_price(spot, strike, years, vol, 0.05, types)
+    return spot, strike, years, vol, types, price
+
+def test_round_trip_across_moneyness():
+    """Solved vols reprice the chain, and match the true vol wherever the price carries it"""
+    spot, strike, years, vol, types, price = random_chain(10000)
+    start = time.perf_counter()
+    solved, converged = option_pricing.implied_volatility(price, spot, strike, years, 0.05, types)
+    elapsed = time.perf_counter() - start
+    print(f"10,000 contracts solved in {elapsed * 1000:.1f} ms, {np.sum(~converged)} not converged")
+    assert elapsed < 1
+
+    vega = option_pricing.black_scholes(spot, strike, years, vol, 0.05, types)['vega']
+    informative = vega > 1e-4
+    assert converged[informative].all()
+    assert np.max(np.abs(solved - vol)[informative]) < 1e-8
+
+    repriced = option_pricing.black_scholes_price(spot, strike, years, np.where(converged, solved, 0.1), 0.05, types)
+    assert np.max(np.abs(repriced - price)[converged]) < 1e-9
+    assert np.isnan(solved[~converged]).all()
+
+def test_unsolvable_prices_are_reported():
+    """Prices below intrinsic, above the spot or past expiration don't converge"""
+    solved, converged = option_pricing.implied_volatility(
+        [5.0, 1.0, 150.0, 2.0], 100.0, [100.0, 80.0, 100.0, 100.0], [0.25, 0.25, 0.25, 0.0], option_type='call')
+    assert list(converged) == [True, False, False, False]
+    assert 0.2 < solved[0] < 0.3
+    assert np.isnan(solved[1:]).all()
+
+    vol, ok = option_pricing.implied_volatility(4.0, 100.0, 100.0, 0.25, option_type='put')
+    assert ok and isinstance(vol, float)
+
+def test_chain_prefers_mid_prices():
+    """Chains are solved from the bid/ask mid when quoted, the last price otherwise"""
+    chain = pd.DataFrame({'strike': [90.0, 100.0, 110.0], 'lastPrice': [12.0, 5.0, 1.5],
+                          'bid': [0.0, 4.0, 1.0], 'ask': [0.0, 4.4, 1.2]})
+    solved = option_pricing.chain_implied_volatility(chain, 100.0, 30, 'call')
+    expected, _ = option_pricing.implied_volatility([12.0, 4.2, 1.1], 100.0, chain['strike'], 30 / 365.0)
+    assert np.allclose(solved['iv_solved'], expected)
+    assert solved['iv_converged'].all()
+
+def test_trade_deltas_use_solved_volatility():
+    """Trades without an IV get one solved from their price; unsolvable trades fall back"""
+    priced = option_pricing.black_scholes(100.0, 110.0, 30 / 365.0, 0.6, option_type='call')
+    trades = [
+        {'strike_price': 110.0, 'days_to_expiration': 30, 'contract_type': 'call', 'price': priced['price']},
+        {'strike_price': 110.0, 'days_to_expiration': 30, 'contract_type': 'call', 'price': 0.0},
+        {'strike_price': 90.0, 'days_to_expiration': 30, 'contract_type': 'put', 'price': 1.0,
+         'implied_volatility': 0.45},
+    ]
+    assert institutional_sentiment.solve_trade_volatilities(trades, 100.0) == 1
+    assert abs(trades[0]['implied_volatility'] - 0.6) < 1e-8 and trades[0]['iv_converged']
+    assert trades[1]['implied_volatility'] == institutional_sentiment.DEFAULT_VOLATILITY
+    assert not trades[1]['iv_converged']
+    assert trades[2]['implied_volatility'] == 0.45 and 'iv_converged' not in trades[2]
+
+    deltas = institutional_sentiment.calculate_option_deltas(trades, 100.0)
+    assert abs(deltas[0] - priced['delta']) < 1e-8
+    assert deltas[0] == institutional_sentiment.calculate_option_delta(trades[0], 100.0)
+    assert 0 < deltas[2] < 0.5
+
+if __name__ == "__main__":
+    test_round_trip_across_moneyness()
+    test_unsolvable_prices_are_reported()
+    test_chain_prefers_mid_prices()
+    test_trade_deltas_use_solved_volatility()
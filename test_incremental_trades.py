@@ -0,0 +1,116 @@
+"""
+Test incremental trade fetching with per-contract high-water marks
+Runs entirely offline against the local Polygon stand-in
+"""
+import time
+
+import parallel_options
+import polygon_client
+import polygon_trades
+from polygon_replay import PolygonStandIn, use_base_url
+
+NOW_NS = int(time.time() * 1e9)
+SYMBOL = 'O:TEST260116C00100000'
+
+def make_trades(count, newest_ns, step_ns=1_000_000_000):
+    """Newest first, like /v3/trades?order=desc"""
+    return [{'size': 10 + i, 'price': 2.0, 'sip_timestamp': newest_ns - i * step_ns, 'exchange': 1}
+            for i in range(count)]
+
+def test_build_url_and_merge():
+    """The URL carries timestamp.gt once a contract has state, and merges keep the newest trades"""
+    polygon_trades.reset_trade_state()
+    try:
+        assert 'timestamp.gt' not in polygon_trades.build_trades_url(SYMBOL)
+
+        held = polygon_trades.merge_trades(SYMBOL, make_trades(polygon_trades.TRADES_LIMIT, NOW_NS))
+        assert len(held) == polygon_trades.TRADES_LIMIT
+        assert polygon_trades.get_high_water_mark(SYMBOL) == NOW_NS
+        assert f"timestamp.gt={NOW_NS}" in polygon_trades.build_trades_url(SYMBOL)
+
+        # Three newer trades, plus one already held (a server ignoring timestamp.gt)
+        newer = make_trades(3, NOW_NS + 3_000_000_000) + [held[0]]
+        merged = polygon_trades.merge_trades(SYMBOL, newer)
+        assert len(merged) == polygon_trades.TRADES_LIMIT
+        assert merged[:3] == newer[:3]
+        assert merged[3] == held[0]
+        assert merged[-1] == held[-4]
+        assert polygon_trades.get_high_water_mark(SYMBOL) == NOW_NS + 3_000_000_000
+    finally:
+        polygon_trades.reset_trade_state()
+
+def test_state_is_compact_and_bounded_by_trades():
+    """The state holds TRADE_FIELDS tuples and evicts whole contracts once MAX_TRACKED_TRADES is passed"""
+    polygon_trades.reset_trade_state()
+    original_limit = polygon_trades.MAX_TRACKED_TRADES
+    polygon_trades.MAX_TRACKED_TRADES = 120
+    try:
+        extra = {'participant_timestamp': NOW_NS, 'id': 'abc', 'sequence_number': 7, 'conditions': [209]}
+        merged = polygon_trades.merge_trades(SYMBOL, [dict(trade, **extra) for trade in make_trades(50, NOW_NS)])
+        assert merged[0] == {'sip_timestamp': NOW_NS, 'size': 10, 'price': 2.0, 'exchange': 1, 'conditions': (209,)}
+        assert polygon_trades._trade_state[SYMBOL][0] == (NOW_NS, 10, 2.0, 1, (209,))
+
+        for symbol in ('O:B', 'O:C'):
+            polygon_trades.merge_trades(symbol, make_trades(50, NOW_NS))
+        # 150 trades held would pass the bound, so the least recently refreshed contract goes
+        stats = polygon_trades.get_trade_state_stats()
+        assert stats == {'contracts': 2, 'trades': 100, 'max_trades': 120}
+        assert polygon_trades.get_high_water_mark(SYMBOL) is None
+        assert polygon_trades.get_high_water_mark('O:C') == NOW_NS
+    finally:
+        polygon_trades.MAX_TRACKED_TRADES = original_limit
+        polygon_trades.reset_trade_state()
+
+def test_state_is_dropped_at_the_next_open():
+    """Trades from an earlier session are not carried into the next one"""
+    polygon_trades.reset_trade_state()
+    try:
+        polygon_trades.merge_trades(SYMBOL, make_trades(5, NOW_NS))
+        assert polygon_trades._state_expires_at > time.time()
+        assert polygon_trades.get_high_water_mark(SYMBOL) == NOW_NS
+
+        # The market has opened since the state was built
+        polygon_trades._state_expires_at = time.time() - 1
+        assert polygon_trades.get_high_water_mark(SYMBOL) is None
+        assert 'timestamp.gt' not in polygon_trades.build_trades_url(SYMBOL)
+        assert polygon_trades.get_trade_state_stats()['trades'] == 0
+        assert polygon_trades._state_expires_at > time.time()
+    finally:
+        polygon_trades.reset_trade_state()
+
+def test_refresh_downloads_only_new_trades():
+    """A second scan of a contract asks only for newer trades and scores the merged window"""
+    polygon_trades.reset_trade_state()
+    polygon_client.circuit_breaker.reset()
+    option = {'ticker': SYMBOL, 'strike_price': 100.0, 'expiration_date': '2026-01-16', 'contract_type': 'call'}
+    try:
+        with PolygonStandIn() as stand_in, use_base_url(stand_in.base_url):
+            trades_path = f"/v3/trades/{SYMBOL}?limit=50&order=desc"
+            stand_in.add_response(trades_path, {'results': make_trades(5, NOW_NS)})
+
+            first = parallel_options.process_single_option(option, 100.0, {}, 'TEST')
+            assert first[0] is not None
+
+            # No new activity: the refresh returns nothing but the window still scores
+            second = parallel_options.process_single_option(option, 100.0, {}, 'TEST')
+            assert second[0] is not None
+            assert second[1] == first[1]
+
+            # One new print arrives
+            stand_in.add_response(trades_path, {'results': make_trades(1, NOW_NS + 60_000_000_000) + make_trades(5, NOW_NS)})
+            parallel_options.process_single_option(option, 100.0, {}, 'TEST')
+
+            keys = [key for key, _ in stand_in.request_log]
+            print(f"Requests: {keys}")
+            assert 'timestamp.gt' not in keys[0]
+            assert f"timestamp.gt={NOW_NS}" in keys[1]
+            assert f"timestamp.gt={NOW_NS}" in keys[2]
+            assert polygon_trades.get_high_water_mark(SYMBOL) == NOW_NS + 60_000_000_000
+    finally:
+        polygon_trades.reset_trade_state()
+
+if __name__ == "__main__":
+    test_build_url_and_merge()
+    test_state_is_compact_and_bounded_by_trades()
+    test_state_is_dropped_at_the_next_open()
+    test_refresh_downloads_only_new_trades()
@@ -0,0 +1,161 @@
+"""
+Test next_url pagination and server-side filters for option contract listings
+Runs entirely offline against a small local HTTP server
+"""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import cache_module
+import polygon_integration
+
+PAGE_SIZE = 10
+
+# Cursors the server answers with a 500 (see test_failed_page_fails_the_listing)
+failing_cursors = set()
+
+def make_contracts():
+    """Three expirations x 20 strikes x calls/puts = 120 contracts"""
+    contracts = []
+    for expiry in ('2026-01-16', '2026-02-20', '2026-03-20'):
+        for strike in range(90, 110):
+            for contract_type in ('call', 'put'):
+                contracts.append({
+                    'ticker': f"O:TEST{expiry.replace('-', '')[2:]}{contract_type[0].upper()}{strike * 1000:08d}",
+                    'strike_price': float(strike),
+                    'expiration_date': expiry,
+                    'contract_type': contract_type
+                })
+    return contracts
+
+def start_server(requests_seen):
+    contracts = make_contracts()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            parsed = urlparse(self.path)
+            query = parse_qs(parsed.query)
+            requests_seen.append(query)
+
+            low = float(query.get('strike_price.gte', ['0'])[0])
+            high = float(query.get('strike_price.lte', ['1e9'])[0])
+            contract_type = query.get('contract_type', [None])[0]
+            matching = [c for c in contracts
+                        if low <= c['strike_price'] <= high
+                        and (contract_type is None or c['contract_type'] == contract_type)]
+
+            cursor = int(query.get('cursor', ['0'])[0])
+            if cursor in failing_cursors:
+                self.send_response(500)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            body = {'status': 'OK', 'results': matching[cursor:cursor + PAGE_SIZE]}
+            if cursor + PAGE_SIZE < len(matching):
+                # Like Polygon, the cursor URL carries the filters but not the API key
+                body['next_url'] = (f"http://127.0.0.1:{self.server.server_port}{parsed.path}"
+                                    f"?cursor={cursor + PAGE_SIZE}&strike_price.gte={low}&strike_price.lte={high}"
+                                    + (f"&contract_type={contract_type}" if contract_type else ""))
+
+            payload = json.dumps(body).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def with_server(test):
+    requests_seen = []
+    server = start_server(requests_seen)
+    original_base_url = polygon_integration.BASE_URL
+    polygon_integration.BASE_URL = f"http://127.0.0.1:{server.server_port}"
+    cache_module.clear_chain_caches()
+    try:
+        test(requests_seen)
+    finally:
+        polygon_integration.BASE_URL = original_base_url
+        cache_module.clear_chain_caches()
+        server.shutdown()
+        server.server_close()
+
+def test_all_pages_are_followed():
+    """Every page is fetched and the API key is re-attached to cursor URLs"""
+    def run(requests_seen):
+        chain = polygon_integration.get_option_chain('TEST')
+        print(f"Fetched {len(chain)} contracts in {len(requests_seen)} pages")
+        assert len(chain) == 120
+        assert len(requests_seen) == 12
+        assert all('apiKey' in query for query in requests_seen)
+
+        # Served from the chain cache: no more requests
+        expirations = polygon_integration.get_option_expirations('TEST')
+        print(f"Expirations: {expirations}")
+        assert expirations == ['2026-01-16', '2026-02-20', '2026-03-20']
+        assert len(requests_seen) == 12
+    with_server(run)
+
+def test_server_side_filters():
+    """Strike and contract type filters are sent to the server"""
+    def run(requests_seen):
+        chain = polygon_integration.get_option_chain('TEST', strike_price_gte=95, strike_price_lte=99,
+                                                     contract_type='call')
+        print(f"Fetched {len(chain)} filtered contracts in {len(requests_seen)} pages")
+        assert len(chain) == 15
+        assert requests_seen[0]['strike_price.gte'] == ['95']
+        assert requests_seen[0]['contract_type'] == ['call']
+    with_server(run)
+
+def test_streaming_iteration():
+    """The generator yields the first page before the rest are requested"""
+    def run(requests_seen):
+        contracts = polygon_integration.iter_option_contracts('TEST')
+        first = next(contracts)
+        assert first['strike_price'] == 90.0
+        assert len(requests_seen) == 1
+        # Abandoning the stream early leaves nothing in the cache
+        contracts.close()
+        assert polygon_integration.option_chain_key('TEST', {}) not in polygon_integration.option_chain_cache
+
+        contracts = polygon_integration.iter_option_contracts('TEST')
+        remaining = sum(1 for _ in contracts)
+        assert remaining == 120
+        assert len(requests_seen) == 13
+    with_server(run)
+
+def test_failed_page_fails_the_listing():
+    """A page failing mid-listing gives None instead of a truncated chain, and nothing is cached"""
+    def run(requests_seen):
+        failing_cursors.add(50)
+        try:
+            assert polygon_integration.get_option_chain('TEST') is None
+            assert polygon_integration.option_chain_key('TEST', {'expiration_date': None}) not in polygon_integration.option_chain_cache
+        finally:
+            failing_cursors.clear()
+        assert len(polygon_integration.get_option_chain('TEST')) == 120
+    with_server(run)
+
+def test_price_ticks_share_the_cached_listing():
+    """Scans a few cents apart request the same bucketed strikes and reuse one listing"""
+    def run(requests_seen):
+        for price in (101.02, 101.37, 100.81):
+            filters = polygon_integration.get_strike_filters(price, 0.05)
+            assert filters == {'strike_price_gte': 90.0, 'strike_price_lte': 110.0}
+            chain = list(polygon_integration.iter_option_contracts('TEST', **filters))
+            assert len(chain) == 120
+        assert len(requests_seen) == 12
+    with_server(run)
+
+if __name__ == "__main__":
+    test_all_pages_are_followed()
+    test_server_side_filters()
+    test_streaming_iteration()
+    test_failed_page_fails_the_listing()
+    test_price_ticks_share_the_cached_listing()
@@ -0,0 +1,100 @@
+"""
+Test the vectorized Black-Scholes engine against the scalar formulas
+"""
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+from scipy.stats import norm
+
+import option_calculator
+import option_pricing
+
+def scalar_greeks(S, K, T, sigma, r, option_type):
+    """The per-strike formulas option_calculator.get_option_greeks used before"""
+    d1 = (np.log(S / K) + (r + 0.5 * sigma ** 2) * T) / (sigma * np.sqrt(T))
+    d2 = d1 - sigma * np.sqrt(T)
+    gamma = norm.pdf(d1) / (S * sigma * np.sqrt(T))
+    vega = S * np.sqrt(T) * norm.pdf(d1) * 0.01
+    if option_type == 'call':
+        price = S * norm.cdf(d1) - K * np.exp(-r * T) * norm.cdf(d2)
+        delta = norm.cdf(d1)
+        theta = -((S * norm.pdf(d1) * sigma) / (2 * np.sqrt(T))) - r * K * np.exp(-r * T) * norm.cdf(d2)
+        rho = K * T * np.exp(-r * T) * norm.cdf(d2) * 0.01
+    else:
+        price = K * np.exp(-r * T) * norm.cdf(-d2) - S * norm.cdf(-d1)
+        delta = norm.cdf(d1) - 1
+        theta = -((S * norm.pdf(d1) * sigma) / (2 * np.sqrt(T))) + r * K * np.exp(-r * T) * norm.cdf(-d2)
+        rho = -K * T * np.exp(-r * T) * norm.cdf(-d2) * 0.01
+    return {'price': price, 'delta': delta, 'gamma': gamma, 'theta': theta, 'vega': vega, 'rho': rho}
+
+def test_matches_scalar_formulas():
+    """Every Greek of a 2,000-contract random chain agrees with the scalar formulas to 1e-10"""
+    rng = np.random.default_rng(7)
+    n = 2000
+    spot = rng.uniform(5, 800, n)
+    strike = spot * rng.uniform(0.5, 1.5, n)
+    time = rng.uniform(1, 730, n) / 365.0
+    vol = rng.uniform(0.05, 1.5, n)
+    types = np.where(rng.random(n) < 0.5, 'call', 'put')
+
+    greeks = option_pricing.black_scholes(spot, strike, time, vol, 0.05, types)
+    for i in range(0, n, 7):
+        expected = scalar_greeks(spot[i], strike[i], time[i], vol[i], 0.05, types[i])
+        for name, value in expected.items():
+            assert abs(greeks[name][i] - value) <= 1e-10, (name, i, greeks[name][i], value)
+
+def test_scalars_and_expired_contracts():
+    """Scalar inputs give floats; expired contracts are worth intrinsic value"""
+    greeks = option_pricing.black_scholes(100.0, 95.0, 30 / 365.0, 0.3, option_type='put')
+    assert isinstance(greeks['delta'], float)
+    assert -0.5 < greeks['delta'] < 0
+
+    expired = option_pricing.black_scholes([110.0, 90.0], 100.0, 0.0, 0.3, option_type=['call', 'put'])
+    assert list(expired['price']) == [10.0, 10.0]
+    assert list(expired['delta']) == [1.0, -1.0]
+    assert not expired['gamma'].any()
+
+FakeChain = namedtuple('FakeChain', 'calls puts')
+
+class FakeStock:
+    """A yfinance Ticker with a fixed chain that counts chain downloads"""
+
+    ticker = 'TEST'
+    info = {'currentPrice': 100.0}
+
+    def __init__(self):
+        self.chain_calls = 0
+        strikes = np.arange(80.0, 121.0, 5.0)
+        self.chain = pd.DataFrame({'strike': strikes, 'lastPrice': np.maximum(100 - strikes, 0) + 2.0,
+                                   'impliedVolatility': np.linspace(0.4, 0.25, len(strikes))})
+
+    def history(self, period):
+        return pd.DataFrame({'Close': [100.0]})
+
+    def option_chain(self, expiration_date):
+        self.chain_calls += 1
+        return FakeChain(self.chain, self.chain)
+
+def test_option_greeks_reuse_the_priced_chain():
+    """Changing the strike reads the cached chain instead of refetching it"""
+    option_calculator.clear_chain_caches()
+    stock = FakeStock()
+    expiration = (datetime.now() + timedelta(days=30)).strftime('%Y-%m-%d')
+    try:
+        for strike in (90.0, 100.0, 110.0):
+            greeks = option_calculator.get_option_greeks(stock, expiration, strike, 'call')
+            iv = stock.chain.loc[stock.chain['strike'] == strike, 'impliedVolatility'].iloc[0]
+            expected = scalar_greeks(100.0, strike, 30 / 365.0, iv, option_pricing.RISK_FREE_RATE, 'call')
+            assert abs(greeks['delta'] - expected['delta']) <= 1e-10
+            assert abs(greeks['theta'] - expected['theta'] / 365.0) <= 1e-10
+            assert greeks['price'] == stock.chain.loc[stock.chain['strike'] == strike, 'lastPrice'].iloc[0]
+        assert stock.chain_calls == 1
+    finally:
+        option_calculator.clear_chain_caches()
+
+if __name__ == "__main__":
+    test_matches_scalar_formulas()
+    test_scalars_and_expired_contracts()
+    test_option_greeks_reuse_the_priced_chain()
@@ -0,0 +1,194 @@
+"""
+Test options snapshot ingestion for the unusual activity scan
+Runs entirely offline against a small local HTTP server
+"""
+import asyncio
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import cache_module
+import parallel_options
+import polygon_integration
+import polygon_snapshot
+import polygon_trades
+
+PAGE_SIZE = 20
+NOW_NS = int(time.time() * 1e9)
+HEAVY_STRIKES = (100, 106, 110)
+
+def make_snapshots():
+    """40 strikes x calls/puts around a $100 stock; a few contracts trade heavily"""
+    snapshots = []
+    for strike in range(80, 120):
+        for contract_type in ('call', 'put'):
+            heavy = contract_type == 'call' and strike in HEAVY_STRIKES
+            snapshots.append({
+                'details': {
+                    'ticker': f"O:TEST260116{contract_type[0].upper()}{strike * 1000:08d}",
+                    'strike_price': float(strike),
+                    'expiration_date': '2026-01-16',
+                    'contract_type': contract_type
+                },
+                'day': {'volume': 400 if heavy else (3 if strike % 2 else 0), 'vwap': 30.0 if heavy else 1.0},
+                'last_trade': {'size': 150 if heavy else 1, 'price': 30.0 if heavy else 1.0,
+                               'sip_timestamp': NOW_NS, 'exchange': 1},
+                'open_interest': 1000,
+                'implied_volatility': 0.45,
+                'greeks': {'delta': 0.4}
+            })
+    return snapshots
+
+def start_server(calls, snapshot_status=200):
+    snapshots = make_snapshots()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            parsed = urlparse(self.path)
+            query = parse_qs(parsed.query)
+            calls.append(parsed.path)
+
+            status = 200
+            if parsed.path.startswith('/v2/last/trade/'):
+                body = {'results': {'p': 100.0}}
+            elif parsed.path.startswith('/v3/snapshot/options/'):
+                status = snapshot_status
+                cursor = int(query.get('cursor', ['0'])[0])
+                body = {'status': 'OK', 'results': snapshots[cursor:cursor + PAGE_SIZE]}
+                if cursor + PAGE_SIZE < len(snapshots):
+                    body['next_url'] = f"http://127.0.0.1:{self.server.server_port}{parsed.path}?cursor={cursor + PAGE_SIZE}"
+            elif parsed.path.startswith('/v3/trades/'):
+                symbol = parsed.path.rsplit('/', 1)[-1]
+                heavy = symbol[-9] == 'C' and int(symbol[-8:]) // 1000 in HEAVY_STRIKES
+                size, price = (150, 30.0) if heavy else (1, 1.0)
+                body = {'results': [{'size': size, 'price': price, 'sip_timestamp': NOW_NS, 'exchange': 1},
+                                    {'size': size, 'price': price, 'sip_timestamp': NOW_NS - 1000, 'exchange': 1}]}
+            else:
+                body = {'results': []}
+
+            payload = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def with_server(test, snapshot_status=200):
+    calls = []
+    server = start_server(calls, snapshot_status)
+    base_url = f"http://127.0.0.1:{server.server_port}"
+    modules = (polygon_integration, polygon_snapshot, polygon_trades, parallel_options)
+    originals = [module.BASE_URL for module in modules]
+    original_cache_file = cache_module.CACHE_FILE
+    original_cache_db = cache_module.CACHE_DB
+    for module in modules:
+        module.BASE_URL = base_url
+    cache_module.CACHE_FILE = original_cache_file + '.test'
+    cache_module.CACHE_DB = original_cache_db + '.test'
+    polygon_trades.reset_trade_state()
+    cache_module.clear_chain_caches()
+    try:
+        cache_module.remove_from_cache('TEST')
+        test(calls)
+    finally:
+        cache_module.remove_from_cache('TEST')
+        for path in (cache_module.CACHE_FILE, cache_module.CACHE_DB,
+                     cache_module.CACHE_DB + '-wal', cache_module.CACHE_DB + '-shm'):
+            if os.path.exists(path):
+                os.remove(path)
+        cache_module.CACHE_FILE = original_cache_file
+        cache_module.CACHE_DB = original_cache_db
+        cache_module.clear_chain_caches()
+        for module, original in zip(modules, originals):
+            module.BASE_URL = original
+        server.shutdown()
+        server.server_close()
+
+def test_snapshot_pagination():
+    """All snapshot pages are loaded and flattened into contract dictionaries"""
+    def run(calls):
+        options = polygon_snapshot.get_option_snapshots('TEST')
+        print(f"Loaded {len(options)} contracts in {len(calls)} requests")
+        assert len(options) == 80
+        assert len(calls) == 4
+        assert options[0]['ticker'] == 'O:TEST260116C00080000'
+        assert options[0]['open_interest'] == 1000
+    with_server(run)
+
+def test_snapshot_scan_limits_trades_calls():
+    """Only the top candidates get a /v3/trades call"""
+    def run(calls):
+        result = polygon_integration.get_unusual_options_activity('TEST')
+        trades_calls = [path for path in calls if path.startswith('/v3/trades/')]
+        print(f"Analyzed {result['all_options_analyzed']} contracts with {len(trades_calls)} trades calls")
+        assert len(trades_calls) <= polygon_snapshot.TOP_CANDIDATES
+        # Odd strikes trade a little, plus the three heavy calls on even strikes
+        assert result['all_options_analyzed'] == 43
+        top_contracts = sorted(option['contract'] for option in result['unusual_options'])
+        print(f"Top contracts: {top_contracts}")
+        assert top_contracts == [f"TEST {float(strike)} 2026-01-16 CALL" for strike in HEAVY_STRIKES]
+    with_server(run)
+
+def test_snapshot_scan_async():
+    """The async scan produces the same result as the sync scan"""
+    def run(calls):
+        async def scan():
+            import async_polygon_client
+            try:
+                return await polygon_integration.get_unusual_options_activity_async('TEST')
+            finally:
+                await async_polygon_client.close_async_session()
+        result = asyncio.run(scan())
+        assert result['all_options_analyzed'] == 43
+        assert len(result['unusual_options']) == len(HEAVY_STRIKES)
+    with_server(run)
+
+def test_trade_details_keep_snapshot_ranking():
+    """A top candidate whose trades score lower keeps its snapshot score and rank"""
+    def entry(contract, score, **fields):
+        option_entry = {'contract': contract, 'premium': 1000.0, 'sentiment': 'bullish',
+                        'unusualness_score': score, 'score_breakdown': {}, 'contract_volume': 1}
+        option_entry.update(fields)
+        return option_entry, score, score >= 30, 'bullish'
+
+    scored = [({'ticker': 'O:A'}, entry('A', 80)),
+              ({'ticker': 'O:B'}, entry('B', 60)),
+              ({'ticker': 'O:C'}, entry('C', 40))]
+    # Only A was refined, and its 50-trade window scores below the unrefined B and C
+    trade_entry, _, _, _ = entry('A', 20, timestamp=NOW_NS, timestamp_human='10:30:00', exchange='CBOE')
+    trade_entry['score_breakdown'] = {'largest_trade': 150}
+    refined = {'O:A': (trade_entry, 20, False, 'bullish')}
+
+    result = parallel_options.collect_snapshot_results(scored, refined)
+    ranked = result['unusual_options']
+    assert [item['contract'] for item in ranked] == ['A', 'B', 'C']
+    assert ranked[0]['unusualness_score'] == 80
+    assert ranked[0]['timestamp'] == NOW_NS and ranked[0]['exchange'] == 'CBOE'
+    assert ranked[0]['largest_trade'] == 150
+    assert 'timestamp' not in ranked[1]
+    # The scored snapshot entries themselves are not modified
+    assert 'timestamp' not in scored[0][1][0]
+
+def test_falls_back_without_snapshot_access():
+    """A 403 on the snapshot falls back to the reference contracts scan"""
+    def run(calls):
+        polygon_integration.get_unusual_options_activity('TEST')
+        assert any(path == '/v3/reference/options/contracts' for path in calls)
+    with_server(run, snapshot_status=403)
+
+if __name__ == "__main__":
+    test_snapshot_pagination()
+    test_snapshot_scan_limits_trades_calls()
+    test_snapshot_scan_async()
+    test_trade_details_keep_snapshot_ranking()
+    test_falls_back_without_snapshot_access()
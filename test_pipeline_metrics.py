@@ -0,0 +1,86 @@
+"""
+Test pipeline stage timing and a small offline run of the benchmark harness
+"""
+import asyncio
+import time
+
+import pipeline_metrics
+
+def test_nested_stages_are_exclusive():
+    """Time spent in a nested stage is not counted again in its parent"""
+    timer = pipeline_metrics.StageTimer()
+    with timer.stage('filter'):
+        time.sleep(0.05)
+        for _ in range(2):
+            with timer.stage('chain_fetch'):
+                time.sleep(0.05)
+
+    timings = timer.snapshot()
+    print(f"Timings: {timings}")
+    assert timings['chain_fetch']['calls'] == 2
+    assert 0.09 <= timings['chain_fetch']['seconds'] < 0.2
+    assert 0.04 <= timings['filter']['seconds'] < 0.09
+
+def test_async_tasks_keep_their_own_stages():
+    """Concurrent tasks don't subtract each other's time"""
+    timer = pipeline_metrics.StageTimer()
+
+    async def fetch():
+        with timer.stage('trade_fetch'):
+            await asyncio.sleep(0.05)
+
+    async def main():
+        await asyncio.gather(*(fetch() for _ in range(4)))
+
+    asyncio.run(main())
+    timings = timer.snapshot()
+    assert timings['trade_fetch']['calls'] == 4
+    # Summed across tasks, so roughly 4 x 0.05 seconds
+    assert timings['trade_fetch']['seconds'] >= 0.18
+
+def test_cache_metrics():
+    """Hits, misses, stale serves and refresh times are counted with bucketed histograms"""
+    metrics = pipeline_metrics.CacheMetrics()
+    for age in (2, 3, 40, 250):
+        metrics.record_hit(age)
+    metrics.record_miss()
+    metrics.record_stale_serve(320)
+    metrics.record_refresh('SPY', 12.0)
+    metrics.record_refresh('SPY', 18.0)
+    metrics.record_refresh('AAPL', 0.3)
+    with metrics.refresh_timer('AMD'):
+        time.sleep(0.01)
+
+    snapshot = metrics.snapshot(top=2)
+    print(pipeline_metrics.format_cache_metrics(snapshot))
+    assert (snapshot['hits'], snapshot['misses'], snapshot['stale_serves']) == (4, 1, 1)
+    assert snapshot['hit_rate'] == 4 / 6
+    assert snapshot['served_from_cache_rate'] == 5 / 6
+    assert snapshot['hit_age']['p50'] == 5
+    assert snapshot['hit_age']['p95'] == 250
+    assert snapshot['hit_age']['buckets'][60] == 1
+    assert snapshot['refresh']['count'] == 4
+    assert [ticker for ticker, _ in snapshot['slowest_refreshes']] == ['SPY', 'AAPL']
+    assert snapshot['slowest_refreshes'][0][1]['mean'] == 15.0
+
+    metrics.reset()
+    assert metrics.snapshot()['lookups'] == 0
+
+def test_benchmark_small_chain():
+    """The benchmark harness runs end to end against the stand-in"""
+    from benchmark_unusual_activity import run_benchmark
+
+    results = run_benchmark([100], trades_per_contract=5, mode='snapshot', measure_memory=False)
+    assert [r['function'] for r in results] == ['scan', 'refresh', 'summary']
+    for result in results:
+        print(f"{result['function']}: {result['wall_seconds']}s, {result['requests']} requests")
+        assert result['options_analyzed'] in (result['near_money'], None)
+        assert result['requests'] > 0
+        assert result['stages']['chain_fetch'] > 0
+    assert results[2]['stages']['formatting'] > 0
+
+if __name__ == "__main__":
+    test_nested_stages_are_exclusive()
+    test_async_tasks_keep_their_own_stages()
+    test_cache_metrics()
+    test_benchmark_small_chain()
@@ -0,0 +1,122 @@
+"""
+Test recording Polygon traffic and replaying it through the local stand-in
+Runs entirely offline: a stand-in plays the part of the live API while recording
+"""
+import os
+import tempfile
+import time
+
+import cache_module
+import polygon_client
+import polygon_integration
+import polygon_trades
+from polygon_replay import PolygonRecorder, PolygonStandIn, use_base_url, request_key
+
+NOW_NS = int(time.time() * 1e9)
+
+def populate_live(live):
+    """Give a stand-in the responses a live scan of TEST needs (two snapshot pages)"""
+    snapshots = []
+    for strike in range(90, 110):
+        heavy = strike in (100, 104)
+        snapshots.append({
+            'details': {'ticker': f"O:TEST260116C{strike * 1000:08d}", 'strike_price': float(strike),
+                        'expiration_date': '2026-01-16', 'contract_type': 'call'},
+            'day': {'volume': 500 if heavy else 5, 'vwap': 20.0 if heavy else 1.0},
+            'last_trade': {'size': 200 if heavy else 1, 'price': 20.0 if heavy else 1.0,
+                           'sip_timestamp': NOW_NS, 'exchange': 1},
+            'open_interest': 1000
+        })
+        size, price = (200, 20.0) if heavy else (1, 1.0)
+        live.add_response(f"/v3/trades/O:TEST260116C{strike * 1000:08d}?limit=50&order=desc",
+                          {'results': [{'size': size, 'price': price, 'sip_timestamp': NOW_NS, 'exchange': 1}]})
+
+    live.add_response('/v2/last/trade/TEST', {'results': {'p': 100.0}})
+    first_page = f"/v3/snapshot/options/TEST?limit=250&strike_price.gte=75.0&strike_price.lte=125.0"
+    live.add_response(first_page, {'results': snapshots[:10],
+                                   'next_url': f"{live.base_url}/v3/snapshot/options/TEST?cursor=page2"})
+    live.add_response('/v3/snapshot/options/TEST?cursor=page2', {'results': snapshots[10:]})
+
+def reset_client_state():
+    """Close circuits and restore the shared limiter and concurrency controller"""
+    polygon_client.circuit_breaker.reset()
+    polygon_client.concurrency.reset()
+    polygon_client.rate_limiter.reset()
+
+def scan(base_url):
+    """Run a fresh TEST scan against base_url with an isolated cache file"""
+    original_cache_file = cache_module.CACHE_FILE
+    original_cache_db = cache_module.CACHE_DB
+    cache_module.CACHE_FILE = original_cache_file + '.test'
+    cache_module.CACHE_DB = original_cache_db + '.test'
+    reset_client_state()
+    polygon_trades.reset_trade_state()
+    cache_module.clear_chain_caches()
+    try:
+        with use_base_url(base_url):
+            cache_module.remove_from_cache('TEST')
+            return polygon_integration.get_unusual_options_activity('TEST')
+    finally:
+        # Injected 403s and 429s must not leave circuits open for later tests
+        reset_client_state()
+        cache_module.remove_from_cache('TEST')
+        for path in (cache_module.CACHE_FILE, cache_module.CACHE_DB,
+                     cache_module.CACHE_DB + '-wal', cache_module.CACHE_DB + '-shm'):
+            if os.path.exists(path):
+                os.remove(path)
+        cache_module.CACHE_FILE = original_cache_file
+        cache_module.CACHE_DB = original_cache_db
+
+def record_fixture(fixture_path):
+    with PolygonStandIn() as live:
+        populate_live(live)
+        with PolygonRecorder(fixture_path) as recorder:
+            result = scan(live.base_url)
+    return result, recorder
+
+def test_record_then_replay():
+    """A replayed scan matches the recorded one and never stores the API key"""
+    with tempfile.TemporaryDirectory() as directory:
+        fixture_path = os.path.join(directory, 'test.json')
+        live_result, recorder = record_fixture(fixture_path)
+        print(f"Recorded {len(recorder.responses)} responses")
+        assert '/v2/last/trade/TEST' in recorder.responses
+        assert all('apiKey' not in key for key in recorder.responses)
+
+        with PolygonStandIn(fixture_path) as replay:
+            replay_result = scan(replay.base_url)
+            print(f"Replay status counts: {replay.status_counts()}")
+            assert replay.status_counts() == {200: len(replay.request_log)}
+
+        assert replay_result['all_options_analyzed'] == live_result['all_options_analyzed'] == 20
+        assert ([o['contract'] for o in replay_result['unusual_options']]
+                == [o['contract'] for o in live_result['unusual_options']])
+
+def test_injected_faults():
+    """Injected 429s are absorbed by retries; injected 403s only affect their endpoint"""
+    with tempfile.TemporaryDirectory() as directory:
+        fixture_path = os.path.join(directory, 'test.json')
+        live_result, _ = record_fixture(fixture_path)
+
+        with PolygonStandIn(fixture_path, latency=0.01, rate_limit_rate=0.3, retry_after=0, seed=7) as replay:
+            result = scan(replay.base_url)
+            counts = replay.status_counts()
+            print(f"With injected 429s: {counts}")
+            assert counts.get(429, 0) > 0
+            assert result['all_options_analyzed'] == live_result['all_options_analyzed']
+
+        with PolygonStandIn(fixture_path, forbidden_prefixes=['/v3/trades/']) as replay:
+            result = scan(replay.base_url)
+            # The snapshot still scores every contract without trade-level refinement
+            assert result['all_options_analyzed'] == live_result['all_options_analyzed']
+            assert replay.status_counts().get(403, 0) > 0
+
+def test_request_key_normalization():
+    """Query order and the API key don't change the fixture key"""
+    assert (request_key('https://api.polygon.io/v3/trades/O:X?order=desc&limit=50&apiKey=secret')
+            == request_key('/v3/trades/O:X?limit=50&order=desc'))
+
+if __name__ == "__main__":
+    test_record_then_replay()
+    test_injected_faults()
+    test_request_key_normalization()
@@ -0,0 +1,108 @@
+"""
+Test the watchlist prewarming scheduler
+"""
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+import cache_module
+import polygon_client
+import prewarm_scheduler
+from prewarm_scheduler import PrewarmScheduler
+
+def with_database(test):
+    original = cache_module.CACHE_BACKEND, cache_module.CACHE_DB, cache_module.CACHE_FILE
+    with tempfile.TemporaryDirectory() as directory:
+        cache_module.CACHE_BACKEND = 'sqlite'
+        cache_module.CACHE_DB = os.path.join(directory, 'cache.db')
+        cache_module.CACHE_FILE = os.path.join(directory, 'cache.pickle')
+        try:
+            test(directory)
+        finally:
+            cache_module.CACHE_BACKEND, cache_module.CACHE_DB, cache_module.CACHE_FILE = original
+
+def test_watchlist_from_config():
+    """The watchlist comes from config.json, deduplicated, with a default when absent"""
+    def run(directory):
+        config_file = os.path.join(directory, 'config.json')
+        with open(config_file, 'w') as f:
+            json.dump({'admin_users': [], 'prewarm_watchlist': ['spy', 'QQQ', 'SPY ', '']}, f)
+        assert prewarm_scheduler.load_watchlist(config_file) == ['SPY', 'QQQ']
+
+        with open(config_file, 'w') as f:
+            json.dump({'admin_users': []}, f)
+        assert 'TSLA' in prewarm_scheduler.load_watchlist(config_file)
+    with_database(run)
+
+def test_refreshes_are_due_ahead_of_expiry_and_paced():
+    """Missing tickers are warmed first; fresh ones come due PREWARM_LEAD before expiry"""
+    def run(directory):
+        refreshed = []
+
+        async def refresh(ticker):
+            refreshed.append(ticker)
+            # Pretend the scan made 20 requests, with user requests in between
+            for _ in range(20):
+                polygon_client.rate_limiter.reserve()
+                await asyncio.sleep(0)
+            cache_module.add_to_cache(ticker, {'unusual_options': []})
+
+        async def user_requests():
+            for _ in range(30):
+                polygon_client.rate_limiter.reserve()
+                await asyncio.sleep(0)
+
+        async def run_with_users():
+            users = asyncio.create_task(user_requests())
+            gap = await scheduler.run_once()
+            await users
+            return gap
+
+        scheduler = PrewarmScheduler(['SPY', 'TSLA'], refresh=refresh, is_open=lambda: True)
+        try:
+            gaps = [asyncio.run(run_with_users()) for _ in range(3)]
+        finally:
+            polygon_client.rate_limiter.reset()
+        print(f"Refreshed {refreshed}, gaps {gaps}")
+        assert sorted(refreshed) == ['SPY', 'TSLA']
+
+        # Only the refresh's own 20 requests count, at half of the request budget
+        expected_gap = 20 / (polygon_client.rate_limiter.rate * prewarm_scheduler.PREWARM_BUDGET_SHARE)
+        assert abs(gaps[0] - expected_gap) < 0.5
+        # Both entries are fresh: the scheduler sleeps, capped at MAX_SLEEP
+        assert gaps[2] == prewarm_scheduler.MAX_SLEEP
+
+        now = time.time()
+        times = cache_module.get_entry_times('SPY')
+        created, valid_until = times
+        assert cache_module.get_entry_times_batch(['SPY', 'MSFT']) == {'SPY': times}
+        due = scheduler.next_due('SPY', times, now, market_open=True)
+        if valid_until - created == cache_module.MARKET_HOURS_TTL:
+            assert due == max(valid_until - prewarm_scheduler.PREWARM_LEAD, now + prewarm_scheduler.RETRY_DELAY)
+        # Outside market hours the warmup starts PREOPEN_WARMUP before expiry
+        scheduler._last_attempt.clear()
+        assert scheduler.next_due('SPY', times, now, market_open=False) in (
+            valid_until - prewarm_scheduler.PREOPEN_WARMUP, valid_until)
+        for ticker in ('SPY', 'TSLA'):
+            cache_module.remove_from_cache(ticker)
+    with_database(run)
+
+def test_failures_back_off():
+    """A ticker whose scan fails is not retried for RETRY_DELAY seconds"""
+    def run(directory):
+        async def refresh(ticker):
+            raise RuntimeError("chain unavailable")
+
+        scheduler = PrewarmScheduler(['SPY'], refresh=refresh, is_open=lambda: True)
+        asyncio.run(scheduler.run_once())
+        assert scheduler.failures == 1
+        assert asyncio.run(scheduler.run_once()) == prewarm_scheduler.MAX_SLEEP
+        assert scheduler.next_due('SPY', None, time.time(), True) > time.time() + prewarm_scheduler.RETRY_DELAY - 5
+    with_database(run)
+
+if __name__ == "__main__":
+    test_watchlist_from_config()
+    test_refreshes_are_due_ahead_of_expiry_and_paced()
+    test_failures_back_off()
@@ -0,0 +1,70 @@
+"""
+Test the precompiled query parser of OptionsBotNLP
+Known words must be answered without disk or network access
+"""
+import time
+
+import discord_bot
+import utils_file
+
+class NoNetwork:
+    """Replaces yfinance: any lookup fails the test"""
+
+    def __init__(self):
+        self.lookups = []
+
+    def Ticker(self, symbol):
+        self.lookups.append(symbol)
+        raise AssertionError(f"network lookup for {symbol}")
+
+def with_parser(test):
+    original_yf = utils_file.yf
+    utils_file.yf = NoNetwork()
+    try:
+        test(discord_bot.OptionsBotNLP())
+    finally:
+        utils_file.yf = original_yf
+
+def test_intents_tickers_and_options():
+    """Intents, tickers and option types match the keyword rules"""
+    def run(nlp):
+        parsed = nlp.parse_query("unusual options activity for TSLA calls")
+        assert (parsed['intent'], parsed['ticker'], parsed['option_type']) == ('unusual_activity', 'TSLA', 'call')
+
+        parsed = nlp.parse_query("show me the flow on $NVDA, both calls and puts")
+        assert (parsed['intent'], parsed['ticker'], parsed['option_type']) == ('unusual_activity_both', 'NVDA', None)
+
+        parsed = nlp.parse_query("what is the price of AAPL at 200 puts target 210 expiring 6/20")
+        assert parsed['intent'] == 'price'
+        assert (parsed['ticker'], parsed['option_type']) == ('AAPL', 'put')
+        assert (parsed['strike'], parsed['target_price'], parsed['expiration']) == (200.0, 210.0, '6/20')
+
+        assert nlp.parse_query("hello there")['ticker'] is None
+        assert utils_file.yf.lookups == []
+    with_parser(run)
+
+def test_known_ticker_is_preferred_to_unknown_words():
+    """An unknown word before a known ticker doesn't trigger a lookup"""
+    def run(nlp):
+        assert nlp.extract_ticker("QWRTZ SPY FLOW") == 'SPY'
+        assert utils_file.yf.lookups == []
+    with_parser(run)
+
+def test_parse_speed():
+    """Parsing a typical message takes microseconds, not milliseconds"""
+    def run(nlp):
+        messages = ["unusual options activity for TSLA calls",
+                    "any big put flow in QQQ today?",
+                    "show me both calls and puts on AMD expiring 2026-01-16"]
+        start = time.perf_counter()
+        for i in range(3000):
+            nlp.parse_query(messages[i % len(messages)])
+        per_message = (time.perf_counter() - start) / 3000
+        print(f"{per_message * 1e6:.1f} us per message")
+        assert per_message < 0.0005
+    with_parser(run)
+
+if __name__ == "__main__":
+    test_intents_tickers_and_options()
+    test_known_ticker_is_preferred_to_unknown_words()
+    test_parse_speed()
@@ -0,0 +1,70 @@
+"""
+Test the shared Polygon token-bucket rate limiter and 429 handling
+Runs entirely offline against a small local HTTP server
+"""
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import polygon_client
+
+def test_token_bucket_budget():
+    """Concurrent threads should be spaced out to the configured rate"""
+    bucket = polygon_client.TokenBucket(rate=50, burst=5)
+
+    def worker():
+        for _ in range(5):
+            bucket.acquire()
+
+    start = time.monotonic()
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.monotonic() - start
+
+    # 20 requests with a burst of 5 need 15 refilled tokens at 50/s = 0.3s
+    print(f"20 requests at 50 rps (burst 5) took {elapsed:.2f} seconds")
+    assert elapsed >= 0.25, "Token bucket let requests through faster than the budget"
+    assert elapsed < 1.0, "Token bucket throttled far more than the budget"
+
+def test_retry_after_is_honored():
+    """A 429 should pause the bucket for Retry-After and then be retried"""
+    calls = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            calls.append(time.monotonic())
+            if len(calls) == 1:
+                self.send_response(429)
+                self.send_header('Retry-After', '0.3')
+                self.end_headers()
+                return
+            body = b'{"status": "OK", "results": []}'
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        url = f"http://127.0.0.1:{server.server_port}/v3/trades/O:TEST"
+        response = polygon_client.polygon_get(url)
+        print(f"Status after retry: {response.status_code}, calls made: {len(calls)}")
+        assert response.status_code == 200
+        assert len(calls) == 2
+        assert calls[1] - calls[0] >= 0.25, "Retry-After was not respected"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+if __name__ == "__main__":
+    test_token_bucket_budget()
+    test_retry_after_is_honored()
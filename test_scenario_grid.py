@@ -0,0 +1,63 @@
+"""
+Test full-repricing scenario grids and target-price estimates
+"""
+import time
+
+import numpy as np
+
+import option_calculator
+import option_pricing
+import scenario_grid
+
+def test_grid_reprices_every_scenario():
+    """Each cell is the Black-Scholes price at its own stock price, date and vol"""
+    start = time.perf_counter()
+    grid = scenario_grid.build_scenario_grid(100.0, 105.0, 60, 0.35, 'call', entry_price=3.0)
+    elapsed = time.perf_counter() - start
+    print(f"{grid['values'].size} scenarios in {elapsed * 1000:.2f} ms")
+    assert elapsed < 0.05
+
+    shocks, days, prices = grid['values'].shape
+    assert (shocks, days, prices) == (5, 6, 41)
+    assert grid['days'][0] == 0 and grid['days'][-1] == 60
+    for v, d, p in [(0, 0, 0), (2, 3, 20), (4, 5, 40), (1, 2, 33)]:
+        expected = option_pricing.black_scholes_price(grid['prices'][p], 105.0, (60 - grid['days'][d]) / 365.0,
+                                                      0.35 + grid['vol_shocks'][v], option_type='call')
+        assert abs(grid['values'][v, d, p] - expected) < 1e-12
+    # At expiration only the intrinsic value is left
+    assert np.allclose(grid['values'][:, -1, :], np.maximum(grid['prices'] - 105.0, 0))
+    assert np.allclose(grid['pnl'], (grid['values'] - 3.0) * 100)
+
+    table = scenario_grid.grid_slice(grid, vol_shock=0.05)
+    assert table.shape == (41, 6)
+    assert list(table.columns) == [int(day) for day in grid['days']]
+    assert table.iloc[20, 3] == grid['pnl'][3, 3, 20]
+
+def test_target_price_is_fully_repriced():
+    """Estimates reprice at the target instead of extrapolating the Greeks"""
+    greeks = option_pricing.black_scholes(100.0, 100.0, 45 / 365.0, 0.3, option_type='call')
+    quote = dict(greeks, implied_volatility=0.3, theta=greeks['theta'] / 365.0)
+
+    estimate = option_calculator.calculate_option_price(100.0, 140.0, 100.0, quote, 45, 'call')
+    expected = option_pricing.black_scholes_price(140.0, 100.0, 45 / 365.0, 0.3, option_type='call')
+    assert abs(estimate - expected) < 1e-12
+
+    later = option_calculator.calculate_option_price(100.0, 140.0, 100.0, quote, 45, 'call', days_held=30)
+    assert 40.0 < later < estimate
+    at_expiration = option_calculator.calculate_option_price(100.0, 90.0, 100.0, quote, 45, 'put', days_held=45)
+    assert at_expiration == 10.0
+
+def test_volatility_falls_back_to_the_option_price():
+    """Without a usable quoted IV the vol is solved from the price, or the intrinsic value is used"""
+    price = option_pricing.black_scholes_price(100.0, 95.0, 30 / 365.0, 0.45, option_type='put')
+    quote = {'price': price, 'implied_volatility': 1e-5}
+    volatility = option_calculator.option_volatility(100.0, 95.0, quote, 30, 'put')
+    assert abs(volatility - 0.45) < 1e-8
+
+    assert option_calculator.calculate_option_price(100.0, 90.0, 95.0, {}, 30, 'put') == 5.0
+    assert option_calculator.calculate_option_price(100.0, 90.0, 95.0, {'price': 0}, 30, 'put') == 5.0
+
+if __name__ == "__main__":
+    test_grid_reprices_every_scenario()
+    test_target_price_is_fully_repriced()
+    test_volatility_falls_back_to_the_option_price()
@@ -0,0 +1,103 @@
+"""
+Test single-flight coalescing of concurrent same-ticker scans
+"""
+import asyncio
+import threading
+import time
+
+from single_flight import SingleFlight, AsyncSingleFlight
+
+def test_concurrent_threads_share_one_call():
+    """Ten threads asking for the same key run the function once"""
+    flight = SingleFlight()
+    calls = []
+
+    def scan(ticker):
+        calls.append(ticker)
+        time.sleep(0.2)
+        return {'ticker': ticker, 'all_options_analyzed': 80}
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flight.do('SPY', scan, 'SPY'))) for _ in range(10)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    print(f"{len(results)} callers, {len(calls)} scan(s)")
+    assert len(calls) == 1
+    assert len(results) == 10
+    assert all(result is results[0] for result in results)
+    assert flight.in_flight() == []
+
+    # Once finished, the next caller starts a fresh call
+    flight.do('SPY', scan, 'SPY')
+    assert len(calls) == 2
+
+def test_errors_reach_every_waiter():
+    """An exception in the shared call is raised in every caller"""
+    flight = SingleFlight()
+
+    def failing_scan():
+        time.sleep(0.1)
+        raise ValueError("chain unavailable")
+
+    errors = []
+
+    def caller():
+        try:
+            flight.do('TSLA', failing_scan)
+        except ValueError as e:
+            errors.append(str(e))
+
+    threads = [threading.Thread(target=caller) for _ in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == ["chain unavailable"] * 5
+
+def test_async_callers_share_one_task():
+    """Coroutines for the same key await one task; other keys run separately"""
+    flight = AsyncSingleFlight()
+    calls = []
+
+    async def scan(ticker):
+        calls.append(ticker)
+        await asyncio.sleep(0.1)
+        return ticker.lower()
+
+    async def main():
+        return await asyncio.gather(
+            *(flight.do('SPY', scan, 'SPY') for _ in range(5)),
+            flight.do('QQQ', scan, 'QQQ')
+        )
+
+    results = asyncio.run(main())
+    print(f"Results: {results}, scans: {calls}")
+    assert sorted(calls) == ['QQQ', 'SPY']
+    assert results == ['spy'] * 5 + ['qqq']
+    assert flight.in_flight() == []
+
+def test_async_cancelled_caller_does_not_cancel_scan():
+    """Cancelling one waiting caller leaves the shared scan running"""
+    flight = AsyncSingleFlight()
+
+    async def scan():
+        await asyncio.sleep(0.1)
+        return 'done'
+
+    async def main():
+        first = asyncio.ensure_future(flight.do('AAPL', scan))
+        second = asyncio.ensure_future(flight.do('AAPL', scan))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(main()) == 'done'
+
+if __name__ == "__main__":
+    test_concurrent_threads_share_one_call()
+    test_errors_reach_every_waiter()
+    test_async_callers_share_one_task()
+    test_async_cancelled_caller_does_not_cancel_scan()
@@ -0,0 +1,114 @@
+"""
+Test stale-while-revalidate serving of unusual activity results
+"""
+import asyncio
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+import cache_module
+import polygon_integration
+
+RESULT = {'unusual_options': [{'contract': 'TEST 100.0 CALL', 'sentiment': 'bullish'}],
+          'total_bullish_count': 1, 'total_bearish_count': 0}
+
+def with_expired_entry(test, age, expired_for):
+    """Run test with a TEST entry `age` seconds old that expired `expired_for` seconds ago"""
+    original = cache_module.CACHE_BACKEND, cache_module.CACHE_DB, cache_module.CACHE_FILE
+    original_scan = polygon_integration.scan_unusual_options_activity
+    with tempfile.TemporaryDirectory() as directory:
+        cache_module.CACHE_BACKEND = 'sqlite'
+        cache_module.CACHE_DB = os.path.join(directory, 'cache.db')
+        cache_module.CACHE_FILE = os.path.join(directory, 'cache.pickle')
+        cache_module.get_backend().set('TEST', {
+            'timestamp': datetime.now() - timedelta(seconds=age),
+            'valid_until': time.time() - expired_for,
+            'data': RESULT,
+        })
+        try:
+            test()
+        finally:
+            polygon_integration.scan_unusual_options_activity = original_scan
+            cache_module.CACHE_BACKEND, cache_module.CACHE_DB, cache_module.CACHE_FILE = original
+
+def test_lookup_states():
+    """Entries are fresh, stale within the grace window, and a miss after it"""
+    def run():
+        data, state, age = cache_module.lookup_cache('TEST')
+        assert (data, state) == (RESULT, 'stale')
+        assert 300 <= age < 320
+        assert cache_module.get_from_cache('TEST') == (None, False)
+        assert cache_module.get_from_cache('TEST', allow_stale=True) == (RESULT, True)
+        assert cache_module.lookup_cache('OTHER') == (None, 'miss', None)
+    with_expired_entry(run, age=310, expired_for=10)
+
+    def run_too_old():
+        assert cache_module.lookup_cache('TEST')[1] == 'miss'
+    with_expired_entry(run_too_old, age=310, expired_for=cache_module.CACHE_STALE_GRACE + 1)
+    # Carried over from the previous session: never served stale after the open
+    with_expired_entry(run_too_old, age=17 * 3600, expired_for=10)
+
+def test_stale_result_is_served_while_refreshing():
+    """Callers get the stale result at once and a single background scan replaces it"""
+    def run():
+        scans = []
+        release = threading.Event()
+
+        def slow_scan(ticker, use_cache=True):
+            scans.append(ticker)
+            release.wait(5)
+            fresh = dict(RESULT, total_bullish_count=2)
+            cache_module.add_to_cache(ticker, fresh)
+            return fresh
+
+        polygon_integration.scan_unusual_options_activity = slow_scan
+        start = time.perf_counter()
+        results = [polygon_integration.get_unusual_options_activity('test') for _ in range(3)]
+        elapsed = time.perf_counter() - start
+        print(f"3 stale reads in {elapsed * 1000:.1f} ms")
+        assert elapsed < 1
+        assert all(r['stale'] and r['age_seconds'] >= 300 for r in results)
+        assert 'refreshing now' in polygon_integration.format_unusual_activity_summary('TEST', results[0])
+
+        release.set()
+        deadline = time.time() + 5
+        while 'TEST' in polygon_integration._refreshing and time.time() < deadline:
+            time.sleep(0.01)
+        assert scans == ['TEST']
+        fresh = polygon_integration.get_unusual_options_activity('TEST')
+        assert fresh['total_bullish_count'] == 2
+        assert 'stale' not in fresh
+    with_expired_entry(run, age=310, expired_for=10)
+
+def test_async_stale_result_is_served_while_refreshing():
+    """The async entry point refreshes on a background task of the same loop"""
+    def run():
+        async def fast_scan(ticker, high_performance=None, use_cache=True):
+            fresh = dict(RESULT, total_bullish_count=3)
+            cache_module.add_to_cache(ticker, fresh)
+            return fresh
+
+        original_async_scan = polygon_integration.scan_unusual_options_activity_async
+        polygon_integration.scan_unusual_options_activity_async = fast_scan
+
+        async def scenario():
+            stale = await polygon_integration.get_unusual_options_activity_async('TEST')
+            assert stale['stale']
+            while polygon_integration._background_refreshes:
+                await asyncio.sleep(0.01)
+            return await polygon_integration.get_unusual_options_activity_async('TEST')
+
+        try:
+            fresh = asyncio.run(scenario())
+        finally:
+            polygon_integration.scan_unusual_options_activity_async = original_async_scan
+        assert fresh['total_bullish_count'] == 3
+        assert not polygon_integration._refreshing
+    with_expired_entry(run, age=310, expired_for=10)
+
+if __name__ == "__main__":
+    test_lookup_states()
+    test_stale_result_is_served_while_refreshing()
+    test_async_stale_result_is_served_while_refreshing()
@@ -0,0 +1,111 @@
+"""
+Test ticker validation: in-memory ticker set, negative cache and batched writes
+Runs offline: Yahoo Finance is replaced by a recorder for the unknown-word cases
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import pandas as pd
+
+import utils_file
+
+class FakeYahoo:
+    """Stands in for the yfinance module and records every lookup"""
+
+    def __init__(self, listed):
+        self.listed = set(listed)
+        self.lookups = []
+
+    def Ticker(self, symbol):
+        fake = self
+
+        class Ticker:
+            def history(self, period):
+                fake.lookups.append(symbol)
+                return pd.DataFrame({'Close': [1.0]}) if symbol in fake.listed else pd.DataFrame()
+        return Ticker()
+
+def with_ticker_files(test, listed=()):
+    original_files = utils_file.POLYGON_TICKERS_FILE, utils_file.VALID_TICKERS_FILE
+    original_yf, original_validated = utils_file.yf, set(utils_file.VALIDATED_TICKERS)
+    with tempfile.TemporaryDirectory() as directory:
+        utils_file.POLYGON_TICKERS_FILE = os.path.join(directory, 'polygon_tickers.json')
+        utils_file.VALID_TICKERS_FILE = os.path.join(directory, 'valid_tickers.json')
+        with open(utils_file.POLYGON_TICKERS_FILE, 'w') as f:
+            json.dump(['ZZZA', 'ZZZB'], f)
+        with open(utils_file.VALID_TICKERS_FILE, 'w') as f:
+            json.dump(['ZZZC'], f)
+        utils_file.yf = FakeYahoo(listed)
+        utils_file.reload_ticker_universe()
+        utils_file.invalid_ticker_cache.clear()
+        try:
+            test(directory)
+        finally:
+            utils_file.flush_valid_tickers()
+            utils_file.POLYGON_TICKERS_FILE, utils_file.VALID_TICKERS_FILE = original_files
+            utils_file.yf = original_yf
+            utils_file.VALIDATED_TICKERS.clear()
+            utils_file.VALIDATED_TICKERS.update(original_validated)
+            utils_file.invalid_ticker_cache.clear()
+            utils_file.reload_ticker_universe()
+
+def test_known_words_never_touch_disk_or_network():
+    """Tickers from the files and common words are answered from memory"""
+    def run(directory):
+        os.remove(utils_file.POLYGON_TICKERS_FILE)
+        os.remove(utils_file.VALID_TICKERS_FILE)
+        assert utils_file.is_valid_ticker('zzza')
+        assert utils_file.is_valid_ticker('$ZZZC')
+        assert utils_file.is_valid_ticker('SPY')
+        assert not utils_file.is_valid_ticker('THE')
+        assert utils_file.yf.lookups == []
+    with_ticker_files(run)
+
+def test_rejected_words_are_cached():
+    """An unknown word is looked up once, then rejected from the negative cache"""
+    def run(directory):
+        for _ in range(3):
+            assert not utils_file.is_valid_ticker('QWRTY')
+        assert utils_file.yf.lookups == ['QWRTY']
+
+        # Once the entry expires the word is checked again
+        utils_file.invalid_ticker_cache.pop('QWRTY')
+        assert not utils_file.is_valid_ticker('QWRTY')
+        assert utils_file.yf.lookups == ['QWRTY', 'QWRTY']
+    with_ticker_files(run)
+
+def test_new_tickers_are_written_in_one_batch():
+    """Yahoo validations are valid at once and saved together in a single write"""
+    def run(directory):
+        for ticker in ('ZZZD', 'ZZZE'):
+            assert utils_file.is_valid_ticker(ticker)
+        assert utils_file.is_valid_ticker('ZZZD')
+        assert utils_file.yf.lookups == ['ZZZD', 'ZZZE']
+        with open(utils_file.VALID_TICKERS_FILE) as f:
+            assert json.load(f) == ['ZZZC']
+
+        assert utils_file.flush_valid_tickers() == 2
+        with open(utils_file.VALID_TICKERS_FILE) as f:
+            assert json.load(f) == ['ZZZC', 'ZZZD', 'ZZZE']
+        assert sorted(os.listdir(directory)) == ['polygon_tickers.json', 'valid_tickers.json']
+        assert utils_file.flush_valid_tickers() == 0
+    with_ticker_files(run, listed={'ZZZD', 'ZZZE'})
+
+def test_import_leaves_the_cache_backend_alone():
+    """Importing the validator doesn't load cache_module (and so never opens its database)"""
+    with tempfile.TemporaryDirectory() as directory:
+        check = "import sys, utils_file; print('cache_module' in sys.modules)"
+        env = dict(os.environ, PYTHONPATH=os.path.dirname(os.path.abspath(utils_file.__file__)))
+        output = subprocess.run([sys.executable, '-c', check], cwd=directory, env=env,
+                                capture_output=True, text=True, timeout=120).stdout
+        assert output.strip().splitlines()[-1] == 'False'
+        assert not any(name.startswith('option_wizard_cache') for name in os.listdir(directory))
+
+if __name__ == "__main__":
+    test_known_words_never_touch_disk_or_network()
+    test_rejected_words_are_cached()
+    test_new_tickers_are_written_in_one_batch()
+    test_import_leaves_the_cache_backend_alone()
@@ -0,0 +1,56 @@
+"""
+Test the NYSE trading calendar and calendar-based cache validity
+"""
+from datetime import date, datetime
+
+import cache_module
+import trading_calendar
+from trading_calendar import EASTERN, nyse
+
+def et(year, month, day, hour=12, minute=0):
+    return EASTERN.localize(datetime(year, month, day, hour, minute))
+
+def test_holidays_and_early_closes():
+    """Rule-based holidays match the published NYSE schedule"""
+    assert trading_calendar.nyse_holidays(2025) == {
+        date(2025, 1, 1), date(2025, 1, 9), date(2025, 1, 20), date(2025, 2, 17), date(2025, 4, 18),
+        date(2025, 5, 26), date(2025, 6, 19), date(2025, 7, 4), date(2025, 9, 1), date(2025, 11, 27),
+        date(2025, 12, 25)}
+    assert trading_calendar.nyse_early_closes(2025) == {date(2025, 7, 3), date(2025, 11, 28), date(2025, 12, 24)}
+    # Independence Day on a Saturday: observed Friday, no early close on Thursday
+    assert date(2026, 7, 3) in trading_calendar.nyse_holidays(2026)
+    assert trading_calendar.nyse_early_closes(2026) == {date(2026, 11, 27), date(2026, 12, 24)}
+    # New Year's Day on a Saturday is not observed on the Friday before
+    assert date(2021, 12, 31) not in trading_calendar.nyse_holidays(2021)
+
+def test_sessions():
+    """is_open and next_open honor holidays, half-days and the 15-minute grace"""
+    assert nyse.is_open(et(2025, 6, 4, 16, 10))
+    assert not nyse.is_open(et(2025, 6, 4, 16, 20))
+    assert not nyse.is_open(et(2025, 12, 25, 11, 0))
+    assert nyse.is_open(et(2025, 11, 28, 13, 10))
+    assert not nyse.is_open(et(2025, 11, 28, 13, 20))
+
+    assert nyse.next_open(et(2025, 6, 4, 8, 0)) == et(2025, 6, 4, 9, 30)
+    assert nyse.next_open(et(2025, 6, 6, 17, 0)) == et(2025, 6, 9, 9, 30)
+    assert nyse.next_open(et(2025, 12, 24, 14, 0)) == et(2025, 12, 26, 9, 30)
+    assert nyse.next_open(et(2025, 4, 17, 17, 0)) == et(2025, 4, 21, 9, 30)
+
+def test_cache_valid_until():
+    """Entries expire after 5 minutes in a session, at the session end, or at the next open"""
+    during = et(2025, 6, 4, 10, 30)
+    assert cache_module.cache_valid_until(during) == during.timestamp() + cache_module.MARKET_HOURS_TTL
+
+    near_half_day_close = et(2025, 11, 28, 13, 12)
+    assert cache_module.cache_valid_until(near_half_day_close) == et(2025, 11, 28, 13, 15).timestamp()
+
+    friday_evening = et(2025, 6, 6, 16, 30)
+    assert cache_module.cache_valid_until(friday_evening) == et(2025, 6, 9, 9, 30).timestamp()
+
+    before_holiday = et(2025, 7, 3, 14, 0)
+    assert cache_module.cache_valid_until(before_holiday) == et(2025, 7, 7, 9, 30).timestamp()
+
+if __name__ == "__main__":
+    test_holidays_and_early_closes()
+    test_sessions()
+    test_cache_valid_until()
@@ -0,0 +1,142 @@
+"""
+Test implied volatility surfaces and their cache
+"""
+import time
+from collections import namedtuple
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+import option_calculator
+import option_pricing
+import scenario_grid
+import volatility_surface
+
+SPOT = 100.0
+TODAY = date.today()
+
+def true_vol(strike, days):
+    """A smile that steepens towards the wings and a rising term structure"""
+    return 0.2 + 0.4 * np.log(strike / SPOT) ** 2 + 0.05 * np.sqrt(days / 365.0)
+
+FakeChain = namedtuple('FakeChain', 'calls puts')
+
+class FakeStock:
+    """A yfinance Ticker with three expirations that counts chain downloads"""
+
+    ticker = 'SURF'
+    info = {'currentPrice': SPOT}
+
+    def __init__(self, days=(30, 90, 180)):
+        self.days = days
+        self.options = tuple((TODAY + timedelta(days=d)).isoformat() for d in days)
+        self.downloads = 0
+
+    def history(self, period):
+        return pd.DataFrame({'Close': [SPOT]})
+
+    def option_chain(self, expiration):
+        self.downloads += 1
+        days = (date.fromisoformat(expiration) - TODAY).days
+        strikes = np.arange(60.0, 141.0, 5.0)
+        vols = true_vol(strikes, days)
+
+        def side(option_type, placeholder):
+            prices = option_pricing.black_scholes_price(SPOT, strikes, days / 365.0, vols, option_type=option_type)
+            quoted = vols.copy()
+            quoted[placeholder] = 1e-5  # Yahoo placeholder, to be solved from the price
+            return pd.DataFrame({'strike': strikes, 'lastPrice': prices, 'impliedVolatility': quoted})
+        return FakeChain(side('call', strikes == 125.0), side('put', strikes == 75.0))
+
+def test_surface_interpolates_smile_and_term():
+    """Quoted points come back exactly; in-between points are interpolated smoothly"""
+    stock = FakeStock()
+    surface = volatility_surface.build_surface(stock, today=TODAY)
+    assert list(surface.days) == [30, 90, 180]
+
+    # On the quoted strikes and expirations, including the solved placeholders
+    for days in (30, 90, 180):
+        for strike in (60.0, 75.0, 100.0, 125.0, 140.0):
+            assert abs(surface.vol(strike, days) - true_vol(strike, days)) < 1e-8
+
+    # Between strikes and between expirations
+    assert abs(surface.vol(102.5, 60) - true_vol(102.5, 60)) < 5e-3
+    # Beyond the listed range the vol is flat
+    assert surface.vol(100.0, 7) == surface.vol(100.0, 30)
+    assert surface.vol(100.0, 400) == surface.vol(100.0, 180)
+    assert surface.vol(20.0, 30) == surface.vol(60.0, 30)
+
+    table = surface.to_frame([90.0, 100.0, 110.0])
+    assert table.shape == (3, 3)
+    assert table.loc[100.0, 90] == surface.vol(100.0, 90)
+
+def test_lookups_are_array_interpolation():
+    """The surface is downloaded once and answers many lookups in one vectorized call"""
+    stock = FakeStock()
+    option_calculator.clear_chain_caches()
+    try:
+        surface = option_calculator.get_volatility_surface(stock)
+        assert option_calculator.get_volatility_surface(stock) is surface
+        assert stock.downloads == 3
+
+        rng = np.random.default_rng(0)
+        strikes, days = rng.uniform(50, 150, 100000), rng.uniform(1, 365, 100000)
+        start = time.perf_counter()
+        vols = surface.vol(strikes, days)
+        elapsed = time.perf_counter() - start
+        print(f"100,000 lookups in {elapsed * 1000:.1f} ms")
+        assert vols.shape == (100000,) and np.isfinite(vols).all()
+        assert elapsed < 0.5
+    finally:
+        option_calculator.clear_chain_caches()
+
+def test_greeks_and_surface_share_downloaded_chains():
+    """The Greeks tables and the surface are built from one download per expiration"""
+    stock = FakeStock()
+    option_calculator.clear_chain_caches()
+    try:
+        for expiration in stock.options:
+            option_calculator.get_chain_greeks(stock, expiration, 'call')
+            option_calculator.get_chain_greeks(stock, expiration, 'put')
+        assert stock.downloads == 3
+        surface = option_calculator.get_volatility_surface(stock)
+        assert stock.downloads == 3
+        assert list(surface.days) == [30, 90, 180]
+    finally:
+        option_calculator.clear_chain_caches()
+
+def test_stop_loss_only_uses_a_cached_surface():
+    """A stop-loss lookup never builds a surface; it reads one that is already cached"""
+    option_calculator.clear_chain_caches()
+    try:
+        assert option_calculator.get_cached_volatility_surface('surf') is None
+        assert len(option_calculator.yahoo_chain_cache) == 0
+
+        stock = FakeStock()
+        surface = option_calculator.get_volatility_surface(stock)
+        assert option_calculator.get_cached_volatility_surface('surf') is surface
+        assert stock.downloads == 3
+    finally:
+        option_calculator.clear_chain_caches()
+
+def test_scenario_grid_follows_term_structure():
+    """With a surface the vol rolls down the term structure, anchored to today's vol"""
+    surface = volatility_surface.build_surface(FakeStock(), today=TODAY)
+    grid = scenario_grid.build_scenario_grid(SPOT, 100.0, 180, 0.25, 'call', days=[0, 90],
+                                             vol_shocks=[0.0], prices=[SPOT], surface=surface)
+    flat = scenario_grid.build_scenario_grid(SPOT, 100.0, 180, 0.25, 'call', days=[0, 90],
+                                             vol_shocks=[0.0], prices=[SPOT])
+    assert grid['values'][0, 0, 0] == flat['values'][0, 0, 0]
+    # 90 days on, the shorter expiration has a lower vol on this surface
+    rolled_vol = 0.25 + surface.vol(100.0, 90) - surface.vol(100.0, 180)
+    expected = option_pricing.black_scholes_price(SPOT, 100.0, 90 / 365.0, rolled_vol, option_type='call')
+    assert abs(grid['values'][0, 1, 0] - expected) < 1e-12
+    assert grid['values'][0, 1, 0] < flat['values'][0, 1, 0]
+
+if __name__ == "__main__":
+    test_surface_interpolates_smile_and_term()
+    test_lookups_are_array_interpolation()
+    test_greeks_and_surface_share_downloaded_chains()
+    test_stop_loss_only_uses_a_cached_surface()
+    test_scenario_grid_follows_term_structure()
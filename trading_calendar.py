@@ -0,0 +1,274 @@
+"""
+NYSE trading calendar for OptionsWizard
+
+Regular sessions run 9:30am-4:00pm ET, with 1:00pm early closes on the day
+after Thanksgiving, Christmas Eve and the day before Independence Day.
+Exchange holidays are derived from the NYSE rules, so any year can be built.
+
+Session open/close instants are precomputed (as epoch seconds) for a window
+of dates around today, together with per-date indexes, so "is open" and
+"next open" are constant-time lookups. The window is
+rebuilt automatically when a date outside it is requested.
+
+The bot treats the 15 minutes after the close as part of the session (late
+prints and the closing cross), so session ends used for caching include
+CLOSE_GRACE.
+"""
+import threading
+from collections import namedtuple
+from datetime import date, datetime, time, timedelta
+
+import pytz
+
+EASTERN = pytz.timezone('US/Eastern')
+
+REGULAR_OPEN = time(9, 30)
+REGULAR_CLOSE = time(16, 0)
+EARLY_CLOSE = time(13, 0)
+CLOSE_GRACE = timedelta(minutes=15)
+
+# Days before today and after today covered by a freshly built calendar
+LOOKBACK_DAYS = 30
+LOOKAHEAD_DAYS = 400
+
+# Unscheduled closures (national days of mourning) that no rule can derive
+SPECIAL_CLOSURES = {
+    date(2018, 12, 5),   # President George H.W. Bush
+    date(2025, 1, 9),    # President Jimmy Carter
+}
+
+
+def _easter(year):
+    """Gregorian Easter Sunday (anonymous Gregorian algorithm)"""
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+
+def _nth_weekday(year, month, weekday, n):
+    """The n-th `weekday` (0 = Monday) of a month; n = -1 for the last one"""
+    if n > 0:
+        first = date(year, month, 1)
+        return first + timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+    last = date(year, month + 1, 1) - timedelta(days=1) if month < 12 else date(year, 12, 31)
+    return last - timedelta(days=(last.weekday() - weekday) % 7)
+
+
+def _observed(holiday):
+    """Saturday holidays are observed on Friday, Sunday holidays on Monday"""
+    if holiday.weekday() == 5:
+        return holiday - timedelta(days=1)
+    if holiday.weekday() == 6:
+        return holiday + timedelta(days=1)
+    return holiday
+
+
+def nyse_holidays(year):
+    """
+    Full-day NYSE holidays for a year
+
+    Args:
+        year: Calendar year
+
+    Returns:
+        Set of dates the exchange is closed (weekdays only)
+    """
+    holidays = {
+        _nth_weekday(year, 1, 0, 3),            # Martin Luther King Jr. Day
+        _nth_weekday(year, 2, 0, 3),            # Washington's Birthday
+        _easter(year) - timedelta(days=2),      # Good Friday
+        _nth_weekday(year, 5, 0, -1),           # Memorial Day
+        _observed(date(year, 7, 4)),            # Independence Day
+        _nth_weekday(year, 9, 0, 1),            # Labor Day
+        _nth_weekday(year, 11, 3, 4),           # Thanksgiving
+        _observed(date(year, 12, 25)),          # Christmas
+    }
+    # New Year's Day on a Saturday is not observed on the Friday before
+    new_year = date(year, 1, 1)
+    if new_year.weekday() != 5:
+        holidays.add(_observed(new_year))
+    if year >= 2022:
+        holidays.add(_observed(date(year, 6, 19)))  # Juneteenth
+    holidays.update(d for d in SPECIAL_CLOSURES if d.year == year)
+    return {d for d in holidays if d.weekday() < 5}
+
+
+def nyse_early_closes(year):
+    """
+    1:00pm early closes for a year
+
+    Args:
+        year: Calendar year
+
+    Returns:
+        Set of dates with an early close
+    """
+    early = {_nth_weekday(year, 11, 3, 4) + timedelta(days=1)}  # Day after Thanksgiving
+    for day in (date(year, 7, 3), date(year, 12, 24)):
+        # Only when it falls Monday-Thursday (on a Friday it is the observed holiday)
+        if day.weekday() < 4:
+            early.add(day)
+    return early - nyse_holidays(year)
+
+
+class _Window(namedtuple('_Window', 'start end sessions session_index next_index')):
+    """
+    Immutable precomputed sessions for a range of dates
+
+    sessions: list of (date, open_ts, close_ts)
+    session_index: date -> index into sessions
+    next_index: date -> index of the first session on or after it (None past the last)
+    """
+
+    @classmethod
+    def build(cls, start, end):
+        holidays, early = set(), set()
+        for year in range(start.year, end.year + 1):
+            holidays |= nyse_holidays(year)
+            early |= nyse_early_closes(year)
+
+        dates = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+        sessions, session_index, next_index = [], {}, {}
+        for day in dates:
+            if day.weekday() < 5 and day not in holidays:
+                close = EARLY_CLOSE if day in early else REGULAR_CLOSE
+                session_index[day] = len(sessions)
+                sessions.append((day,
+                                 EASTERN.localize(datetime.combine(day, REGULAR_OPEN)).timestamp(),
+                                 EASTERN.localize(datetime.combine(day, close)).timestamp()))
+
+        upcoming = None
+        for day in reversed(dates):
+            upcoming = session_index.get(day, upcoming)
+            next_index[day] = upcoming
+        return cls(start, end, sessions, session_index, next_index)
+
+    def covers(self, *days):
+        return all(self.start <= d <= self.end for d in days)
+
+
+class TradingCalendar:
+    """
+    Precomputed NYSE sessions with constant-time lookups
+
+    Args:
+        start: First date covered (defaults to LOOKBACK_DAYS before today)
+        end: Last date covered (defaults to LOOKAHEAD_DAYS after today)
+    """
+
+    def __init__(self, start=None, end=None):
+        self._lock = threading.Lock()
+        today = datetime.now(EASTERN).date()
+        self._window = _Window.build(start or today - timedelta(days=LOOKBACK_DAYS),
+                                     end or today + timedelta(days=LOOKAHEAD_DAYS))
+
+    def _covering(self, *days):
+        """The precomputed window, rebuilt first if any of `days` falls outside it"""
+        window = self._window
+        if window.covers(*days):
+            return window
+        with self._lock:
+            window = self._window
+            if not window.covers(*days):
+                window = _Window.build(min(window.start, min(days) - timedelta(days=LOOKBACK_DAYS)),
+                                       max(window.end, max(days) + timedelta(days=LOOKAHEAD_DAYS)))
+                self._window = window
+            return window
+
+    @staticmethod
+    def _to_eastern(when):
+        return datetime.now(EASTERN) if when is None else when.astimezone(EASTERN)
+
+    def is_trading_day(self, day):
+        """True if `day` has a regular or early-close session"""
+        return day in self._covering(day).session_index
+
+    def session(self, day):
+        """
+        Get a day's session
+
+        Args:
+            day: date
+
+        Returns:
+            Tuple of (open, close) aware datetimes in US/Eastern, or None
+        """
+        window = self._covering(day)
+        index = window.session_index.get(day)
+        if index is None:
+            return None
+        _, open_ts, close_ts = window.sessions[index]
+        return (datetime.fromtimestamp(open_ts, EASTERN), datetime.fromtimestamp(close_ts, EASTERN))
+
+    def is_open(self, when=None, grace=CLOSE_GRACE):
+        """
+        Check if the market is open
+
+        Args:
+            when: Aware or naive (local) datetime, defaults to now
+            grace: Time after the close still counted as open
+
+        Returns:
+            bool
+        """
+        return self.session_end_ts(when, grace) is not None
+
+    def session_end_ts(self, when=None, grace=CLOSE_GRACE):
+        """
+        Epoch seconds at which the session in progress at `when` ends (close plus grace)
+
+        Returns:
+            float, or None if no session is in progress
+        """
+        now = self._to_eastern(when)
+        window = self._covering(now.date())
+        index = window.session_index.get(now.date())
+        if index is None:
+            return None
+        _, open_ts, close_ts = window.sessions[index]
+        end = close_ts + grace.total_seconds()
+        return end if open_ts <= now.timestamp() <= end else None
+
+    def next_open_ts(self, when=None):
+        """Epoch seconds of the first session open strictly after `when`"""
+        now = self._to_eastern(when)
+        ts = now.timestamp()
+        horizon = now.date()
+        while True:
+            window = self._covering(horizon)
+            index = window.next_index[now.date()] if window.covers(now.date()) else None
+            if index is not None and window.sessions[index][1] <= ts:
+                index = index + 1 if index + 1 < len(window.sessions) else None
+            if index is not None:
+                return window.sessions[index][1]
+            # No session left in the window: extend it
+            horizon = window.end + timedelta(days=1)
+
+    def next_open(self, when=None):
+        """
+        Get the first session open after `when`
+
+        Returns:
+            Aware datetime in US/Eastern
+        """
+        return datetime.fromtimestamp(self.next_open_ts(when), EASTERN)
+
+nyse = TradingCalendar()
+
+
+def is_market_open(when=None):
+    """True during a session, including the CLOSE_GRACE after the close"""
+    return nyse.is_open(when)
+
+
+def next_market_open(when=None):
+    """Next session open as an aware US/Eastern datetime"""
+    return nyse.next_open(when)
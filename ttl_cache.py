@@ -0,0 +1,132 @@
+"""
+Bounded in-memory TTL cache
+
+Kept free of other project imports so light modules (ticker validation,
+the option calculator) can cache without initializing cache_module's
+persistent backend.
+"""
+from collections import OrderedDict
+from datetime import datetime
+import threading
+
+class TTLCache:
+    """
+    Thread-safe LRU cache whose entries each carry their own expiry time
+    
+    When the cache holds maxsize entries (or more than max_bytes), adding one
+    evicts the least recently used. Expired entries are dropped when they are
+    looked up.
+    
+    Args:
+        maxsize: Maximum number of entries
+        default_ttl: Lifetime in seconds used when set() isn't given one
+        clock: Function returning the current time in epoch seconds (for tests)
+        max_bytes: Optional limit on the total size of the values
+        sizeof: Function measuring a value in bytes (required with max_bytes)
+    """
+    
+    def __init__(self, maxsize, default_ttl=None, clock=None, max_bytes=None, sizeof=None):
+        self.maxsize = maxsize
+        self.default_ttl = default_ttl
+        self.max_bytes = max_bytes
+        self._sizeof = sizeof
+        self._clock = clock or (lambda: datetime.now().timestamp())
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+    
+    def get(self, key):
+        """
+        Look up a key, counting a hit or a miss
+        
+        Returns:
+            Tuple of (value, found)
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] is not None and entry[0] <= self._clock():
+                del self._entries[key]
+                self._bytes -= entry[2]
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None, False
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1], True
+    
+    def set(self, key, value, ttl=None, expires_at=None):
+        """
+        Store a value
+        
+        Args:
+            key: Cache key
+            value: Value to store
+            ttl: Lifetime in seconds (defaults to default_ttl)
+            expires_at: Absolute expiry in epoch seconds, instead of ttl
+        """
+        if expires_at is None:
+            ttl = self.default_ttl if ttl is None else ttl
+            expires_at = self._clock() + ttl if ttl is not None else None
+        size = self._sizeof(value) if self._sizeof else 0
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[2]
+            self._entries[key] = (expires_at, value, size)
+            self._bytes += size
+            # The entry just written is kept even if it alone exceeds max_bytes
+            while len(self._entries) > 1 and (len(self._entries) > self.maxsize
+                                               or (self.max_bytes is not None and self._bytes > self.max_bytes)):
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted[2]
+                self.evictions += 1
+    
+    def pop(self, key):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return None
+            self._bytes -= entry[2]
+            return entry[1]
+    
+    def clear(self):
+        """Drop every entry (the counters are kept)"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+    
+    def __len__(self):
+        return len(self._entries)
+    
+    def __contains__(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and (entry[0] is None or entry[0] > self._clock())
+    
+    def stats(self):
+        """
+        Get the cache counters
+        
+        Returns:
+            Dictionary with size, maxsize, bytes, max_bytes, hits, misses, hit_rate,
+            evictions and expirations
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations
+            }
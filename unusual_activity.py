@@ -135,8 +135,7 @@ def get_simplified_unusual_activity_summary(ticker, high_performance=False):
     if os.getenv('POLYGON_API_KEY'):
         try:
             # If high performance mode is requested or ticker is a high-volume one, use optimizations
-            high_volume_tickers = {'AAPL', 'MSFT', 'TSLA', 'SPY', 'QQQ', 'NVDA', 'AMZN', 'GOOGL', 'META', 'AMD'}
-            if high_performance or ticker.upper() in high_volume_tickers:
+            if high_performance or ticker.upper() in polygon.HIGH_VOLUME_TICKERS:
                 print(f"Using high-performance mode for {ticker}")
                 # Let polygon integration know this is a high-performance request
                 os.environ['HIGH_PERFORMANCE_MODE'] = 'true'
@@ -157,6 +156,35 @@ def get_simplified_unusual_activity_summary(ticker, high_performance=False):
     else:
         return f"📊 Polygon.io API key is not available. Please provide a valid API key to view unusual options activity."
 
+async def get_simplified_unusual_activity_summary_async(ticker, high_performance=False):
+    """
+    Async version of get_simplified_unusual_activity_summary for the Discord bot.
+    
+    The high-performance flag is passed through explicitly instead of via the
+    HIGH_PERFORMANCE_MODE environment variable, since many requests can be
+    in flight on the same event loop at once.
+    
+    Args:
+        ticker: Stock ticker symbol
+        high_performance: If True, use optimizations for large option chains
+    
+    Returns:
+        A string with a conversational summary of unusual options activity
+    """
+    if not os.getenv('POLYGON_API_KEY'):
+        return f"📊 Polygon.io API key is not available. Please provide a valid API key to view unusual options activity."
+    
+    try:
+        use_high_performance = high_performance or ticker.upper() in polygon.HIGH_VOLUME_TICKERS
+        
+        polygon_summary = await polygon.get_simplified_unusual_activity_summary_async(ticker, high_performance=use_high_performance)
+        if polygon_summary and len(polygon_summary) > 20:  # Check for a valid response
+            return polygon_summary
+        return f"📊 No significant unusual options activity detected for {ticker} in Polygon.io data.\n\nThis could indicate normal trading patterns or low options volume."
+    except Exception as e:
+        print(f"Error with Polygon unusual activity summary: {str(e)}")
+        return f"📊 Unable to retrieve unusual options activity for {ticker} from Polygon.io.\n\nError: {str(e)}"
+
 def detect_unusual_options_flow(option_symbols):
     """
     This function is kept for backward compatibility with any code that might call it,
@@ -1,9 +1,13 @@
 import re
 import os
 import json
+import atexit
+import tempfile
+import threading
 import yfinance as yf
 import pandas as pd
 from datetime import datetime, timedelta
+from ttl_cache import TTLCache
 
 # List of common market indices and popular stocks to pre-validate
 COMMON_INDICES = [
@@ -85,6 +89,31 @@ COMMON_WORDS = [
     # Polite conversation words
     'PLEASE', 'THANKS', 'THANK', 'SORRY', 'EXCUSE', 'HELLO', 'HI', 'BYE', 'GOODBYE', 'WELCOME'
 ]
+COMMON_WORD_SET = frozenset(COMMON_WORDS)
+
+# 1-5 letters, checked after upper-casing and removing a leading $
+TICKER_FORMAT = re.compile(r'^[A-Z]{1,5}$')
+
+# Ticker lists on disk: the monthly Polygon snapshot and tickers validated with Yahoo.
+# Both are read once into an immutable set (see get_ticker_universe).
+POLYGON_TICKERS_FILE = 'polygon_tickers.json'
+VALID_TICKERS_FILE = 'valid_tickers.json'
+
+# Words that failed validation are not looked up again for this long
+INVALID_TICKER_TTL = float(os.getenv('INVALID_TICKER_TTL', str(6 * 3600)))
+INVALID_TICKER_CACHE_SIZE = 10000
+invalid_ticker_cache = TTLCache(INVALID_TICKER_CACHE_SIZE, default_ttl=INVALID_TICKER_TTL)
+
+# Newly validated tickers are added to VALID_TICKERS_FILE in one write per
+# batch, this many seconds after the first ticker of the batch
+VALID_TICKERS_FLUSH_DELAY = 5.0
+
+_ticker_universe = None
+_universe_lock = threading.Lock()
+_pending_tickers = set()
+_pending_lock = threading.Lock()
+_write_lock = threading.Lock()
+_flush_timer = None
 
 def format_ticker(ticker):
     """
@@ -182,8 +211,6 @@ def parse_relative_date(date_text):
     
     return None
 
-import polygon_integration as polygon
-
 def fetch_all_tickers():
     """
     Fetch a comprehensive list of all stock tickers from major exchanges.
@@ -236,6 +263,8 @@ def fetch_all_tickers():
     if refresh_day and os.getenv('POLYGON_API_KEY'):
         print("Today is the 5th: Using Polygon.io API to fetch comprehensive ticker list...")
         try:
+            # Imported on use: polygon_integration loads cache_module and its database
+            import polygon_integration as polygon
             polygon_tickers = polygon.fetch_all_tickers()
             if polygon_tickers and len(polygon_tickers) > 100:
                 print(f"Successfully fetched {len(polygon_tickers)} tickers from Polygon.io")
@@ -267,16 +296,108 @@ def fetch_all_tickers():
     print("All ticker sources failed, using minimal predefined list")
     return set(COMMON_INDICES)
 
-def is_valid_ticker(ticker):
+def _read_ticker_file(path):
+    """Read a JSON list of tickers, or an empty list if the file is missing or broken"""
+    try:
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                return json.load(f)
+    except Exception as e:
+        print(f"Error reading tickers from {path}: {str(e)}")
+    return []
+
+def get_ticker_universe():
     """
-    Check if a symbol is a valid stock ticker by checking against our cached list
-    or using Polygon.io API with Yahoo Finance as backup.
+    Get every known ticker: COMMON_INDICES plus both ticker files
+    
+    The files are read on first use only; call reload_ticker_universe to
+    pick up changes made by another process.
+    
+    Returns:
+        frozenset of ticker symbols
+    """
+    global _ticker_universe
+    universe = _ticker_universe
+    if universe is None:
+        with _universe_lock:
+            if _ticker_universe is None:
+                _ticker_universe = frozenset(COMMON_INDICES).union(
+                    _read_ticker_file(POLYGON_TICKERS_FILE), _read_ticker_file(VALID_TICKERS_FILE))
+                print(f"Loaded {len(_ticker_universe)} known tickers")
+            universe = _ticker_universe
+    return universe
+
+def reload_ticker_universe():
+    """Re-read the ticker files into a new set"""
+    global _ticker_universe
+    with _universe_lock:
+        _ticker_universe = None
+    return get_ticker_universe()
+
+def remember_valid_ticker(ticker):
+    """
+    Record a newly validated ticker
+    
+    It is valid in memory right away and is added to VALID_TICKERS_FILE by
+    the next batched write (see flush_valid_tickers).
+    """
+    global _flush_timer
+    VALIDATED_TICKERS.add(ticker)
+    invalid_ticker_cache.pop(ticker)
+    with _pending_lock:
+        _pending_tickers.add(ticker)
+        if _flush_timer is None:
+            _flush_timer = threading.Timer(VALID_TICKERS_FLUSH_DELAY, flush_valid_tickers)
+            _flush_timer.daemon = True
+            _flush_timer.start()
+
+def flush_valid_tickers():
+    """
+    Write pending validated tickers to VALID_TICKERS_FILE in one atomic save
+    
+    Returns:
+        Number of tickers added to the file
+    """
+    global _flush_timer
+    with _pending_lock:
+        pending = set(_pending_tickers)
+        _pending_tickers.clear()
+        _flush_timer = None
+    if not pending:
+        return 0
+    
+    with _write_lock:
+        current_tickers = _read_ticker_file(VALID_TICKERS_FILE)
+        new_tickers = sorted(pending.difference(current_tickers))
+        if not new_tickers:
+            return 0
+        directory = os.path.dirname(os.path.abspath(VALID_TICKERS_FILE))
+        fd, temp_path = tempfile.mkstemp(prefix='.valid_tickers.', suffix='.tmp', dir=directory)
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(current_tickers + new_tickers, f)
+            os.replace(temp_path, VALID_TICKERS_FILE)
+        except Exception as e:
+            print(f"Error saving Yahoo ticker validations: {str(e)}")
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            with _pending_lock:
+                _pending_tickers.update(pending)
+            return 0
+    print(f"Saved {len(new_tickers)} newly validated tickers to {VALID_TICKERS_FILE}")
+    return len(new_tickers)
+
+atexit.register(flush_valid_tickers)
+
+def check_known_ticker(ticker):
+    """
+    Answer a ticker check from memory only
     
     Args:
-        ticker: The symbol to check
+        ticker: The symbol to check (case-insensitive, optional leading $)
         
     Returns:
-        Boolean indicating if it's a valid ticker
+        True or False when memory decides, None when only a lookup can tell
     """
     if not ticker or not isinstance(ticker, str):
         return False
@@ -287,7 +408,7 @@ def is_valid_ticker(ticker):
         ticker = ticker[1:]
     
     # Basic format validation: 1-5 characters, all uppercase letters
-    if not re.match(r'^[A-Z]{1,5}$', ticker):
+    if not TICKER_FORMAT.match(ticker):
         return False
         
     # Quick check in cache to avoid API calls
@@ -295,28 +416,34 @@ def is_valid_ticker(ticker):
         return True
     
     # Quick check against common words
-    if ticker in COMMON_WORDS:
+    if ticker in COMMON_WORD_SET:
         return False
     
-    # Check cache files first - this is always allowed regardless of day
-    try:
-        # First check polygon tickers
-        if os.path.exists('polygon_tickers.json'):
-            with open('polygon_tickers.json', 'r') as f:
-                cached_tickers = json.load(f)
-                if ticker in cached_tickers:
-                    VALIDATED_TICKERS.add(ticker)
-                    return True
+    # Then the ticker files (loaded once) and recently rejected words
+    if ticker in get_ticker_universe():
+        return True
+    if ticker in invalid_ticker_cache:
+        return False
+    return None
+
+def is_valid_ticker(ticker):
+    """
+    Check if a symbol is a valid stock ticker by checking against our cached list
+    or using Polygon.io API with Yahoo Finance as backup.
+    
+    Known tickers, common words and recently rejected words are answered from
+    memory (see check_known_ticker); only unknown words reach the network.
+    
+    Args:
+        ticker: The symbol to check
         
-        # Then check valid tickers (from Yahoo)
-        if os.path.exists('valid_tickers.json'):
-            with open('valid_tickers.json', 'r') as f:
-                cached_tickers = json.load(f)
-                if ticker in cached_tickers:
-                    VALIDATED_TICKERS.add(ticker)
-                    return True
-    except Exception as e:
-        print(f"Error checking ticker against cache files: {str(e)}")
+    Returns:
+        Boolean indicating if it's a valid ticker
+    """
+    known = check_known_ticker(ticker)
+    if known is not None:
+        return known
+    ticker = ticker.upper().lstrip('$')
     
     # Check if today is the 5th of the month - ONLY use API validation on the 5th
     today = datetime.now()
@@ -326,6 +453,7 @@ def is_valid_ticker(ticker):
     if refresh_day and os.getenv('POLYGON_API_KEY'):
         try:
             print(f"Today is the 5th: Checking ticker {ticker} with Polygon API")
+            import polygon_integration as polygon
             if polygon.is_valid_ticker(ticker):
                 # It's a valid ticker - add to cache
                 VALIDATED_TICKERS.add(ticker)
@@ -343,23 +471,11 @@ def is_valid_ticker(ticker):
         hist = stock.history(period="1d")
         
         if not hist.empty:
-            # It's a valid ticker - add to cache 
-            VALIDATED_TICKERS.add(ticker)
             print(f"Yahoo validated and cached ticker: {ticker}")
-            
-            # Only save to valid_tickers.json - NEVER update polygon_tickers.json except on the 5th
-            try:
-                current_tickers = []
-                if os.path.exists('valid_tickers.json'):
-                    with open('valid_tickers.json', 'r') as f:
-                        current_tickers = json.load(f)
-                if ticker not in current_tickers:
-                    current_tickers.append(ticker)
-                    with open('valid_tickers.json', 'w') as f:
-                        json.dump(current_tickers, f)
-            except Exception as save_error:
-                print(f"Error saving Yahoo ticker validation: {str(save_error)}")
+            remember_valid_ticker(ticker)
             return True
+        # Not a ticker: don't ask again until INVALID_TICKER_TTL has passed
+        invalid_ticker_cache.set(ticker, True)
         return False
     except Exception as e:
         print(f"Error validating ticker {ticker} with Yahoo: {str(e)}")
@@ -0,0 +1,181 @@
+"""
+Implied volatility surfaces built from option chains
+
+A surface holds one smile per listed expiration, resampled as total
+variance (vol^2 * T) onto a shared log-moneyness grid made of every quoted
+strike. Looking up any strike
+and time to expiration is then plain array interpolation:
+- across strikes: linear in log-moneyness within each smile, flat beyond
+  the outermost quoted strikes
+- across expirations: linear in total variance between the two nearest
+  expirations, flat volatility before the first and after the last
+
+Smiles use out-of-the-money contracts only (puts below the spot, calls at
+or above it), which are the liquid side of each strike. Placeholder Yahoo
+vols are replaced by vols solved from the quotes (see option_pricing).
+"""
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import option_pricing
+
+# Expirations fetched when building a surface (nearest first)
+MAX_SURFACE_EXPIRATIONS = 8
+
+# Quoted strikes an expiration needs to contribute a smile
+MIN_SMILE_POINTS = 3
+
+
+class VolatilitySurface:
+    """
+    Implied volatility by strike and days to expiration for one ticker snapshot
+
+    Args:
+        spot: Underlying price the smiles were quoted against
+        days: Days to expiration of each smile
+        smiles: (strikes, vols) array pairs, one per expiration
+        ticker: Ticker symbol, for display
+
+    Raises:
+        ValueError: If no expiration has at least MIN_SMILE_POINTS usable vols
+    """
+
+    def __init__(self, spot, days, smiles, ticker=None):
+        self.ticker = ticker
+        self.spot = float(spot)
+
+        usable = []
+        for day, (strikes, vols) in zip(days, smiles):
+            strikes, vols = np.asarray(strikes, dtype=float), np.asarray(vols, dtype=float)
+            keep = np.isfinite(vols) & (vols > 0) & (strikes > 0)
+            if day > 0 and keep.sum() >= MIN_SMILE_POINTS:
+                order = np.argsort(strikes[keep])
+                usable.append((float(day), np.log(strikes[keep][order] / self.spot), vols[keep][order]))
+        if not usable:
+            raise ValueError("No expiration has enough implied volatilities for a surface")
+        usable.sort(key=lambda smile: smile[0])
+
+        self.days = np.array([smile[0] for smile in usable])
+        self.years = option_pricing.years_to_expiration(self.days)
+        self.moneyness = np.unique(np.concatenate([smile[1] for smile in usable]))
+        self.total_variance = np.array([np.interp(self.moneyness, moneyness, vols) ** 2 * years
+                                        for (_, moneyness, vols), years in zip(usable, self.years)])
+
+    def vol(self, strike, days_to_expiration):
+        """
+        Interpolated implied volatility
+
+        Args:
+            strike: Strike price(s)
+            days_to_expiration: Calendar days to expiration (may be fractional)
+
+        Returns:
+            Volatility: a float for scalar inputs, an array of the broadcast shape otherwise
+        """
+        strike, days = np.broadcast_arrays(np.asarray(strike, dtype=float), np.asarray(days_to_expiration, dtype=float))
+        grid = self.moneyness
+
+        # Position on the moneyness grid
+        x = np.clip(np.log(strike / self.spot), grid[0], grid[-1])
+        j = np.clip(np.searchsorted(grid, x, side='right') - 1, 0, grid.size - 1)
+        j_next = np.minimum(j + 1, grid.size - 1)
+        gap = grid[j_next] - grid[j]
+        fx = np.where(gap > 0, (x - grid[j]) / np.where(gap > 0, gap, 1.0), 0.0)
+
+        # Bracketing expirations; flat vol outside the listed range
+        years = np.clip(option_pricing.years_to_expiration(days), self.years[0], self.years[-1])
+        i = np.clip(np.searchsorted(self.years, years, side='right') - 1, 0, self.years.size - 1)
+        i_next = np.minimum(i + 1, self.years.size - 1)
+        span = self.years[i_next] - self.years[i]
+        ft = np.where(span > 0, (years - self.years[i]) / np.where(span > 0, span, 1.0), 0.0)
+
+        w = self.total_variance
+        near = w[i, j] * (1 - fx) + w[i, j_next] * fx
+        far = w[i_next, j] * (1 - fx) + w[i_next, j_next] * fx
+        vols = np.sqrt(((1 - ft) * near + ft * far) / years)
+        return float(vols) if vols.ndim == 0 else vols
+
+    def to_frame(self, strikes=None):
+        """
+        The surface as a table of vols
+
+        Args:
+            strikes: Strikes to show (defaults to 11 strikes across the grid)
+
+        Returns:
+            DataFrame with strikes as rows and days to expiration as columns
+        """
+        if strikes is None:
+            strikes = self.spot * np.exp(np.linspace(self.moneyness[0], self.moneyness[-1], 11))
+        strikes = np.asarray(strikes, dtype=float)
+        return pd.DataFrame(self.vol(strikes[:, None], self.days[None, :]),
+                            index=pd.Index(strikes.round(2), name='strike'),
+                            columns=pd.Index(self.days.astype(int), name='days'))
+
+
+def otm_smile(calls, puts, spot, days_to_expiration):
+    """
+    Strikes and implied vols of the out-of-the-money side of one expiration
+
+    Args:
+        calls: Calls DataFrame from a yfinance option chain
+        puts: Puts DataFrame from a yfinance option chain
+        spot: Current underlying price
+        days_to_expiration: Calendar days to expiration
+
+    Returns:
+        Tuple of (strikes, vols) arrays; unusable vols are NaN
+    """
+    sides = []
+    for chain, option_type, otm in ((puts, 'put', puts['strike'] < spot), (calls, 'call', calls['strike'] >= spot)):
+        side = chain[otm]
+        if side.empty:
+            continue
+        side = option_pricing.chain_implied_volatility(side, spot, days_to_expiration, option_type)
+        quoted = side['impliedVolatility'].to_numpy(dtype=float)
+        solved = np.where(side['iv_converged'], side['iv_solved'], np.nan)
+        sides.append((side['strike'].to_numpy(dtype=float),
+                      np.where(quoted >= option_pricing.MIN_QUOTED_IV, quoted, solved)))
+    if not sides:
+        return np.array([]), np.array([])
+    return np.concatenate([s for s, _ in sides]), np.concatenate([v for _, v in sides])
+
+
+def build_surface(stock, max_expirations=MAX_SURFACE_EXPIRATIONS, today=None, option_chain=None, spot=None):
+    """
+    Build a volatility surface from a ticker's nearest option chains
+
+    Each expiration's chain is read once (calls and puts together).
+
+    Args:
+        stock: yfinance Ticker object
+        max_expirations: Number of expirations to include, nearest first
+        today: Date to count days to expiration from (defaults to today)
+        option_chain: Function returning the chain of an expiration (defaults
+            to stock.option_chain; option_calculator passes its chain cache)
+        spot: Current stock price (read from stock.info if not given)
+
+    Returns:
+        VolatilitySurface
+
+    Raises:
+        ValueError: If the ticker has no usable option chains
+    """
+    today = today or datetime.now().date()
+    option_chain = option_chain or stock.option_chain
+    if spot is None:
+        spot = stock.info.get('currentPrice')
+        if spot is None:
+            spot = stock.history(period='1d')['Close'].iloc[-1]
+
+    days, smiles = [], []
+    for expiration in list(stock.options)[:max_expirations]:
+        days_to_expiration = (datetime.strptime(expiration, '%Y-%m-%d').date() - today).days
+        if days_to_expiration <= 0:
+            continue
+        chain = option_chain(expiration)
+        days.append(days_to_expiration)
+        smiles.append(otm_smile(chain.calls, chain.puts, spot, days_to_expiration))
+    return VolatilitySurface(spot, days, smiles, ticker=stock.ticker)